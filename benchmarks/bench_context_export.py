@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compares writing context.txt through the decode/encode text path with the
+zero-copy export that hands large file bodies to copy_file_range/sendfile.
+
+Usage: python benchmarks/bench_context_export.py [--files 200] [--file-size-kb 512]
+"""
+import os
+import time
+import sys
+import shutil
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from autocoder.nodes.file_listing_node import FileListingNode  # noqa: E402
+
+
+def generate_tree(root: str, file_count: int, file_size: int):
+    line = "def handler(request):  # ünïcode keeps the decoder honest\n"
+    body = line * (file_size // len(line.encode("utf-8")) + 1)
+    for i in range(file_count):
+        directory = os.path.join(root, f"pkg{i // 50}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module{i}.py"), "w", encoding="utf-8") as f:
+            f.write(body)
+
+
+def timed(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--file-size-kb", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    root = tempfile.mkdtemp(prefix="autocoder-bench-")
+    try:
+        generate_tree(root, args.files, args.file_size_kb * 1024)
+        node = FileListingNode(claude_api=None)
+        project_files = node.process(root, include_context=False)['project_files']
+        text_path = os.path.join(root, "context-text.txt")
+        copy_path = os.path.join(root, "context-copy.txt")
+
+        text_time, _ = timed(lambda: node.write_context(project_files, text_path, zero_copy=False), args.repeat)
+        copy_time, _ = timed(lambda: node.write_context(project_files, copy_path, zero_copy=True), args.repeat)
+        with open(text_path, "rb") as a, open(copy_path, "rb") as b:
+            assert a.read() == b.read(), "zero-copy output differs from the text path"
+
+        megabytes = os.path.getsize(copy_path) / (1024 * 1024)
+        print(f"files exported:     {len(project_files)}")
+        print(f"context size:       {megabytes:.1f} MB")
+        print(f"text path:          {text_time * 1000:.1f} ms ({megabytes / text_time:.0f} MB/s)")
+        print(f"zero-copy:          {copy_time * 1000:.1f} ms ({megabytes / copy_time:.0f} MB/s)")
+        print(f"speedup:            {text_time / copy_time:.1f}x")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
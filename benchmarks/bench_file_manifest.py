@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compares a cold file listing (full rescan) with a warm one that reuses the
+.autocoder/manifest.json written by the previous run, and the single-threaded
+walker with the parallel one.
+
+Usage: python benchmarks/bench_file_manifest.py [--files 50000] [--per-dir 50] [--workers 16]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import pathspec  # noqa: E402
+from autocoder.file_listing.manifest import FileManifest  # noqa: E402
+from autocoder.file_listing.walker import DEFAULT_WALK_WORKERS  # noqa: E402
+
+
+def generate_tree(root: str, file_count: int, per_dir: int):
+    os.makedirs(os.path.join(root, ".autocoder"))
+    for i in range(file_count):
+        dir_index = i // per_dir
+        directory = os.path.join(root, f"pkg{dir_index // 100}", f"mod{dir_index % 100}")
+        os.makedirs(directory, exist_ok=True)
+        suffix = ".pyc" if i % 10 == 0 else ".py"
+        with open(os.path.join(directory, f"file{i}{suffix}"), "w") as f:
+            f.write("x = 1\n")
+    # Backdate directory mtimes so the warm run is not defeated by the racy-mtime guard
+    past = time.time() - 60
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (past, past))
+
+
+def timed(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--per-dir", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WALK_WORKERS)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    root = tempfile.mkdtemp(prefix="autocoder-bench-")
+    try:
+        generate_tree(root, args.files, args.per_dir)
+        ignore_spec = pathspec.PathSpec.from_lines("gitwildmatch", ["*.pyc", ".autocoder/"])
+
+        serial_time, serial_files = timed(
+            lambda: FileManifest(root, max_workers=1).list_project_files(ignore_spec, full=True), args.repeat)
+        cold_time, cold_files = timed(
+            lambda: FileManifest(root, max_workers=args.workers).list_project_files(ignore_spec, full=True),
+            args.repeat)
+        warm_manifest = FileManifest(root, max_workers=args.workers)
+        warm_time, warm_files = timed(lambda: warm_manifest.list_project_files(ignore_spec), args.repeat)
+        assert serial_files == cold_files == warm_files
+
+        print(f"files listed:       {len(cold_files)}")
+        print(f"directories:        {warm_manifest.stats['dirs_reused'] + warm_manifest.stats['dirs_scanned']}")
+        print(f"cold, 1 thread:     {serial_time * 1000:.1f} ms")
+        print(f"cold, {args.workers} threads:".ljust(20) + f"{cold_time * 1000:.1f} ms")
+        print(f"warm (manifest):    {warm_time * 1000:.1f} ms")
+        print(f"speedup:            {cold_time / warm_time:.1f}x")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
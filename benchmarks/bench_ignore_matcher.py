@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of IgnoreMatcher against plain pathspec.PathSpec.match_file.
+
+Both matchers get the same generated patterns and directory listings.
+pathspec checks each file by its full relative path, as list_project_files
+used to; IgnoreMatcher checks names against each directory's cached matcher.
+The time to build the per-directory matchers is included.
+
+Usage: python benchmarks/bench_ignore_matcher.py [--patterns 10000] [--files 10000]
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+import pathspec  # noqa: E402
+from autocoder.file_listing.ignore_matcher import IgnoreMatcher, DEFAULT_IGNORES  # noqa: E402
+
+
+def generate_patterns(count: int):
+    patterns = list(DEFAULT_IGNORES)
+    for i in range(count):
+        kind = i % 8
+        if kind == 0:
+            patterns.append(f'*.ext{i}')
+        elif kind == 1:
+            patterns.append(f'cache{i}/')
+        elif kind == 2:
+            patterns.append(f'pkg{i % 40}/mod{i % 25}/*.gen{i}')
+        elif kind == 3:
+            patterns.append(f'**/tmp{i}')
+        elif kind == 4:
+            patterns.append(f'!keep{i}.ext{i - 4}')
+        elif kind == 5:
+            patterns.append(f'/top{i}*')
+        elif kind == 6:
+            patterns.append(f'report{i}-*.txt')
+        else:
+            patterns.append(f'docs/v{i}/**')
+    return patterns
+
+
+def generate_listings(file_count: int, seed: int = 1):
+    rng = random.Random(seed)
+    listings = {}
+    for i in range(file_count):
+        directory = os.path.join(f'pkg{rng.randrange(40)}', f'mod{rng.randrange(25)}')
+        name = rng.choice([f'file{i}.py', f'x.ext{i}', f'data{i}.gen{i}', f'tmp{i}', f'report{i}-a.txt'])
+        listings.setdefault(directory, []).append(name)
+    return listings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--patterns", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=10000)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    patterns = generate_patterns(args.patterns)
+    listings = generate_listings(args.files)
+
+    start = time.perf_counter()
+    spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    spec_build = time.perf_counter() - start
+    start = time.perf_counter()
+    matcher = IgnoreMatcher.from_lines(patterns)
+    matcher_build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spec_ignored = set()
+    for directory, names in listings.items():
+        for name in names:
+            rel_path = os.path.join(directory, name)
+            if spec.match_file(rel_path):
+                spec_ignored.add(rel_path)
+    spec_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matcher_ignored = set()
+    for directory, names in listings.items():
+        directory_matcher = matcher.for_directory(directory)
+        for name in names:
+            if directory_matcher.match(name):
+                matcher_ignored.add(os.path.join(directory, name))
+    matcher_time = time.perf_counter() - start
+
+    assert spec_ignored == matcher_ignored, "matchers disagree"
+    total = sum(len(names) for names in listings.values())
+    print(f"patterns:           {len(patterns)}")
+    print(f"files checked:      {total} in {len(listings)} directories ({len(spec_ignored)} ignored)")
+    print(f"pathspec:           build {spec_build * 1000:.0f} ms, match {spec_time * 1000:.0f} ms "
+          f"({spec_time / total * 1e6:.1f} us/file)")
+    print(f"IgnoreMatcher:      build {matcher_build * 1000:.0f} ms, match {matcher_time * 1000:.0f} ms "
+          f"({matcher_time / total * 1e6:.1f} us/file)")
+    print(f"match speedup:      {spec_time / matcher_time:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Measures how much of the repository every task-graph step copies: the size
+of each checkpoint and the peak Python memory of a run, with the State's
+large texts held inline (as before blob references) and as references.
+
+The steps are those of the task graph, on a generated repository: list the
+files and build the context, pack the task context, fail once with an
+error report, and retry with the packed context. Each runs as a LangGraph
+node returning the whole state, checkpointed to SQLite after every step.
+
+Usage: python benchmarks/bench_state.py [--sizes 1000,10000]
+"""
+import os
+import sys
+import logging
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Dict, List, Optional, TypedDict
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+from langgraph.graph import StateGraph, END  # noqa: E402
+from bench_workflow import generate_repository  # noqa: E402
+from autocoder.blob_store import resolve_text, store_files, store_text  # noqa: E402
+from autocoder.checkpoints import CheckpointStore  # noqa: E402
+from autocoder.error_handler import ErrorHandler  # noqa: E402
+from autocoder.file_cache import get_file_cache  # noqa: E402
+from autocoder.nodes.file_listing_node import FileListingNode  # noqa: E402
+from autocoder.nodes.task_execution_node import build_task_context  # noqa: E402
+
+STEPS = ["list_files", "pack_context", "fail", "retry"]
+
+
+class BenchState(TypedDict):
+    project_root: str
+    project_files: List[str]
+    skipped_files: Dict[str, str]
+    files: Dict[str, str]
+    context: str
+    task_context: str
+    error: Optional[Dict[str, Any]]
+    attempts: int
+
+
+def build_graph(store: CheckpointStore, referenced: bool):
+    def keep(state, text):
+        return store_text(state, text) if referenced else text
+
+    def list_files(state):
+        result = FileListingNode(None).process(state["project_root"])
+        cache = get_file_cache(state["project_root"])
+        files = {path: cache.read_text(path) for path in result["project_files"] if path not in result["skipped_files"]}
+        return {**state, "project_files": result["project_files"], "skipped_files": result["skipped_files"],
+                "files": store_files(state, files) if referenced else files,
+                "context": keep(state, result["context"])}
+
+    def pack_context(state):
+        context = build_task_context(state, prompt_tokens=100, task_description="Add logging to module5.py")
+        return {**state, "task_context": keep(state, context)}
+
+    def run_tests(state):
+        raise RuntimeError("Tests failed")
+
+    def fail(state):
+        if referenced:
+            return ErrorHandler.wrap_node(run_tests)(dict(state))
+        # What ErrorHandler.wrap_node reported before: the whole state
+        try:
+            run_tests(state)
+        except RuntimeError as e:
+            return {**state, "error": ErrorHandler.handle_error(e, context={"node": "run_tests", "state": dict(state)})}
+
+    def retry(state):
+        # The retry reads the packed context, as the task node does
+        resolve_text(state, state["task_context"])
+        return {**state, "error": None, "attempts": state["attempts"] + 1}
+
+    workflow = StateGraph(BenchState)
+    for name, node in zip(STEPS, (list_files, pack_context, fail, retry)):
+        workflow.add_node(name, node)
+    workflow.set_entry_point(STEPS[0])
+    for current, following in zip(STEPS, STEPS[1:]):
+        workflow.add_edge(current, following)
+    workflow.add_edge(STEPS[-1], END)
+    return workflow.compile(checkpointer=store.saver)
+
+
+def run(repo: str, referenced: bool) -> Dict[str, Any]:
+    store = CheckpointStore(os.path.join(repo, ".autocoder", f"bench-{referenced}.db"))
+    graph = build_graph(store, referenced)
+    config = CheckpointStore.graph_config("bench")
+    tracemalloc.start()
+    event_bytes = []
+    for event in graph.stream({"project_root": repo, "attempts": 0}, config):
+        event_bytes.append(len(store.saver.serde.dumps(event)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The last checkpoints are those saved after each step; the ones before hold the input
+    sizes = [size for (size,) in store._db.execute(
+        "SELECT LENGTH(checkpoint) FROM checkpoints WHERE thread_id = 'bench' ORDER BY thread_ts")][-len(STEPS):]
+    store.close()
+    return {"checkpoint_bytes": sizes, "event_bytes": event_bytes, "peak_mb": peak / (1024 * 1024)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated repository sizes in files")
+    args = parser.parse_args()
+    # The nodes log every file and the failing step its error report; only the table is wanted here
+    logging.disable(logging.CRITICAL)
+
+    print(f"{'files':>7} {'state':<11} " + " ".join(f"{step:>13}" for step in STEPS)
+          + f" {'events':>10} {'peak MB':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        repo = tempfile.mkdtemp(prefix="autocoder-bench-")
+        try:
+            generate_repository(repo, size)
+            os.makedirs(os.path.join(repo, ".autocoder"))
+            for referenced in (False, True):
+                result = run(repo, referenced)
+                print(f"{size:>7} {'references' if referenced else 'inline':<11} "
+                      + " ".join(f"{kb / 1024:>10.1f} KB" for kb in result["checkpoint_bytes"])
+                      + f" {sum(result['event_bytes']) / 1024:>7.0f} KB {result['peak_mb']:>8.1f}", flush=True)
+        finally:
+            shutil.rmtree(repo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the CLI commands against generated repositories,
+with a local fake Messages endpoint standing in for the API.
+
+Each command runs in its own process on a fresh repository of each size;
+the wall time, peak RSS and number of model calls are compared with a
+baseline file, and the script exits with status 1 when any of them got
+worse by more than the threshold (model calls must not grow at all), when
+a command exits with an error, or when the baseline has no measurement
+for it. --update-baseline records the measurements of the commands that
+succeeded as the new baseline.
+
+Usage: python benchmarks/bench_workflow.py [--sizes 1000,10000,100000] [--latency 0.2]
+                                          [--tokens-per-second 100] [--threshold 0.25]
+                                          [--baseline benchmarks/workflow-baseline.json] [--update-baseline]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+# The fake endpoint is a test helper, not part of the package
+TESTS = Path(__file__).resolve().parent.parent / "tests"
+sys.path.insert(0, str(SRC))
+sys.path.insert(0, str(TESTS))
+
+from fake_messages import FakeMessagesServer  # noqa: E402
+
+# The console script, without depending on the package being installed
+CLI = [sys.executable, "-c", "from autocoder.autocoder import main; main()"]
+COMMANDS = {
+    "create:files-list": ["create:files-list"],
+    "create:context-file": ["create:context-file"],
+    "analyze": ["analyze", "--no-cache"],
+    "analyze --map-reduce": ["analyze", "--map-reduce", "--no-cache"],
+    "task": ["task", "Add logging to module0.py"],
+}
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "workflow-baseline.json"
+FILES_PER_DIR = 100
+
+
+def generate_repository(root: str, file_count: int):
+    """A Python project of file_count files: modules importing their neighbours, docs, data and ignored logs."""
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("*.log\nbuild/\n")
+    for i in range(file_count):
+        directory = os.path.join(root, f"pkg{i // (FILES_PER_DIR * 10)}", f"sub{(i // FILES_PER_DIR) % 10}")
+        os.makedirs(directory, exist_ok=True)
+        kind = i % 20
+        if kind == 0:
+            path, text = f"README{i}.md", f"# Component {i}\n\nNotes on module{i + 1}.\n"
+        elif kind == 1:
+            path, text = f"config{i}.json", json.dumps({"name": f"component{i}", "retries": i % 5}) + "\n"
+        elif kind == 2:
+            path, text = f"run{i}.log", "log line\n" * 50
+        else:
+            path = f"module{i}.py"
+            text = (f"from .module{i - 1} import handler{i - 1}\n\n\n" if i % FILES_PER_DIR > 3 else "")
+            text += (f"def handler{i}(request):\n    \"\"\"Handles requests for component {i}.\"\"\"\n"
+                     f"    values = [value * {i % 7 + 1} for value in request]\n    return sum(values)\n\n\n"
+                     f"class Service{i}:\n    def run(self, items):\n        return [handler{i}(item) for item in items]\n")
+        with open(os.path.join(directory, path), "w") as f:
+            f.write(text)
+
+
+def run_command(repo: str, args, env) -> dict:
+    """Runs the CLI in repo and returns its wall time and peak RSS; the CLI's own output is discarded."""
+    started = time.perf_counter()
+    process = subprocess.Popen([*CLI, *args], cwd=repo, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return {"wall_seconds": round(wall, 3), "peak_rss_mb": round(rss_mb, 1), "exit_code": process.returncode}
+
+
+def failures(results: dict):
+    """Lines describing every command that exited with an error; its measurements mean nothing."""
+    return [f"{name}: exited with code {result['exit_code']}"
+            for name, result in results.items() if result["exit_code"] != 0]
+
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """
+    Lines describing every measurement that regressed past threshold (model
+    calls may not grow at all), failed, or is missing from the baseline.
+    """
+    regressions = failures(results)
+    for name, result in results.items():
+        if result["exit_code"] != 0:
+            continue
+        previous = baseline.get(name)
+        if previous is None:
+            regressions.append(f"{name}: not in the baseline; record it with --update-baseline")
+            continue
+        for metric, allowed in (("wall_seconds", threshold), ("peak_rss_mb", threshold), ("llm_calls", 0.0)):
+            if result[metric] > previous[metric] * (1 + allowed):
+                regressions.append(f"{name}: {metric} {result[metric]} against {previous[metric]} in the baseline")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Comma-separated repository sizes in files")
+    parser.add_argument("--commands", default=",".join(COMMANDS), help="Comma-separated commands to run")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each fake response starts")
+    parser.add_argument("--tokens-per-second", type=float, help="Output speed of the fake endpoint")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown or growth, 0.25 = 25%%")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--update-baseline", action="store_true", help="Save these results as the new baseline")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    commands = args.commands.split(",")
+
+    server = FakeMessagesServer(latency=args.latency, tokens_per_second=args.tokens_per_second)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    env = {**os.environ, "PYTHONPATH": str(SRC), "ANTHROPIC_API_KEY": "benchmark",
+           "ANTHROPIC_BASE_URL": server.base_url}
+    env.pop("CLAUDE_API_KEY", None)
+    env.pop("AUTOCODER_LLM_CASSETTE", None)
+
+    results = {}
+    print(f"{'command':<22} {'files':>7} {'wall s':>8} {'peak RSS MB':>12} {'LLM calls':>10}")
+    try:
+        for size in sizes:
+            for command in commands:
+                repo = tempfile.mkdtemp(prefix="autocoder-bench-")
+                try:
+                    generate_repository(repo, size)
+                    subprocess.run([*CLI, "init"], cwd=repo, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+                    result = run_command(repo, COMMANDS[command], env)
+                    result["llm_calls"] = len(server.requests)
+                    # The request bodies are not needed, and hold whole contexts
+                    del server.requests[:]
+                finally:
+                    shutil.rmtree(repo)
+                results[f"{command}@{size}"] = result
+                failed = "" if result["exit_code"] == 0 else f"  (exit code {result['exit_code']})"
+                print(f"{command:<22} {size:>7} {result['wall_seconds']:>8.2f} {result['peak_rss_mb']:>12.1f} "
+                      f"{result['llm_calls']:>10}{failed}", flush=True)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if args.update_baseline:
+        regressions = failures(results)
+        new = {name: result for name, result in results.items() if result["exit_code"] == 0}
+        if new:
+            baseline.update(new)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+            print(f"\n{len(new)} measurements saved to the baseline in {baseline_path}")
+    else:
+        regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print("\nRegressions and failures:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions against {baseline_path} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -34,7 +34,7 @@ setup(
     ],
     entry_points={
         "console_scripts": [
-            "autocoder=autocoder.autocoder:main",
+            "autocoder=autocoder.client:main",
         ],
     },
 )
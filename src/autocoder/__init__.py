@@ -1,26 +1,26 @@
-from .autocoder import main
+# Names are imported on first use, so the `autocoder` command can reach a
+# running daemon (see client.py) without loading langgraph and anthropic.
+_EXPORTS = {
+    'main': '.autocoder',
+    'file_manager_node': '.file_manager',
+    'context_builder_node': '.context_builder',
+    'task_interpreter_node': '.task_interpreter',
+    'code_modifier_node': '.code_modifier',
+    'test_runner_node': '.test_runner',
+    'ErrorHandler': '.error_handler',
+    'ClaudeAPIWrapper': '.claude_api_wrapper',
+    'LangGraphWorkflow': '.langgraph_workflow',
+    'State': '.state',
+    'FileListingNode': '.file_listing.file_listing_node',
+}
 
-from .file_manager import file_manager_node
-from .context_builder import context_builder_node
-from .task_interpreter import task_interpreter_node
-from .code_modifier import code_modifier_node
-from .test_runner import test_runner_node
-from .error_handler import ErrorHandler
-from .claude_api_wrapper import ClaudeAPIWrapper
-from .langgraph_workflow import LangGraphWorkflow
-from .state import State
-from .file_listing.file_listing_node import FileListingNode
+__all__ = list(_EXPORTS)
 
-__all__ = [
-    'main',
-    'file_manager_node',
-    'context_builder_node',
-    'task_interpreter_node',
-    'code_modifier_node',
-    'test_runner_node',
-    'ErrorHandler',
-    'ClaudeAPIWrapper',
-    'LangGraphWorkflow',
-    'State',
-    'FileListingNode'
-]
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
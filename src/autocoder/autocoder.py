@@ -1,6 +1,10 @@
 import argparse
+import contextlib
 import logging
 import os
+import queue
+import threading
+import time
 from dotenv import load_dotenv
 from typing import Dict, Any
 from pathlib import Path
@@ -15,6 +19,24 @@ from .nodes.tools.directory_checker import (
 from .error_handler import ErrorHandler
 from .nodes.file_listing_node import FileListingNode, FileListingArgs
 from .claude_api_wrapper import ClaudeAPIWrapper
+from .file_listing.classifier import FileClassifier
+from .import_graph import DEFAULT_CLOSURE_DEPTH
+from .file_listing.skeleton import CONTEXT_MODES
+from .response_cache import ResponseCache
+from .model_router import ModelRouter
+from .checkpoints import COMPLETED, INTERRUPTED, CheckpointStore, new_run_id
+from .blob_store import get_blob_store
+from .profiler import NodeProfiler
+from .daemon import serve
+from .telemetry import (
+    DEFAULT_STATS_WINDOW,
+    METRICS_FILENAME,
+    MetricsWriter,
+    format_stats,
+    parse_window,
+    read_metrics,
+    summarize,
+)
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -25,28 +47,108 @@ def initialize_autocoder():
     logger.info("Autocoder initialization complete.")
     return True
 
-def stream_execution(workflow: LangGraphWorkflow, task_description: str, config: Dict[str, Any]):
+def format_stream_metrics(event: Dict[str, Any]) -> str:
+    if event.get("cached"):
+        return "[Cached response]"
+    return (f"[First token after {event['ttft']:.2f} s, {event['output_tokens']} tokens "
+            f"at {event['tokens_per_second']:.1f} tokens/s]")
+
+def format_profile(event: Dict[str, Any]) -> str:
+    peak = "" if event["peak_bytes"] is None else f", {event['peak_bytes'] / (1024 * 1024):.1f} MB peak"
+    failed = " (failed)" if "error" in event else ""
+    return (f"[Profile] {event['node']}{failed}: {event['wall']:.3f} s wall, {event['cpu']:.3f} s CPU{peak}, "
+            f"state {event['state_delta_bytes'] / 1024:+.1f} KB")
+
+def stream_execution(workflow: LangGraphWorkflow, task_description: str, config: Dict[str, Any],
+                     resume: bool = False):
+    """
+    Runs the task graph, yielding model tokens as they are generated and a
+    line for every graph event. Token text is yielded as is; everything else
+    ends with a newline, so the output can be printed with end="". With
+    resume, the graph continues the run in config's checkpoints instead of
+    starting over. Closing the generator stops the graph after the node that
+    is running and waits for it, so nothing writes checkpoints afterwards.
+    """
+    events = queue.Queue()
+    # Set when the generator is closed; the graph stops once the running step is saved
+    stop = threading.Event()
+    # No input makes the graph continue from its latest checkpoint
+    initial_state = None if resume else {
+        "messages": [{"role": "user", "content": task_description}],
+        "project_root": config.get("project_root", ""),
+        "closure_depth": config.get("closure_depth", DEFAULT_CLOSURE_DEPTH),
+        "files": {},
+        "context": "",
+        "task_completed": False,
+        "error": None
+    }
+
+    def run_graph():
+        try:
+            # The debug stream reports each checkpoint after it is handed to the saver,
+            # which stream() waits for on exit, so stopping there loses no finished step
+            for mode, event in workflow.graph.stream(initial_state, config, stream_mode=["updates", "debug"]):
+                if mode == "updates":
+                    events.put({"type": "node", "event": event})
+                elif event["type"] == "checkpoint" and stop.is_set():
+                    break
+        except Exception as e:
+            events.put({"type": "exception", "exception": e})
+        finally:
+            events.put(None)
+
+    # The graph runs in a thread so tokens streamed by its nodes reach the caller before the node finishes
+    workflow.on_event = events.put
+    thread = threading.Thread(target=run_graph, daemon=True)
+    thread.start()
     try:
-        for event in workflow.graph.stream({
-            "messages": [{"role": "user", "content": task_description}],
-            "project_root": config.get("project_root", ""),
-            "files": {},
-            "context": "",
-            "task_completed": False,
-            "error": None
-        }, config):
-            if "error" in event:
-                yield f"An error occurred: {event['error']}"
-            elif "messages" in event:
-                yield f"Output: {event['messages'][-1]['content']}"
-            else:
-                yield f"Event: {event}"
+        while True:
+            item = events.get()
+            if item is None:
+                break
+            if item["type"] == "token":
+                yield item["text"]
+            elif item["type"] == "done":
+                yield f"\n{format_stream_metrics(item)}\n"
+            elif item["type"] == "profile":
+                yield f"{format_profile(item)}\n"
+            elif item["type"] == "exception":
+                raise item["exception"]
+            elif item["type"] == "node":
+                event = item["event"]
+                if "error" in event:
+                    yield f"An error occurred: {event['error']}\n"
+                elif "messages" in event:
+                    yield f"Output: {event['messages'][-1]['content']}\n"
+                else:
+                    yield f"Event: {event}\n"
     except Exception as e:
         error_report = ErrorHandler.handle_error(e)
         ErrorHandler.log_error(e)
         yield f"An unexpected error occurred: {error_report['error_message']}"
-
-def execute_task(task_description):
+    finally:
+        stop.set()
+        if thread.is_alive():
+            logger.info("Waiting for the running node to finish before stopping the graph.")
+        thread.join()
+
+def print_routing_summary(workflow: LangGraphWorkflow):
+    summary = workflow.claude_api.router.summary()
+    if summary:
+        logger.info(summary)
+        print(f"\n{summary}")
+
+def print_profile(profiler: NodeProfiler, run_id: str):
+    print(f"\nTime and memory per node:\n{profiler.format_summary()}")
+    try:
+        paths = profiler.write_report(os.getcwd(), run_id)
+        print(f"Profile saved to {paths['summary']}; open {paths['trace']} in chrome://tracing or Perfetto.")
+    except OSError as e:
+        logger.error(f"Could not write the profile: {str(e)}")
+        print(f"Error: Could not write the profile: {str(e)}")
+
+def execute_task(task_description, closure_depth: int = DEFAULT_CLOSURE_DEPTH, resume_run_id: str = None,
+                 profile: bool = False):
     if not check_autocoder_dir():
         logger.error("Autocoder is not initialized in this directory.")
         print("Autocoder is not initialized in this directory. Please run 'autocoder init' first.")
@@ -59,16 +161,74 @@ def execute_task(task_description):
         print("Error: No API key found. Please set ANTHROPIC_API_KEY or CLAUDE_API_KEY in your environment or .env file.")
         return
 
+    checkpoints = CheckpointStore.for_project(os.getcwd())
+    if resume_run_id:
+        run = checkpoints.get_run(resume_run_id) if checkpoints is not None else None
+        if run is None:
+            logger.error(f"No checkpoints found for run {resume_run_id}.")
+            print(f"Error: No checkpoints found for run {resume_run_id}.")
+            if checkpoints is not None:
+                checkpoints.close()
+            return
+        if run["status"] == COMPLETED:
+            print(f"Run {resume_run_id} has already completed.")
+            checkpoints.close()
+            return
+        run_id, task_description = resume_run_id, run["task"]
+    else:
+        run_id = new_run_id()
+        if checkpoints is not None:
+            checkpoints.start_run(run_id, task_description)
+
+    metrics = MetricsWriter.for_project(os.getcwd(), command="task")
+    profiler = NodeProfiler() if profile else None
+    status = INTERRUPTED
     try:
-        workflow = LangGraphWorkflow(api_key)
+        workflow = LangGraphWorkflow(api_key, metrics=metrics, router=ModelRouter.from_env(),
+                                     checkpointer=checkpoints.saver if checkpoints is not None else None,
+                                     profiler=profiler)
+        config = {"project_root": os.getcwd(), "closure_depth": closure_depth,
+                  **CheckpointStore.graph_config(run_id)}
+        if resume_run_id:
+            print(f"Resuming run {run_id}: {task_description}")
+        else:
+            print(f"Run id: {run_id}")
         print("Executing task. Streaming output:")
-        for output in stream_execution(workflow, task_description, {"project_root": os.getcwd()}):
-            print(output)
+        if profiler is not None:
+            profiler.start()
+        # Closed on Ctrl-C too, which stops the graph before the checkpoints are pruned below
+        with contextlib.closing(stream_execution(workflow, task_description, config,
+                                                 resume=bool(resume_run_id))) as outputs:
+            for output in outputs:
+                print(output, end="", flush=True)
+        # Nodes left to run mean the graph stopped early, e.g. on an exception
+        if not workflow.graph.get_state(config).next:
+            status = COMPLETED
+        print_routing_summary(workflow)
+    except KeyboardInterrupt:
+        logger.info(f"Task run {run_id} interrupted.")
+        print("\nInterrupted.")
     except Exception as e:
         logger.error(f"Failed to execute task: {str(e)}")
         print(f"Error: Failed to execute task: {str(e)}")
-
-def execute_analyze():
+    finally:
+        if metrics is not None:
+            metrics.close()
+        if profiler is not None:
+            profiler.stop()
+            print_profile(profiler, run_id)
+        if checkpoints is not None:
+            checkpoints.finish_run(run_id, status)
+            if status == INTERRUPTED:
+                print(f"\nResume the run with: autocoder task --resume {run_id}")
+            checkpoints.prune()
+            # Blobs the remaining runs refer to stay, however long ago they were stored
+            referenced = checkpoints.blob_refs()
+            checkpoints.close()
+            get_blob_store(os.getcwd()).prune(keep=referenced)
+
+def execute_analyze(full: bool = False, size_limits: Dict[str, int] = None, context_mode: str = "full",
+                    use_cache: bool = True, map_reduce: bool = False):
     if not check_autocoder_dir():
         logger.error("Autocoder is not initialized in this directory.")
         print(
@@ -85,17 +245,70 @@ def execute_analyze():
         )
         return
 
+    metrics = MetricsWriter.for_project(os.getcwd(), command="analyze")
     try:
-        workflow = LangGraphWorkflow(api_key)
+        response_cache = ResponseCache.for_project(os.getcwd()) if use_cache else None
+        workflow = LangGraphWorkflow(api_key, response_cache, metrics, ModelRouter.from_env())
         print("Analyzing project...")
-        result = workflow.execute_analysis({"project_root": os.getcwd()})
-        if result != "Analysis completed.":
+        streamed = []
+
+        def show(event: Dict[str, Any]):
+            if event["type"] == "token":
+                streamed.append(event["text"])
+                print(event["text"], end="", flush=True)
+            elif event["type"] == "done":
+                print(f"\n\n{format_stream_metrics(event)}")
+
+        result = workflow.execute_analysis({
+            "project_root": os.getcwd(),
+            "full": full,
+            "context_mode": context_mode,
+            "map_reduce": map_reduce,
+            **(size_limits or {}),
+        }, on_event=show)
+        # A streamed analysis has already been printed; errors and map-reduce reports have not
+        if not streamed or not result.startswith("Analysis completed"):
             print(result)
+        print_routing_summary(workflow)
     except Exception as e:
         logger.error(f"Failed to execute analysis: {str(e)}")
         print(f"Error: Failed to execute analysis: {str(e)}")
+    finally:
+        if metrics is not None:
+            metrics.close()
 
-def create_files_list():
+def show_stats(window: str = DEFAULT_STATS_WINDOW):
+    if not check_autocoder_dir():
+        logger.error("Autocoder is not initialized in this directory.")
+        print("Autocoder is not initialized in this directory. Please run 'autocoder init' first.")
+        return
+
+    try:
+        since = time.time() - parse_window(window)
+    except ValueError:
+        print(f"Error: Invalid time window '{window}'. Use e.g. 90m, 24h or 7d.")
+        return
+    metrics_path = os.path.join(os.getcwd(), ".autocoder", METRICS_FILENAME)
+    print(format_stats(summarize(list(read_metrics(metrics_path, since))), window))
+
+def serve_daemon():
+    if not check_autocoder_dir():
+        logger.error("Autocoder is not initialized in this directory.")
+        print("Autocoder is not initialized in this directory. Please run 'autocoder init' first.")
+        return
+
+    project_root = os.getcwd()
+
+    def warm_up():
+        # Lists the project once, so the manifest and ignore rules are in memory before the first command
+        result = FileListingNode(None).process(project_root, include_context=False, classify=False)
+        if 'error' not in result:
+            logger.info(f"Daemon warmed up with {len(result['project_files'])} project files")
+
+    load_dotenv()
+    serve(project_root, run_command=main, warm_up=warm_up)
+
+def create_files_list(full: bool = False, size_limits: Dict[str, int] = None):
     if not check_autocoder_dir():
         logger.error("Autocoder is not initialized in this directory.")
         print("Autocoder is not initialized in this directory. Please run 'autocoder init' first.")
@@ -115,9 +328,10 @@ def create_files_list():
             return
 
         claude_api = ClaudeAPIWrapper(api_key)
-        file_lister = FileListingNode(claude_api)
+        file_lister = FileListingNode(claude_api, **(size_limits or {}))
 
-        result = file_lister.process(project_root)
+        # Only the paths are written; the contents are never read
+        result = file_lister.process(project_root, full=full, include_context=False, classify=False)
 
         if 'error' in result:
             raise Exception(result['error'])
@@ -134,7 +348,7 @@ def create_files_list():
         print(f"Error: Failed to create files list: {str(e)}")
 
 
-def create_context_file():
+def create_context_file(full: bool = False, size_limits: Dict[str, int] = None, context_mode: str = "full"):
     if not check_autocoder_dir():
         logger.error("Autocoder is not initialized in this directory.")
         print("Autocoder is not initialized in this directory. Please run 'autocoder init' first.")
@@ -156,26 +370,29 @@ def create_context_file():
 
 
         claude_api = ClaudeAPIWrapper(api_key)
-        file_lister = FileListingNode(claude_api)
-        result = file_lister.process(project_root)
+        file_lister = FileListingNode(claude_api, **(size_limits or {}))
+        result = file_lister.process(project_root, full=full, include_context=False)
 
         if 'error' in result:
             raise Exception(result['error'])
 
-        context = result['context']
-
-        # Write the context to file in chunks to handle potentially large files
-        with open(context_file_path, 'w') as f:
-            for i in range(0, len(context), 1024 * 1024):  # Write in 1MB chunks
-                f.write(context[i:i + 1024 * 1024])
+        # Stream the context to disk so large projects never sit in memory as one string
+        context_size = file_lister.write_context(result['project_files'], context_file_path, mode=context_mode)
 
         logger.info(f"Context file created successfully at {context_file_path}")
         print(f"Context file created successfully at {context_file_path}")
         print(f"Total files processed: {len(result['project_files'])}")
-        print(f"Context size: {len(context)} bytes")
+        print(f"Context size: {context_size} bytes")
+        if context_mode == "skeleton":
+            print(f"Skeleton compression ratio: {file_lister.compression_ratio:.1f}x")
         print("Files included in context:")
         for file in result['project_files']:
-            print(f"  - {file}")
+            if file not in result['skipped_files']:
+                print(f"  - {file}")
+        if result['skipped_files']:
+            print("\nSkipped files:")
+            for reason, count in sorted(result['skipped_summary'].items()):
+                print(f"  - {FileClassifier.describe(reason)}: {count}")
         print("\nExcluded patterns:")
         for pattern in result['excluded_files']:
             print(f"  - {pattern}")
@@ -183,13 +400,13 @@ def create_context_file():
         logger.error(f"Failed to create context file: {str(e)}", exc_info=True)
         print(f"Error: Failed to create context file: {str(e)}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Claude Automated Coding")
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="autocoder", description="Claude Automated Coding")
     parser.add_argument(
         "command",
         nargs="?",
         default="help",
-        choices=["init", "task", "analyze", "create:files-list", "create:context-file", "help"],
+        choices=["init", "task", "analyze", "stats", "serve", "create:files-list", "create:context-file", "help"],
         help="Command to execute",
     )
     parser.add_argument(
@@ -198,7 +415,64 @@ def main():
         default="",
         help="The task description for the automated coding process",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignore the cached file manifest and rescan the whole project",
+    )
+    parser.add_argument(
+        "--max-file-size",
+        type=int,
+        help="Skip files larger than this many bytes when building context",
+    )
+    parser.add_argument(
+        "--max-total-size",
+        type=int,
+        help="Stop adding file contents to the context after this many bytes",
+    )
+    parser.add_argument(
+        "--context-mode",
+        choices=CONTEXT_MODES,
+        default="full",
+        help="Include whole files, or only signatures and excerpts (skeleton), in the context",
+    )
+    parser.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help="Analyze the project in directory-sized chunks and combine the results, for projects too large for one prompt",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the model instead of reusing a cached response to the same request",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=DEFAULT_CLOSURE_DEPTH,
+        help="How many import hops around the files a task names to include in its context",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="Continue an interrupted task run from its last completed step",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report time, CPU, memory and state size per workflow node of a task, and save a Chrome trace",
+    )
+    parser.add_argument(
+        "--since",
+        default=DEFAULT_STATS_WINDOW,
+        help="Time window for 'stats', e.g. 90m, 24h or 7d",
+    )
+    args = parser.parse_args(argv)
+    size_limits = {
+        name: value
+        for name, value in (("max_file_size", args.max_file_size), ("max_total_size", args.max_total_size))
+        if value is not None
+    }
 
     logger.debug(f"Received command: {args.command}")
 
@@ -207,22 +481,30 @@ def main():
         if not initialize_autocoder():
             return
     elif args.command == "task":
-        if args.task_description:
+        if args.resume:
+            logger.info(f"Resuming task run: {args.resume}")
+            execute_task(None, closure_depth=args.depth, resume_run_id=args.resume, profile=args.profile)
+        elif args.task_description:
             logger.info(f"Executing task: {args.task_description}")
-            execute_task(args.task_description)
+            execute_task(args.task_description, closure_depth=args.depth, profile=args.profile)
         else:
             logger.error("No task description provided for 'task' command.")
             print("Error: Task description is required for the 'task' command.")
             display_usage_message()
     elif args.command == "analyze":
         logger.info("Analyzing project...")
-        execute_analyze()
+        execute_analyze(full=args.full, size_limits=size_limits, context_mode=args.context_mode,
+                        use_cache=not args.no_cache, map_reduce=args.map_reduce)
+    elif args.command == "stats":
+        show_stats(args.since)
+    elif args.command == "serve":
+        serve_daemon()
     elif args.command == "create:files-list":
         logger.info("Creating files list...")
-        create_files_list()
+        create_files_list(full=args.full, size_limits=size_limits)
     elif args.command == "create:context-file":
         logger.info("Creating context file...")
-        create_context_file()
+        create_context_file(full=args.full, size_limits=size_limits, context_mode=args.context_mode)
     elif args.command == "help" or not args.command:
         if check_autocoder_dir():
             logger.info("Displaying usage message for initialized directory.")
@@ -0,0 +1,169 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import AbstractSet, Any, Dict, Iterator, Mapping, Optional
+from .file_cache import CACHE_DIRNAME, content_digest
+
+logger = logging.getLogger(__name__)
+
+BLOB_STORE_FILENAME = "state.db"
+BLOB_REF_PREFIX = "blob:"
+# Blobs no checkpoint refers to are kept as long as checkpoints are (see checkpoints.py)
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY, data BLOB, size INTEGER, last_access REAL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+"""
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+
+class BlobStore:
+    """
+    Content-addressed store for the large texts of the workflow State
+    (contexts and file bodies), in .autocoder/cache/state.db.
+
+    The State holds "blob:<digest>" references instead of the texts, so a
+    node returning the state, a checkpoint or a stream event carries a few
+    bytes per text rather than the whole repository again. Nodes that need
+    a text resolve its reference with get(). Without an .autocoder
+    directory the blobs are kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            try:
+                db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("PRAGMA synchronous=NORMAL")
+                db.executescript(_SCHEMA)
+                self._db = db
+            except sqlite3.Error as e:
+                logger.warning(f"State blob store unavailable, keeping blobs in memory: {e}")
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def put(self, text: str) -> str:
+        """Stores text and returns its reference; storing the same text again is free."""
+        data = text.encode("utf-8")
+        digest = content_digest(data)
+        with self._lock:
+            if self._db is None:
+                self._memory[digest] = text
+            else:
+                # An existing blob is only touched, so it outlives the checkpoints referring to it
+                self._db.execute("INSERT INTO blobs VALUES (?, ?, ?, ?) "
+                                 "ON CONFLICT (digest) DO UPDATE SET last_access = excluded.last_access",
+                                 (digest, data, len(data), time.time()))
+        return BLOB_REF_PREFIX + digest
+
+    def get(self, ref: str) -> str:
+        """The text a reference stands for. Raises KeyError for an unknown or pruned blob."""
+        digest = ref[len(BLOB_REF_PREFIX):]
+        with self._lock:
+            if self._db is None:
+                return self._memory[digest]
+            row = self._db.execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(ref)
+        return row[0].decode("utf-8")
+
+    def prune(self, max_age: float = DEFAULT_MAX_AGE_SECONDS, keep: AbstractSet[str] = frozenset()) -> int:
+        """
+        Deletes blobs not stored for max_age seconds and returns how many there
+        were. Blobs whose digests are in keep are left alone however old they
+        are: a resumed run reads the references in its checkpoints without
+        storing the texts again (see CheckpointStore.blob_refs).
+        """
+        if self._db is None:
+            return 0
+        with self._lock:
+            expired = [digest for (digest,) in self._db.execute(
+                "SELECT digest FROM blobs WHERE last_access < ?", (time.time() - max_age,)) if digest not in keep]
+            self._db.execute("BEGIN")
+            self._db.executemany("DELETE FROM blobs WHERE digest = ?", ((digest,) for digest in expired))
+            self._db.execute("COMMIT")
+        deleted = len(expired)
+        if deleted:
+            logger.info(f"Pruned {deleted} state blobs from {self.path}")
+        return deleted
+
+
+class LazyFiles(Mapping):
+    """A read-only view of a State "files" mapping that resolves each file body when it is read."""
+
+    def __init__(self, store: BlobStore, files: Mapping[str, str]):
+        self._store = store
+        self._files = files
+
+    def __getitem__(self, path: str) -> str:
+        value = self._files[path]
+        return self._store.get(value) if is_blob_ref(value) else value
+
+    def __contains__(self, path: object) -> bool:
+        # Mapping's default would resolve the body just to test membership
+        return path in self._files
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_blob_store(project_root: str) -> BlobStore:
+    """
+    Returns the process-wide BlobStore for a project, so references written
+    by one node resolve in every other. A state without a project root gets
+    an in-memory store.
+    """
+    key = os.path.realpath(str(project_root)) if project_root else ""
+    autocoder_dir = os.path.join(key, ".autocoder")
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or (key and not store.persistent and os.path.isdir(autocoder_dir)):
+            path = None
+            if key and os.path.isdir(autocoder_dir):
+                os.makedirs(os.path.join(autocoder_dir, CACHE_DIRNAME), exist_ok=True)
+                path = os.path.join(autocoder_dir, CACHE_DIRNAME, BLOB_STORE_FILENAME)
+            store = _stores[key] = BlobStore(path)
+        return store
+
+
+def store_text(state: Mapping[str, Any], text: str) -> str:
+    """Puts text in the blob store of the state's project and returns the reference to keep in the state."""
+    return get_blob_store(state.get("project_root", "")).put(text)
+
+
+def resolve_text(state: Mapping[str, Any], value: Optional[str]) -> Optional[str]:
+    """The text behind a State value; values that are not references (older checkpoints) are returned as they are."""
+    if is_blob_ref(value):
+        return get_blob_store(state.get("project_root", "")).get(value)
+    return value
+
+
+def store_files(state: Mapping[str, Any], files: Mapping[str, str]) -> Dict[str, str]:
+    """Puts file bodies in the blob store and returns the path -> reference mapping to keep in the state."""
+    store = get_blob_store(state.get("project_root", ""))
+    return {path: store.put(content) for path, content in files.items()}
+
+
+def resolve_files(state: Mapping[str, Any]) -> LazyFiles:
+    return LazyFiles(get_blob_store(state.get("project_root", "")), state.get("files") or {})
@@ -0,0 +1,150 @@
+import os
+import re
+import time
+import uuid
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional, Set
+from langgraph.checkpoint.sqlite import SqliteSaver
+from .blob_store import BLOB_REF_PREFIX
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINTS_FILENAME = "checkpoints.db"
+
+DEFAULT_RETENTION_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_RUNS = 20
+# The file is rewritten to reclaim free pages only once they are this share of it;
+# below that, new checkpoints reuse them
+VACUUM_FREE_SHARE = 0.25
+
+RUNNING, COMPLETED, INTERRUPTED = "running", "completed", "interrupted"
+
+# A State text reference (see blob_store) inside a serialized checkpoint or write
+_BLOB_REF = re.compile(re.escape(BLOB_REF_PREFIX.encode("ascii")) + rb"([0-9a-f]+)")
+
+# The checkpoints and writes tables belong to SqliteSaver; runs records what
+# each thread was started for, so a run can be resumed and pruned by age.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY, task TEXT, status TEXT, created REAL, updated REAL
+);
+CREATE INDEX IF NOT EXISTS runs_updated ON runs (updated);
+"""
+
+
+def new_run_id() -> str:
+    """A run id that sorts by start time and is short enough to type: 20240504-063242-1a2b3c."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class CheckpointStore:
+    """
+    Durable LangGraph checkpoints of task runs in .autocoder/checkpoints.db.
+
+    Each run is a graph thread whose id is the run id; the graph saves a
+    checkpoint after every node, so an interrupted run continues from the
+    last node that finished. prune() keeps the database small: runs older
+    than retention seconds, and all but the max_runs most recent ones, are
+    deleted, and every remaining run keeps only its latest checkpoint, the
+    only one a resume needs.
+    """
+
+    def __init__(self, path: str, retention: float = DEFAULT_RETENTION_SECONDS, max_runs: int = DEFAULT_MAX_RUNS):
+        self.path = path
+        self.retention = retention
+        self.max_runs = max_runs
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.saver = SqliteSaver(self._db)
+        self.saver.setup()
+        with self.saver.lock, self.saver.cursor() as cur:
+            cur.executescript(_SCHEMA)
+
+    @classmethod
+    def for_project(cls, project_root: str, **kwargs) -> Optional["CheckpointStore"]:
+        """
+        Opens the project's checkpoint store, or returns None if the project
+        has no .autocoder directory or the database cannot be opened.
+        """
+        autocoder_dir = os.path.join(str(project_root), ".autocoder")
+        if not os.path.isdir(autocoder_dir):
+            return None
+        try:
+            return cls(os.path.join(autocoder_dir, CHECKPOINTS_FILENAME), **kwargs)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not open the checkpoint store: {str(e)}")
+            return None
+
+    @staticmethod
+    def graph_config(run_id: str) -> Dict[str, Any]:
+        """The config that makes the graph save and load the checkpoints of run_id."""
+        return {"configurable": {"thread_id": run_id}}
+
+    def start_run(self, run_id: str, task: str):
+        now = time.time()
+        with self.saver.lock, self.saver.cursor() as cur:
+            cur.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)", (run_id, task, RUNNING, now, now))
+
+    def finish_run(self, run_id: str, status: str):
+        with self.saver.lock, self.saver.cursor() as cur:
+            cur.execute("UPDATE runs SET status = ?, updated = ? WHERE run_id = ?", (status, time.time(), run_id))
+
+    def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT run_id, task, status, created, updated FROM runs WHERE run_id = ?",
+                               (run_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("run_id", "task", "status", "created", "updated"), row))
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        """Runs in the store, the most recently updated first."""
+        rows = self._db.execute("SELECT run_id, task, status, created, updated FROM runs ORDER BY updated DESC")
+        return [dict(zip(("run_id", "task", "status", "created", "updated"), row)) for row in rows]
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Deletes expired and surplus runs, compacts the remaining ones to their
+        latest checkpoint, and reclaims the freed space when it is at least
+        VACUUM_FREE_SHARE of the file.
+
+        Returns:
+        Dict[str, int]: Numbers of "runs" and "checkpoints" deleted.
+        """
+        with self.saver.lock, self.saver.cursor() as cur:
+            runs = cur.execute(
+                "DELETE FROM runs WHERE updated < ? OR run_id NOT IN "
+                "(SELECT run_id FROM runs ORDER BY updated DESC LIMIT ?)",
+                (time.time() - self.retention, self.max_runs),
+            ).rowcount
+            # Threads without a run are left over from pruned runs, or were started outside the CLI
+            checkpoints = cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id NOT IN (SELECT run_id FROM runs)"
+            ).rowcount
+            # Checkpoint ids are time-ordered, so the greatest one is the latest
+            checkpoints += cur.execute(
+                "DELETE FROM checkpoints WHERE thread_ts < "
+                "(SELECT MAX(latest.thread_ts) FROM checkpoints latest WHERE latest.thread_id = checkpoints.thread_id)"
+            ).rowcount
+            cur.execute(
+                "DELETE FROM writes WHERE NOT EXISTS (SELECT 1 FROM checkpoints "
+                "WHERE checkpoints.thread_id = writes.thread_id AND checkpoints.thread_ts = writes.thread_ts)"
+            )
+        if runs or checkpoints:
+            with self.saver.lock:
+                free_pages = self._db.execute("PRAGMA freelist_count").fetchone()[0]
+                pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+                if free_pages >= pages * VACUUM_FREE_SHARE:
+                    self._db.execute("VACUUM")
+            logger.info(f"Pruned {runs} runs and {checkpoints} checkpoints from {self.path}")
+        return {"runs": runs, "checkpoints": checkpoints}
+
+    def blob_refs(self) -> Set[str]:
+        """Digests of the State blobs the stored checkpoints and their pending writes refer to."""
+        digests = set()
+        with self.saver.lock, self.saver.cursor(transaction=False) as cur:
+            for (data,) in cur.execute("SELECT checkpoint FROM checkpoints UNION ALL SELECT value FROM writes"):
+                digests.update(digest.decode("ascii") for digest in _BLOB_REF.findall(bytes(data)))
+        return digests
+
+    def close(self):
+        self._db.close()
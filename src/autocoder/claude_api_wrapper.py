@@ -1,37 +1,366 @@
+import time
+import asyncio
 import logging
-from typing import Dict, Any, List
-from anthropic import Anthropic
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from anthropic import Anthropic, AsyncAnthropic
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from .response_cache import ResponseCache, request_key
+from .request_scheduler import RequestScheduler
+from .telemetry import MetricsWriter
+from .model_router import ModelRouter
+from .singleflight import SingleFlight
+from .replay import http_client_from_env
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODEL = "claude-3-opus-20240229"
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUEST_TIMEOUT = 600.0
+# Prompt caching is a beta feature for this API version; requests with
+# cache_control blocks have to opt in with this header.
+PROMPT_CACHING_BETA = "prompt-caching-2024-07-31"
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+
+def to_anthropic_messages(messages: List[Any]) -> List[Dict[str, Any]]:
+    """Converts LangChain messages to the format expected by the Anthropic API; dicts pass through."""
+    anthropic_messages = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage):
+            anthropic_messages.append({"role": "user", "content": msg.content})
+        elif isinstance(msg, AIMessage):
+            anthropic_messages.append({"role": "assistant", "content": msg.content})
+        elif isinstance(msg, SystemMessage):
+            anthropic_messages.append({"role": "system", "content": msg.content})
+        elif isinstance(msg, dict):
+            anthropic_messages.append(msg)
+    return anthropic_messages
+
+
+def cached_prefix_block(text: str) -> Dict[str, Any]:
+    """A text content block marked as the end of a prompt prefix the API should cache."""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def uses_prompt_cache(messages: List[Dict[str, Any]]) -> bool:
+    return any(isinstance(block, dict) and "cache_control" in block
+               for msg in messages if isinstance(msg.get("content"), list) for block in msg["content"])
+
+
+def usage_counts(usage: Any) -> Dict[str, int]:
+    """
+    Token counts of a response's usage. The cache fields are only reported
+    for requests using prompt caching and count 0 otherwise.
+    """
+    return {field: getattr(usage, field, None) or 0 for field in USAGE_FIELDS}
+
+
+def stream_metrics(started: float, first_token: float, finished: float, output_tokens: int) -> Dict[str, float]:
+    """
+    Time to first token and generation speed of a streamed response, from
+    perf_counter() readings. tokens_per_second counts from the first token, so
+    it measures generation rather than queueing and prompt processing.
+    """
+    generating = finished - first_token
+    return {
+        "ttft": first_token - started,
+        "duration": finished - started,
+        "output_tokens": output_tokens,
+        "tokens_per_second": output_tokens / generating if generating > 0 else 0.0,
+    }
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Tokens a request counts against the tokens-per-minute limit: its prompt plus the most it may generate."""
+    # Imported here because the file_listing package imports this module
+    from .file_listing.packer import estimate_tokens
+    tokens = request["max_tokens"]
+    for msg in request["messages"]:
+        content = msg.get("content")
+        for block in [content] if isinstance(content, str) else content or []:
+            tokens += estimate_tokens(block if isinstance(block, str) else block.get("text", ""))
+    return tokens
+
+
 class ClaudeAPIWrapper:
-    def __init__(self, api_key: str):
-        self.client = Anthropic(api_key=api_key)
-        self.model = "claude-3-opus-20240229"
+    def __init__(self, api_key: str, response_cache: Optional[ResponseCache] = None,
+                 base_url: Optional[str] = None, scheduler: Optional[RequestScheduler] = None,
+                 metrics: Optional[MetricsWriter] = None, router: Optional[ModelRouter] = None):
+        self.client = self._client(api_key, base_url)
+        self.model = DEFAULT_MODEL
+        self.response_cache = response_cache
+        self.scheduler = scheduler or RequestScheduler()
+        self.router = router or ModelRouter()
+        # Identical requests made while one is in flight share its response
+        self.singleflight = SingleFlight()
+        # Every call is recorded here when set; args may name the calling node as 'node'
+        self.metrics = metrics
+        # Tokens used by every request made through this wrapper, by USAGE_FIELDS
+        self.usage = Counter()
+
+    def _client(self, api_key: str, base_url: Optional[str]):
+        # Retries are left to the scheduler, which knows about every request in flight
+        return Anthropic(api_key=api_key, base_url=base_url, max_retries=0,
+                         http_client=http_client_from_env())
 
     def generate_response(self, state: Dict[str, Any], args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generates a completion for args: 'messages', 'max_tokens' and
+        optionally 'temperature', plus either a 'model' or a capability 'tier'
+        (see ModelRouter). With a tier, a 'validate' callable may check the
+        response text; a response it rejects is asked again one tier up.
+        """
+        while True:
+            result = self._generate(args)
+            escalated_args = self._escalation(args, result)
+            if escalated_args is None:
+                return result
+            args = escalated_args
+
+    def _generate(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
         try:
-            messages = args.get('messages', [])
-            max_tokens = args.get('max_tokens', 1000)
-
-            # Convert messages to the format expected by Anthropic API
-            anthropic_messages = []
-            for msg in messages:
-                if isinstance(msg, HumanMessage):
-                    anthropic_messages.append({"role": "user", "content": msg.content})
-                elif isinstance(msg, AIMessage):
-                    anthropic_messages.append({"role": "assistant", "content": msg.content})
-                elif isinstance(msg, SystemMessage):
-                    anthropic_messages.append({"role": "system", "content": msg.content})
-
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                messages=anthropic_messages
-            )
-
-            return {"response": response.content[0].text}
+            request, key = self._prepare(args)
+            if self.response_cache is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    logger.info(f"Response cache hit in {(time.perf_counter() - started) * 1000:.1f} ms")
+                    self._record_call(args, started, cached=True)
+                    return cached
+
+            def send() -> Dict[str, Any]:
+                raw = self.scheduler.call(lambda: self.client.messages.with_raw_response.create(**request),
+                                          estimate_request_tokens(request))
+                return self._complete(raw.parse(), key)
+
+            result, shared = self.singleflight.do(key, send)
+            return self._finish(args, started, result, shared)
         except Exception as e:
             logger.error(f"An error occurred in generate_response: {str(e)}")
+            self._record_call(args, started, error=str(e))
             return {"error": f"An error occurred: {str(e)}"}
+
+    def stream_response(self, args: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Streams a completion for the same args as generate_response. The
+        tokens have been shown by the time the response could be validated,
+        so streamed responses are never escalated.
+
+        Yields:
+        Dict[str, Any]: {'type': 'token', 'text': ...} for each piece of text
+        as it arrives, then one {'type': 'done', 'response': ...} event with
+        the whole text and its timing (see stream_metrics), or
+        {'type': 'error', 'error': ...} if the request failed. A cached
+        response is yielded as a single token.
+        """
+        started = time.perf_counter()
+        try:
+            request, key = self._prepare(args)
+            if self.response_cache is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    now = time.perf_counter()
+                    yield {"type": "token", "text": cached["response"]}
+                    yield {"type": "done", "response": cached["response"], "cached": True,
+                           **stream_metrics(started, now, now, 0)}
+                    self._record_call(args, started, cached=True)
+                    return
+
+            pieces = []
+            first_token = None
+            # The slot is held until the stream ends; only opening the stream is retried
+            with self.scheduler.slot(estimate_request_tokens(request)):
+                stream = self.scheduler.send(lambda: self.client.messages.stream(**request).__enter__())
+                try:
+                    for text in stream.text_stream:
+                        if first_token is None:
+                            first_token = time.perf_counter()
+                        pieces.append(text)
+                        yield {"type": "token", "text": text}
+                    usage = self._record_usage(stream.get_final_message().usage)
+                finally:
+                    stream.close()
+            finished = time.perf_counter()
+
+            result = {"response": "".join(pieces)}
+            if self.response_cache is not None:
+                self.response_cache.put(key, result)
+            metrics = stream_metrics(started, first_token or finished, finished, usage["output_tokens"])
+            logger.info(f"First token after {metrics['ttft']:.2f} s, {usage['output_tokens']} tokens "
+                        f"at {metrics['tokens_per_second']:.1f} tokens/s")
+            self._record_call(args, started, usage, ttft=round(metrics["ttft"], 4))
+            yield {"type": "done", "cached": False, **result, **metrics, "usage": usage}
+        except Exception as e:
+            logger.error(f"An error occurred in stream_response: {str(e)}")
+            self._record_call(args, started, error=str(e))
+            yield {"type": "error", "error": f"An error occurred: {str(e)}"}
+
+    def _prepare(self, args: Dict[str, Any]):
+        """Builds the Messages request for args and its key (see request_key)."""
+        request = {
+            "model": self._model(args),
+            "max_tokens": args.get('max_tokens', 1000),
+            "messages": to_anthropic_messages(args.get('messages', [])),
+        }
+        temperature = args.get('temperature')
+        if temperature is not None:
+            request["temperature"] = temperature
+        if uses_prompt_cache(request["messages"]):
+            request["extra_headers"] = {"anthropic-beta": PROMPT_CACHING_BETA}
+        return request, request_key(request["model"], request["messages"], request["max_tokens"], temperature)
+
+    def _complete(self, response: Any, key: str) -> Dict[str, Any]:
+        """Caches a new response and records its usage; runs once per API call, however many callers share it."""
+        result = {"response": response.content[0].text}
+        if self.response_cache is not None:
+            self.response_cache.put(key, result)
+        return {**result, "usage": self._record_usage(response.usage)}
+
+    def _finish(self, args: Dict[str, Any], started: float, result: Dict[str, Any], shared: bool) -> Dict[str, Any]:
+        if shared:
+            # The tokens were paid for, and are reported, by the caller that made the call
+            self._record_call(args, started, coalesced=True)
+            return {"response": result["response"]}
+        self._record_call(args, started, result["usage"])
+        return result
+
+    def _record_usage(self, usage: Any) -> Dict[str, int]:
+        counts = usage_counts(usage)
+        self.usage.update(counts)
+        self.usage["requests"] += 1
+        if counts["cache_read_input_tokens"] or counts["cache_creation_input_tokens"]:
+            logger.info(f"Prompt cache: {counts['cache_read_input_tokens']} tokens read, "
+                        f"{counts['cache_creation_input_tokens']} written, {counts['input_tokens']} uncached")
+        return counts
+
+    def _model(self, args: Dict[str, Any]) -> str:
+        if args.get('model'):
+            return args['model']
+        if args.get('tier'):
+            return self.router.model_for(args['tier'])
+        return self.model
+
+    def _escalation(self, args: Dict[str, Any], result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The args to ask again with, one tier up, if result fails the args' validator; None to keep result."""
+        tier, validate = args.get('tier'), args.get('validate')
+        if tier is None or validate is None or args.get('model') or 'error' in result or validate(result['response']):
+            return None
+        # Cached results carry no usage and were not recorded as calls
+        if 'usage' in result:
+            self.router.mark_escalated(tier, self.router.model_for(tier))
+        next_tier = self.router.next_tier(tier)
+        if next_tier is None:
+            logger.warning(f"Response from the {tier} model failed validation; no larger model to ask")
+            return None
+        logger.info(f"Response from the {tier} model failed validation, asking the {next_tier} model")
+        return {**args, 'tier': next_tier}
+
+    def _record_call(self, args: Dict[str, Any], started: float, usage: Optional[Dict[str, int]] = None,
+                     cached: bool = False, error: Optional[str] = None, **fields: Any):
+        latency = time.perf_counter() - started
+        model = self._model(args)
+        tier = args.get('tier')
+        if tier is not None and not args.get('model') and usage is not None:
+            self.router.record(tier, model, latency)
+        if self.metrics is not None:
+            if tier is not None:
+                fields["tier"] = tier
+            self.metrics.record(args.get('node', 'unknown'), model, latency, usage, cached, error, **fields)
+
+
+class AsyncClaudeAPIWrapper(ClaudeAPIWrapper):
+    """
+    ClaudeAPIWrapper on AsyncAnthropic, for workflows that need several
+    completions at once. generate_many() runs requests concurrently, at most
+    max_concurrency at a time, and returns their results in request order.
+    """
+
+    def __init__(self, api_key: str, response_cache: Optional[ResponseCache] = None,
+                 base_url: Optional[str] = None, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT, scheduler: Optional[RequestScheduler] = None,
+                 metrics: Optional[MetricsWriter] = None, router: Optional[ModelRouter] = None):
+        super().__init__(api_key, response_cache=response_cache, base_url=base_url,
+                         scheduler=scheduler or RequestScheduler(max_concurrency=max_concurrency),
+                         metrics=metrics, router=router)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    def _client(self, api_key: str, base_url: Optional[str]):
+        return AsyncAnthropic(api_key=api_key, base_url=base_url, max_retries=0,
+                              http_client=http_client_from_env(asynchronous=True))
+
+    async def generate(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async counterpart of generate_response. args may also carry a
+        "timeout" in seconds for each request, retries included.
+        """
+        while True:
+            result = await self._generate_async(args)
+            escalated_args = self._escalation(args, result)
+            if escalated_args is None:
+                return result
+            args = escalated_args
+
+    async def _generate_async(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        timeout = args.get('timeout') or self.timeout
+        started = time.perf_counter()
+        try:
+            request, key = self._prepare(args)
+            if self.response_cache is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    self._record_call(args, started, cached=True)
+                    return cached
+
+            async def send() -> Dict[str, Any]:
+                raw = await self.scheduler.call_async(
+                    lambda: self.client.messages.with_raw_response.create(**request),
+                    estimate_request_tokens(request))
+                return self._complete(raw.parse(), key)
+
+            result, shared = await asyncio.wait_for(self.singleflight.do_async(key, send), timeout)
+            return self._finish(args, started, result, shared)
+        except asyncio.TimeoutError:
+            logger.error(f"Request timed out after {timeout} seconds")
+            self._record_call(args, started, error="timeout")
+            return {"error": f"Request timed out after {timeout} seconds"}
+        except Exception as e:
+            logger.error(f"An error occurred in generate: {str(e)}")
+            self._record_call(args, started, error=str(e))
+            return {"error": f"An error occurred: {str(e)}"}
+
+    async def generate_many(self, requests: Iterable[Dict[str, Any]],
+                            max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Runs requests concurrently with at most max_concurrency in flight.
+
+        Args:
+        requests (Iterable[Dict[str, Any]]): generate() args for each request.
+        A generator is only advanced when a slot frees up, so at most
+        max_concurrency requests are built and held at a time.
+        max_concurrency (Optional[int]): Overrides the wrapper's limit for this batch.
+
+        Returns:
+        List[Dict[str, Any]]: One result per request, in the order of requests;
+        a failed or timed out request gives an {'error': ...} result without
+        affecting the others. Cancelling the call cancels every request still
+        waiting or in flight.
+        """
+        pending = enumerate(requests)
+        results: Dict[int, Dict[str, Any]] = {}
+
+        async def worker():
+            for index, args in pending:
+                results[index] = await self.generate(args)
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(max_concurrency or self.max_concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+        return [results[index] for index in range(len(results))]
+
+    async def close(self):
+        await self.client.close()
@@ -0,0 +1,112 @@
+# Entry point of the `autocoder` command.
+#
+# When `autocoder serve` is running for the project in the current directory,
+# the command is forwarded to it over a Unix domain socket and its output is
+# streamed back, so the CLI skips importing langgraph, langchain_core and
+# anthropic and rebuilding project state on every invocation. Otherwise the
+# command runs in this process, as it always has. This module only uses the
+# standard library, to keep that path fast.
+import os
+import sys
+import json
+import socket
+import hashlib
+import tempfile
+from typing import Dict, List, Optional, TextIO
+
+SOCKET_FILENAME = "daemon.sock"
+# Set to 0 to always run in-process, even with a daemon running
+DAEMON_ENV = "AUTOCODER_DAEMON"
+# Environment variables the daemon takes from each client for the command it runs
+FORWARDED_ENV_PREFIXES = ("ANTHROPIC_", "CLAUDE_", "AUTOCODER_")
+# sun_path is 108 bytes on Linux and 104 on macOS, including the terminating NUL
+MAX_SOCKET_PATH = 100
+
+
+def socket_path(project_root: str) -> str:
+    """The daemon socket of a project: .autocoder/daemon.sock, or one in the temp directory if that is too long."""
+    root = os.path.realpath(str(project_root))
+    path = os.path.join(root, ".autocoder", SOCKET_FILENAME)
+    if len(path.encode("utf-8")) <= MAX_SOCKET_PATH:
+        return path
+    digest = hashlib.sha1(root.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"autocoder-{digest}.sock")
+
+
+def forwarded_env() -> Dict[str, str]:
+    return {name: value for name, value in os.environ.items() if name.startswith(FORWARDED_ENV_PREFIXES)}
+
+
+def connect(project_root: str) -> Optional[socket.socket]:
+    """A connection to the project's daemon, or None if none is running."""
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = socket_path(project_root)
+    if not os.path.exists(path):
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path)
+    except OSError:
+        # A socket left behind by a daemon that did not exit cleanly
+        connection.close()
+        return None
+    return connection
+
+
+def forward(argv: List[str], project_root: str, stdout: Optional[TextIO] = None,
+            stderr: Optional[TextIO] = None) -> Optional[int]:
+    """
+    Runs a command in the project's daemon, writing its output to stdout and
+    stderr (sys.stdout and sys.stderr by default) as it arrives. Returns the
+    command's exit code, or None if there is no daemon to run it, or it
+    declined to (the caller then runs it in-process).
+    """
+    # Taken before the request is sent: a daemon in this process (as in the
+    # tests) replaces sys.stdout while it runs the command
+    stdout, stderr = stdout or sys.stdout, stderr or sys.stderr
+    connection = connect(project_root)
+    if connection is None:
+        return None
+    started = False
+    try:
+        request = {"argv": argv, "cwd": os.path.realpath(project_root), "env": forwarded_env()}
+        connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        for line in connection.makefile("r", encoding="utf-8"):
+            message = json.loads(line)
+            if message["type"] == "unavailable":
+                return None
+            started = True
+            if message["type"] == "stdout":
+                stdout.write(message["text"])
+                stdout.flush()
+            elif message["type"] == "stderr":
+                stderr.write(message["text"])
+                stderr.flush()
+            elif message["type"] == "exit":
+                return message["code"]
+    except (OSError, ValueError):
+        if not started:
+            return None
+    except KeyboardInterrupt:
+        stderr.write("\nInterrupted. The command runs on to the end in the daemon.\n")
+        return 130
+    finally:
+        connection.close()
+    # The daemon went away in the middle of the command
+    stderr.write("Error: The autocoder daemon stopped before the command finished.\n")
+    return 1
+
+
+def main():
+    argv = sys.argv[1:]
+    if argv[:1] != ["serve"] and os.environ.get(DAEMON_ENV) != "0":
+        code = forward(argv, os.getcwd())
+        if code is not None:
+            sys.exit(code)
+    from .autocoder import main as run_in_process
+    run_in_process()
+
+
+if __name__ == "__main__":
+    main()
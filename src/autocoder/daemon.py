@@ -0,0 +1,139 @@
+import io
+import os
+import json
+import signal
+import logging
+import threading
+import contextlib
+import socketserver
+from typing import Any, Callable, Dict, List
+from .client import FORWARDED_ENV_PREFIXES, connect, socket_path
+
+logger = logging.getLogger(__name__)
+
+
+class _MessageWriter(io.TextIOBase):
+    """A text stream that sends everything written to it to a client as {"type": stream, "text": ...} lines."""
+
+    def __init__(self, send: Callable[[Dict[str, Any]], None], stream: str):
+        self._send = send
+        self._stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            self._send({"type": self._stream, "text": text})
+        return len(text)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        self.server.run(request, self._send)
+
+    def _send(self, message: Dict[str, Any]):
+        try:
+            self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            # The client went away; the command still runs to the end, as it would have in-process
+            pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Runs CLI commands for clients of one project, in one long-lived process.
+
+    The modules, the file cache index, the blob store, the ignore matcher and
+    the file manifest stay loaded between commands. Commands run one at a
+    time: they print to sys.stdout, which is redirected to the client for the
+    duration of the command, and see the client's ANTHROPIC_*, CLAUDE_* and
+    AUTOCODER_* environment variables instead of the daemon's.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, project_root: str, run_command: Callable[[List[str]], Any]):
+        self.project_root = os.path.realpath(str(project_root))
+        self.run_command = run_command
+        self.commands = 0
+        self._command_lock = threading.Lock()
+        # Only the user running the daemon may connect: commands run with their API key
+        previous_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path(self.project_root), _RequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def run(self, request: Dict[str, Any], send: Callable[[Dict[str, Any]], None]):
+        argv = request.get("argv", [])
+        if request.get("cwd") != self.project_root or argv[:1] == ["serve"]:
+            send({"type": "unavailable", "reason": f"This daemon serves {self.project_root}"})
+            return
+        with self._command_lock:
+            self.commands += 1
+            logger.info(f"Running command {self.commands}: {argv}")
+            code = 0
+            with _client_environment(request.get("env", {})), \
+                    contextlib.redirect_stdout(_MessageWriter(send, "stdout")), \
+                    contextlib.redirect_stderr(_MessageWriter(send, "stderr")):
+                try:
+                    self.run_command(argv)
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except Exception as e:
+                    logger.exception(f"Command {argv} failed: {str(e)}")
+                    send({"type": "stderr", "text": f"Error: {str(e)}\n"})
+                    code = 1
+        send({"type": "exit", "code": code})
+
+
+@contextlib.contextmanager
+def _client_environment(env: Dict[str, str]):
+    previous = {name: value for name, value in os.environ.items() if name.startswith(FORWARDED_ENV_PREFIXES)}
+    for name in previous:
+        del os.environ[name]
+    os.environ.update({name: value for name, value in env.items() if name.startswith(FORWARDED_ENV_PREFIXES)})
+    try:
+        yield
+    finally:
+        for name in [name for name in os.environ if name.startswith(FORWARDED_ENV_PREFIXES)]:
+            del os.environ[name]
+        os.environ.update(previous)
+
+
+def serve(project_root: str, run_command: Callable[[List[str]], Any], warm_up: Callable[[], Any] = None):
+    """
+    Serves commands for the project until interrupted or terminated. warm_up
+    runs once before the first client is accepted.
+    """
+    connection = connect(project_root)
+    if connection is not None:
+        connection.close()
+        print(f"An autocoder daemon is already running for this project on {socket_path(project_root)}.")
+        return
+    path = socket_path(project_root)
+    if os.path.exists(path):
+        # Left behind by a daemon that did not exit cleanly
+        os.unlink(path)
+
+    server = DaemonServer(project_root, run_command)
+    # SIGTERM stops the server like Ctrl-C; shutdown() must not run on the serving thread
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    try:
+        if warm_up is not None:
+            warm_up()
+        print(f"Autocoder daemon listening on {path}. Stop it with Ctrl-C.", flush=True)
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+        print(f"Autocoder daemon stopped after {server.commands} commands.")
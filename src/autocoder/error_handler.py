@@ -4,6 +4,9 @@ from typing import Union, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Longer state values are described in error reports rather than copied into them
+MAX_REPORTED_VALUE_CHARS = 200
+
 class ErrorHandler:
     @staticmethod
     def handle_error(error: Union[str, Exception], context: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -45,13 +48,33 @@ class ErrorHandler:
         error_report = ErrorHandler.handle_error(error, context)
         logger.error(f"Error Report: {error_report}")
 
+    @staticmethod
+    def summarize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A compact copy of a state for error reports: short strings, numbers and
+        blob references are kept, anything larger is replaced by its type and size.
+        """
+        summary = {}
+        for key, value in state.items():
+            if value is None or isinstance(value, (bool, int, float)):
+                summary[key] = value
+            elif isinstance(value, str) and len(value) <= MAX_REPORTED_VALUE_CHARS:
+                summary[key] = value
+            elif hasattr(value, "__len__"):
+                summary[key] = f"<{type(value).__name__} of length {len(value)}>"
+            else:
+                summary[key] = f"<{type(value).__name__}>"
+        return summary
+
     @staticmethod
     def wrap_node(node_func):
         def wrapped_node(state: Dict[str, Any]) -> Dict[str, Any]:
             try:
                 return node_func(state)
             except Exception as e:
-                error_report = ErrorHandler.handle_error(e, context={"node": node_func.__name__, "state": state})
+                # The report ends up in the state, so it must not hold another copy of it
+                error_report = ErrorHandler.handle_error(
+                    e, context={"node": node_func.__name__, "state": ErrorHandler.summarize_state(state)})
                 state["error"] = error_report
                 return state
         return wrapped_node
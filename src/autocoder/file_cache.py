@@ -0,0 +1,305 @@
+import os
+import json
+import time
+import atexit
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = "cache"
+CACHE_DB_FILENAME = "blobs.db"
+CACHE_SCHEMA_VERSION = 1
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Bigger files are still hashed and indexed, but their bodies are read from the project.
+MAX_BLOB_SIZE = 4 * 1024 * 1024
+# Pending index updates and LRU touches are committed in batches of this size.
+FLUSH_EVERY = 512
+# A file whose mtime is this close to the moment it was read may change again
+# within the same timestamp tick, so its index entry is not persisted.
+RACY_WINDOW_NS = 1_000_000_000
+DIGEST_SIZE = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, ino INTEGER, mtime_ns INTEGER, size INTEGER, digest TEXT
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY, data BLOB, size INTEGER, last_access REAL
+);
+CREATE INDEX IF NOT EXISTS blobs_last_access ON blobs (last_access);
+CREATE TABLE IF NOT EXISTS derived (
+    kind TEXT, digest TEXT, value TEXT, PRIMARY KEY (kind, digest)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
+
+
+def decode_text(data: bytes) -> str:
+    """
+    Decodes file bytes exactly as open(path, 'r', encoding='utf-8').read()
+    would, including the universal-newlines translation.
+    """
+    text = data.decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+class FileCache:
+    """
+    Content-addressed store for project file bodies in .autocoder/cache.
+
+    A stat index maps each path to (inode, mtime_ns, size, digest), so a file
+    whose stat is unchanged is served from the store without being opened,
+    and values derived from its content (token counts, summaries, parse
+    results) are looked up by digest. Blobs live in one SQLite database, which
+    keeps a warm run to a single file in the page cache instead of one open()
+    per project file, and are evicted least-recently-used once the store grows
+    past max_bytes.
+
+    Without an .autocoder directory the cache is a pass-through and reads
+    every file from the project.
+    """
+
+    def __init__(self, project_root: str, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.project_root = str(project_root)
+        self.cache_dir = cache_dir or os.path.join(self.project_root, ".autocoder", CACHE_DIRNAME)
+        self.max_bytes = max_bytes
+        self.stats = Counter()
+        self._lock = threading.RLock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._index: Dict[str, Tuple[int, int, int, str]] = {}
+        self._pending_files: Dict[str, Optional[Tuple[int, int, int, str]]] = {}
+        self._touched: Dict[str, float] = {}
+        self._pending_writes = 0
+        self._total_bytes = 0
+        if os.path.isdir(os.path.dirname(self.cache_dir)):
+            self._open()
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def _open(self):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.cache_dir, CACHE_DB_FILENAME),
+                                 timeout=30, check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(_SCHEMA)
+            row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is not None and row[0] != str(CACHE_SCHEMA_VERSION):
+                logger.info("File cache has an outdated format and will be rebuilt.")
+                db.executescript("DELETE FROM files; DELETE FROM blobs; DELETE FROM derived;")
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(CACHE_SCHEMA_VERSION),))
+            self._index = {row[0]: tuple(row[1:]) for row in db.execute("SELECT * FROM files")}
+            self._total_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            self._db = db
+        except sqlite3.Error as e:
+            logger.warning(f"File cache unavailable, reading files directly: {e}")
+            self._db = None
+
+    def _path(self, rel_path: str) -> str:
+        return os.path.join(self.project_root, rel_path)
+
+    def _fresh_entry(self, rel_path: str, st: os.stat_result) -> Optional[str]:
+        entry = self._index.get(rel_path)
+        if entry is not None and entry[:3] == (st.st_ino, st.st_mtime_ns, st.st_size):
+            return entry[3]
+        return None
+
+    def load(self, rel_path: str) -> Tuple[str, bytes]:
+        """
+        Returns the digest and bytes of a project file, from the store when its
+        stat is unchanged. Raises OSError like open() would.
+        """
+        st = os.stat(self._path(rel_path))
+        with self._lock:
+            digest = self._fresh_entry(rel_path, st)
+            if digest is not None and self._db is not None:
+                row = self._db.execute("SELECT data FROM blobs WHERE digest = ?", (digest,)).fetchone()
+                if row is not None:
+                    self.stats["hits"] += 1
+                    self._touched[digest] = time.time()
+                    return digest, bytes(row[0])
+
+        with open(self._path(rel_path), "rb") as f:
+            data = f.read()
+        self.stats["misses"] += 1
+        self.stats["bytes_read"] += len(data)
+        digest = content_digest(data)
+        with self._lock:
+            self._remember(rel_path, st, digest, len(data) == st.st_size)
+            if self._db is not None and len(data) <= MAX_BLOB_SIZE:
+                self._store_blob(digest, data)
+        return digest, data
+
+    def read_bytes(self, rel_path: str) -> bytes:
+        return self.load(rel_path)[1]
+
+    def read_text(self, rel_path: str) -> str:
+        """
+        Reads a project file as UTF-8 text. Raises OSError or UnicodeDecodeError
+        like open(path, 'r', encoding='utf-8').read() would.
+        """
+        return decode_text(self.load(rel_path)[1])
+
+    def digest(self, rel_path: str) -> Optional[str]:
+        """
+        Returns the content digest of a project file without reading it if its
+        stat is unchanged, or None if it cannot be read.
+        """
+        try:
+            st = os.stat(self._path(rel_path))
+        except OSError:
+            return None
+        with self._lock:
+            digest = self._fresh_entry(rel_path, st)
+        if digest is not None:
+            self.stats["index_hits"] += 1
+            return digest
+        try:
+            return self.load(rel_path)[0]
+        except OSError:
+            return None
+
+    def get_derived(self, kind: str, digest: str) -> Optional[Any]:
+        if self._db is None:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM derived WHERE kind = ? AND digest = ?", (kind, digest)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_derived(self, kind: str, digest: str, value: Any):
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO derived VALUES (?, ?, ?)", (kind, digest, json.dumps(value)))
+
+    def invalidate(self, rel_path: str):
+        with self._lock:
+            if self._index.pop(rel_path, None) is not None:
+                self._pending_files[rel_path] = None
+                self._maybe_flush()
+
+    def _remember(self, rel_path: str, st: os.stat_result, digest: str, complete: bool):
+        entry = (st.st_ino, st.st_mtime_ns, st.st_size, digest)
+        self._index[rel_path] = entry
+        # Only trust the stat across runs if the file was read whole and had
+        # settled before we read it
+        if complete and st.st_mtime_ns + RACY_WINDOW_NS <= time.time_ns():
+            self._pending_files[rel_path] = entry
+        else:
+            self._pending_files[rel_path] = None
+        self._maybe_flush()
+
+    def _store_blob(self, digest: str, data: bytes):
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?)", (digest, data, len(data), time.time()))
+        if cursor.rowcount:
+            self._total_bytes += len(data)
+            self.stats["stored"] += 1
+            if self._total_bytes > self.max_bytes:
+                self.evict()
+
+    def _maybe_flush(self):
+        self._pending_writes += 1
+        if self._pending_writes >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        """Commits pending index updates and LRU access times."""
+        with self._lock:
+            if self._db is None or not (self._pending_files or self._touched):
+                self._pending_files.clear()
+                self._touched.clear()
+                self._pending_writes = 0
+                return
+            try:
+                with self._db:
+                    self._db.execute("BEGIN")
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                        [(path,) + entry for path, entry in self._pending_files.items() if entry is not None])
+                    self._db.executemany(
+                        "DELETE FROM files WHERE path = ?",
+                        [(path,) for path, entry in self._pending_files.items() if entry is None])
+                    self._db.executemany(
+                        "UPDATE blobs SET last_access = ? WHERE digest = ?",
+                        [(accessed, digest) for digest, accessed in self._touched.items()])
+            except sqlite3.Error as e:
+                logger.warning(f"Could not update file cache index: {e}")
+            self._pending_files.clear()
+            self._touched.clear()
+            self._pending_writes = 0
+
+    def evict(self, target_bytes: Optional[int] = None):
+        """
+        Deletes least-recently-used blobs until the store is at most
+        target_bytes (90% of max_bytes by default), along with derived values
+        whose content is neither stored nor indexed any more.
+        """
+        if self._db is None:
+            return
+        target_bytes = int(self.max_bytes * 0.9) if target_bytes is None else target_bytes
+        with self._lock:
+            self.flush()
+            victims: List[Tuple[str, int]] = []
+            excess = self._total_bytes - target_bytes
+            for digest, size in self._db.execute("SELECT digest, size FROM blobs ORDER BY last_access"):
+                if excess <= 0:
+                    break
+                victims.append((digest, size))
+                excess -= size
+            if not victims:
+                return
+            self._db.executemany("DELETE FROM blobs WHERE digest = ?", [(digest,) for digest, _ in victims])
+            self._db.execute(
+                "DELETE FROM derived WHERE digest NOT IN (SELECT digest FROM blobs) "
+                "AND digest NOT IN (SELECT digest FROM files)")
+            self._total_bytes -= sum(size for _, size in victims)
+            self.stats["evicted"] += len(victims)
+            logger.debug(f"Evicted {len(victims)} blobs from the file cache")
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_caches: Dict[str, FileCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_file_cache(project_root: str) -> FileCache:
+    """
+    Returns the process-wide FileCache for a project, so every command and
+    node reading project files shares one index and one store.
+    """
+    key = os.path.realpath(str(project_root))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None or (cache.persistent is False and os.path.isdir(os.path.join(key, ".autocoder"))):
+            cache = _caches[key] = FileCache(key)
+        return cache
+
+
+@atexit.register
+def _flush_caches():
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.flush()
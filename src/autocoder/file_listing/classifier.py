@@ -0,0 +1,163 @@
+import os
+import json
+import codecs
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIER_VERSION = 1
+CLASSIFIER_FILENAME = "file_classes.json"
+
+# Only the head of a file is sniffed; the verdict is cached until the file changes.
+SNIFF_SIZE = 8 * 1024
+DEFAULT_MAX_FILE_SIZE = 10 * 1024 * 1024
+DEFAULT_MAX_TOTAL_SIZE = 200 * 1024 * 1024
+
+TEXT = "text"
+BINARY = "binary"
+NOT_UTF8 = "not_utf8"
+TOO_LARGE = "too_large"
+OVER_BUDGET = "over_budget"
+UNREADABLE = "unreadable"
+
+SKIP_REASONS = {
+    BINARY: "binary file",
+    NOT_UTF8: "not valid UTF-8",
+    TOO_LARGE: "exceeds the per-file size limit",
+    OVER_BUDGET: "exceeds the total size limit",
+    UNREADABLE: "unreadable",
+}
+
+
+def sniff_bytes(head: bytes, complete: bool) -> str:
+    """
+    Classifies the first bytes of a file. A NUL byte marks it as binary; text
+    must decode as UTF-8, allowing for a multi-byte character cut off at the
+    end of the sample unless the sample is the whole file.
+    """
+    if b"\0" in head:
+        return BINARY
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=complete)
+    except UnicodeDecodeError:
+        return NOT_UTF8
+    return TEXT
+
+
+class FileClassifier:
+    """
+    Decides which listed files are worth reading before any of them is opened
+    as text, so binaries and oversized files are skipped by a cheap check
+    instead of a failed decode.
+
+    Content verdicts are cached in .autocoder/file_classes.json keyed by
+    (inode, mtime_ns, size); a file is sniffed again only after it changes.
+    """
+
+    def __init__(self, project_root: str, max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+                 max_total_size: int = DEFAULT_MAX_TOTAL_SIZE, cache_path: Optional[str] = None):
+        self.project_root = str(project_root)
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.cache_path = cache_path or os.path.join(self.project_root, ".autocoder", CLASSIFIER_FILENAME)
+        self.verdicts: Dict[str, List] = {}
+        self.stats = {"sniffed": 0, "cached": 0}
+        self._loaded = False
+        self._dirty = False
+
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CLASSIFIER_VERSION:
+            self.verdicts = data.get("files", {})
+
+    def save(self):
+        if not self._dirty or not os.path.isdir(os.path.dirname(self.cache_path)):
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": CLASSIFIER_VERSION, "files": self.verdicts}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save file classification cache: {e}")
+
+    def classify(self, rel_path: str) -> Tuple[str, int]:
+        """
+        Classifies one file without reading more than SNIFF_SIZE bytes of it.
+
+        Returns:
+        Tuple[str, int]: The verdict (TEXT or one of the SKIP_REASONS keys) and
+        the file size in bytes.
+        """
+        if not self._loaded:
+            self.load()
+        try:
+            st = os.stat(os.path.join(self.project_root, rel_path))
+        except OSError:
+            return UNREADABLE, 0
+        if st.st_size > self.max_file_size:
+            return TOO_LARGE, st.st_size
+
+        key = [st.st_ino, st.st_mtime_ns, st.st_size]
+        cached = self.verdicts.get(rel_path)
+        if cached is not None and cached[:3] == key:
+            self.stats["cached"] += 1
+            return cached[3], st.st_size
+
+        try:
+            with open(os.path.join(self.project_root, rel_path), "rb") as f:
+                head = f.read(SNIFF_SIZE)
+        except OSError:
+            return UNREADABLE, st.st_size
+        verdict = sniff_bytes(head, complete=st.st_size <= SNIFF_SIZE)
+        self.stats["sniffed"] += 1
+        self.verdicts[rel_path] = key + [verdict]
+        self._dirty = True
+        return verdict, st.st_size
+
+    def classify_files(self, project_files: List[str]) -> Dict[str, str]:
+        """
+        Classifies project files in order, charging each text file against the
+        total size budget. Files that do not fit are skipped, but smaller ones
+        further down the list may still be included.
+
+        Returns:
+        Dict[str, str]: Skipped files mapped to their SKIP_REASONS key.
+        """
+        skipped = {}
+        total_size = 0
+        for rel_path in project_files:
+            verdict, size = self.classify(rel_path)
+            if verdict == TEXT and total_size + size > self.max_total_size:
+                verdict = OVER_BUDGET
+            if verdict == TEXT:
+                total_size += size
+            else:
+                skipped[rel_path] = verdict
+        # Forget files that are no longer listed so the cache does not grow forever
+        stale = self.verdicts.keys() - set(project_files)
+        for rel_path in stale:
+            del self.verdicts[rel_path]
+        self._dirty = self._dirty or bool(stale)
+        self.save()
+
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} files: {dict(self.summarize(skipped))}")
+        logger.debug(f"File classification: {self.stats['sniffed']} sniffed, {self.stats['cached']} cached")
+        return skipped
+
+    @staticmethod
+    def summarize(skipped: Dict[str, str]) -> Counter:
+        return Counter(skipped.values())
+
+    @staticmethod
+    def describe(verdict: str) -> str:
+        return SKIP_REASONS.get(verdict, verdict)
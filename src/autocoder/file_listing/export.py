@@ -0,0 +1,140 @@
+import os
+import mmap
+import codecs
+import logging
+from collections import Counter
+from typing import BinaryIO, Optional
+
+logger = logging.getLogger(__name__)
+
+# Below this size decoding and re-encoding is cheaper than the extra syscalls.
+ZERO_COPY_MIN_SIZE = 64 * 1024
+VALIDATE_CHUNK_SIZE = 1024 * 1024
+
+# Text-mode writes translate "\n" on platforms with another line separator,
+# so verbatim copies would no longer match the text path there.
+ZERO_COPY_SUPPORTED = os.linesep == "\n"
+
+
+def verbatim_char_count(fd: int, size: int) -> Optional[int]:
+    """
+    Checks that the first `size` bytes of fd read back unchanged through a
+    UTF-8 text-mode open(): valid UTF-8 and no carriage returns, which
+    universal newlines would rewrite.
+
+    Returns:
+    Optional[int]: Number of characters the text would decode to, or None if
+    the bytes cannot be copied verbatim.
+    """
+    if size == 0:
+        return 0
+    try:
+        with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+            if mm.find(b"\r") != -1:
+                return None
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            chars = 0
+            with memoryview(mm) as view:
+                for start in range(0, size, VALIDATE_CHUNK_SIZE):
+                    with view[start:start + VALIDATE_CHUNK_SIZE] as chunk:
+                        try:
+                            chars += len(decoder.decode(chunk))
+                        except UnicodeDecodeError:
+                            return None
+            chars += len(decoder.decode(b"", final=True))
+            return chars
+    except (UnicodeDecodeError, ValueError, OSError):
+        return None
+
+
+def copy_file_body(in_fd: int, out_fd: int, size: int) -> str:
+    """
+    Appends `size` bytes of in_fd to out_fd at its current position without
+    passing them through Python objects, preferring copy_file_range, then
+    sendfile, then a write from an mmap of the source.
+
+    Returns:
+    str: Name of the method that finished the copy.
+    """
+    offset = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while offset < size:
+                copied = os.copy_file_range(in_fd, out_fd, size - offset, offset_src=offset)
+                if copied == 0:
+                    break
+                offset += copied
+            if offset == size:
+                return "copy_file_range"
+        except OSError as e:
+            logger.debug(f"copy_file_range unavailable ({e}); falling back to sendfile")
+
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                sent = os.sendfile(out_fd, in_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            if offset == size:
+                return "sendfile"
+        except OSError as e:
+            logger.debug(f"sendfile unavailable ({e}); falling back to mmap")
+
+    with mmap.mmap(in_fd, size, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            while offset < size:
+                with view[offset:size] as chunk:
+                    offset += os.write(out_fd, chunk)
+    return "mmap"
+
+
+class ContextExporter:
+    """
+    Writes context text to a binary file, copying eligible file bodies
+    verbatim instead of decoding them into str and encoding them back.
+    """
+
+    def __init__(self, out: BinaryIO, min_size: int = ZERO_COPY_MIN_SIZE):
+        self.out = out
+        self.min_size = min_size
+        self.chars_written = 0
+        self.bytes_copied = 0
+        self.methods = Counter()
+
+    def write_text(self, text: str):
+        self.chars_written += len(text)
+        if not ZERO_COPY_SUPPORTED:
+            text = text.replace("\n", os.linesep)
+        self.out.write(text.encode("utf-8", "surrogateescape"))
+
+    def write_file(self, header: str, path: str) -> bool:
+        """
+        Writes header followed by the body of path, if the body can be copied
+        verbatim. Returns False without writing anything otherwise, leaving
+        the caller to fall back to its text path.
+        """
+        if not ZERO_COPY_SUPPORTED:
+            return False
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            size = os.fstat(fd).st_size
+            if size < self.min_size:
+                return False
+            chars = verbatim_char_count(fd, size)
+            if chars is None:
+                return False
+
+            self.write_text(header)
+            self.out.flush()
+            self.methods[copy_file_body(fd, self.out.fileno(), size)] += 1
+            # Resynchronise the buffered writer with the position the copy advanced
+            self.out.seek(0, os.SEEK_END)
+            self.chars_written += chars
+            self.bytes_copied += size
+            return True
+        finally:
+            os.close(fd)
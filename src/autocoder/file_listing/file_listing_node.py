@@ -1,9 +1,12 @@
 import os
 import logging
 from pathlib import Path
-import pathspec
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from ..claude_api_wrapper import ClaudeAPIWrapper
+from .ignore_matcher import IgnoreMatcher, get_ignore_matcher
+from .manifest import FileManifest
+from .classifier import FileClassifier, DEFAULT_MAX_FILE_SIZE, DEFAULT_MAX_TOTAL_SIZE
+from .packer import ContextPacker, context_token_budget
 
 logger = logging.getLogger(__name__)
 
@@ -16,61 +19,51 @@ class FileListingNode:
         try:
             self.project_root = Path(state['project_root'])
             ignore_spec = self.get_ignore_spec()
-            project_files = self.list_project_files(ignore_spec)
-            context = self.build_context(project_files)
-
-            return {
+            project_files = self.list_project_files(ignore_spec, full=state.get('full', False))
+            classifier = FileClassifier(
+                self.project_root,
+                max_file_size=state.get('max_file_size') or DEFAULT_MAX_FILE_SIZE,
+                max_total_size=state.get('max_total_size') or DEFAULT_MAX_TOTAL_SIZE,
+            )
+            skipped_files = classifier.classify_files(project_files)
+            result = {
                 'project_files': project_files,
                 'excluded_files': [str(pat) for pat in ignore_spec.patterns],
-                'context': context
+                'skipped_files': skipped_files,
+                'skipped_summary': dict(FileClassifier.summarize(skipped_files)),
             }
+            if not state.get('include_context', True):
+                return result
+
+            packed = self.build_context(project_files, skipped_files, state.get('token_budget'),
+                                        state.get('context_mode') or "full")
+            result.update({
+                'context': packed['context'],
+                'context_tokens': packed['tokens'],
+                'truncated_files': packed['truncated_files'],
+                'omitted_files': packed['omitted_files'],
+                'compression_ratio': packed.get('compression_ratio', 1.0),
+            })
+            return result
         except Exception as e:
             logger.error(f"Error in FileListingNode: {str(e)}")
             return {'error': str(e)}
 
-    def get_ignore_spec(self) -> pathspec.PathSpec:
-        patterns = []
-        gitignore_path = self.project_root / '.gitignore'
-        if gitignore_path.exists():
-            with gitignore_path.open('r') as f:
-                patterns.extend(f.read().splitlines())
-            logger.info("Read .gitignore and compiled ignore patterns.")
-        else:
-            logger.warning(".gitignore file not found.")
-
-        default_ignores = [
-            '.git/', '.hg/', '.svn/', '.idea/', '*.egg-info/',
-            '__pycache__/', '.DS_Store', '*.pyc', '.venv/',
-            'env/', 'build/', 'dist/', 'node_modules/',
-            '*.log', '*.tmp',
-        ]
-        patterns.extend(default_ignores)
-        return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
-
-    def list_project_files(self, ignore_spec: pathspec.PathSpec) -> List[str]:
-        project_files = []
-        for root, dirs, files in os.walk(self.project_root):
-            root_path = Path(root)
-            rel_root = root_path.relative_to(self.project_root)
-            dirs[:] = [d for d in dirs if not ignore_spec.match_file(str(rel_root / d) + '/')]
-            for file in files:
-                rel_path = rel_root / file
-                if not ignore_spec.match_file(str(rel_path)):
-                    project_files.append(str(rel_path))
-        return project_files
-
-    def build_context(self, project_files: List[str]) -> str:
-        context = "Project Files:\n"
-        context += "\n".join(project_files)
-        context += "\n\nFile Contents:\n"
+    def get_ignore_spec(self) -> IgnoreMatcher:
+        return get_ignore_matcher(self.project_root)
 
-        for file in project_files[:10]:  # Limit to first 10 files to avoid overwhelming the LLM
-            file_path = self.project_root / file
-            try:
-                with file_path.open('r', encoding='utf-8') as f:
-                    content = f.read()
-                context += f'\n\n#File {file}:\n{content[:1000]}'  # Limit each file to first 1000 characters
-            except Exception as e:
-                logger.warning(f"Could not read file {file}: {str(e)}")
+    def list_project_files(self, ignore_spec: IgnoreMatcher, full: bool = False) -> List[str]:
+        return FileManifest(self.project_root).list_project_files(ignore_spec, full=full)
 
-        return context
+    def build_context(self, project_files: List[str], skipped_files: Optional[Dict[str, str]] = None,
+                      token_budget: Optional[int] = None, mode: str = "full") -> Dict[str, Any]:
+        """
+        Packs as much of the project as fits in token_budget, most important
+        files first. Without a budget, the model's whole window minus room for
+        a default-sized response is used. In "skeleton" mode files are packed
+        as signatures and excerpts, so many more of them fit.
+        """
+        if token_budget is None:
+            model = getattr(self.claude_api, 'model', None)
+            token_budget = context_token_budget(model, max_output_tokens=1000)
+        return ContextPacker(self.project_root, mode=mode).pack(project_files, token_budget, skipped_files)
@@ -0,0 +1,436 @@
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from pathspec.patterns import GitWildMatchPattern
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IGNORES = [
+    '.git/', '.hg/', '.svn/', '.idea/', '*.egg-info/',
+    '__pycache__/', '.DS_Store', '*.pyc', '.venv/',
+    'env/', 'build/', 'dist/', 'node_modules/',
+    '*.log', '*.tmp', '.autocoder/',
+]
+
+GITIGNORE = '.gitignore'
+
+# Alternatives per combined regex; keeps compile time and memory per regex bounded.
+REGEX_CHUNK_SIZE = 512
+# Regex rules whose last segment ends (or else starts) with a literal of at least
+# this many characters are bucketed by it, so an entry is only tried against
+# rules its name can match.
+KEY_LENGTH = 3
+
+_UNANCHORED_PREFIX = '^(?:.+/)?'
+_DIR_SUFFIXES = ('(?:(?:/).*)?$', '(?:/).*$')
+_NAMED_GROUP = re.compile(r'(?<!\\)\(\?P<[^>]+>')
+_CAPTURING_GROUP = re.compile(r'(?<!\\)\((?!\?)')
+_SIMPLE_NAME = re.compile(r'[\w.\-~]+')
+_GLOB_CHARS = re.compile(r'[*?\[\\]')
+_LITERAL_TAIL = re.compile(r'[^*?\[\]\\/]*$')
+_LITERAL_HEAD = re.compile(r'[^*?\[\]\\/]*')
+
+# Depth of the .gitignore that defined a rule dominates its line number, so
+# deeper files override their ancestors and later lines override earlier ones.
+_DEPTH_SHIFT = 32
+
+
+class IgnoreRule:
+    __slots__ = ('pattern', 'priority', 'include', 'regex', 'literal_segments', 'max_depth', 'suffix_key', 'prefix_key')
+
+    def __init__(self, pattern: str, priority: int, include: bool, regex: str, body: str):
+        self.pattern = pattern
+        self.priority = priority
+        self.include = include
+        self.regex = regex
+        self.literal_segments = _literal_segments(body)
+        # Without `**` an anchored pattern spans a fixed number of segments. Deeper
+        # paths only match through an ancestor directory, which an ignoring rule
+        # has already pruned, so only negations need to stay active below it.
+        self.max_depth = None if '**' in body or not include else len(body.strip('/').split('/'))
+        last_segment = body.rstrip('/').rsplit('/', 1)[-1]
+        tail = _LITERAL_TAIL.search(last_segment).group()
+        head = _LITERAL_HEAD.match(last_segment).group()
+        self.suffix_key = tail[-KEY_LENGTH:] if len(tail) >= KEY_LENGTH else None
+        self.prefix_key = head[:KEY_LENGTH] if len(head) >= KEY_LENGTH else None
+
+    def __str__(self) -> str:
+        return self.pattern
+
+
+def _literal_segments(body: str) -> List[str]:
+    """Leading path segments of an anchored pattern that contain no glob characters."""
+    segments = []
+    for segment in body.strip('/').split('/'):
+        if not segment or _GLOB_CHARS.search(segment):
+            break
+        segments.append(segment)
+    return segments
+
+
+def _name_only_regex(regex: str) -> Optional[str]:
+    """
+    Rewrites an unanchored pattern regex to match an entry name on its own,
+    or returns None when the pattern needs to see the rest of the path.
+    """
+    if not regex.startswith(_UNANCHORED_PREFIX):
+        return None
+    rest = regex[len(_UNANCHORED_PREFIX):]
+    for suffix in _DIR_SUFFIXES:
+        if rest.endswith(suffix):
+            if '/' in rest[:-len(suffix)].replace('[^/]', ''):
+                return None
+            return '^' + rest
+    return None
+
+
+def _compile_alternatives(rules: List[IgnoreRule]) -> List[Tuple["re.Pattern", List[IgnoreRule]]]:
+    """
+    Compiles rules, highest priority first, into combined regexes where each
+    alternative is one capturing group, so match.lastindex names the winner.
+    """
+    ordered = sorted(rules, key=lambda rule: rule.priority, reverse=True)
+    chunks = []
+    for start in range(0, len(ordered), REGEX_CHUNK_SIZE):
+        chunk = ordered[start:start + REGEX_CHUNK_SIZE]
+        combined = '|'.join(f'({rule.regex})' for rule in chunk)
+        chunks.append((re.compile(combined), chunk))
+    return chunks
+
+
+class _RegexRules:
+    """Regex rules grouped by the literal suffix or prefix an entry name must have."""
+
+    def __init__(self, rules: List[IgnoreRule]):
+        by_suffix: Dict[str, List[IgnoreRule]] = {}
+        by_prefix: Dict[str, List[IgnoreRule]] = {}
+        generic = []
+        for rule in rules:
+            if rule.suffix_key is not None:
+                by_suffix.setdefault(rule.suffix_key, []).append(rule)
+            elif rule.prefix_key is not None:
+                by_prefix.setdefault(rule.prefix_key, []).append(rule)
+            else:
+                generic.append(rule)
+        self.by_suffix = {key: _compile_alternatives(group) for key, group in by_suffix.items()}
+        self.by_prefix = {key: _compile_alternatives(group) for key, group in by_prefix.items()}
+        self.generic = _compile_alternatives(generic)
+
+    def match(self, name: str, subject: str, best: Optional[IgnoreRule]) -> Optional[IgnoreRule]:
+        candidates = (self.by_suffix.get(name[-KEY_LENGTH:]), self.by_prefix.get(name[:KEY_LENGTH]), self.generic)
+        for chunks in candidates:
+            if not chunks:
+                continue
+            for regex, rules in chunks:
+                if best is not None and rules[0].priority < best.priority:
+                    break
+                match = regex.match(subject)
+                if match:
+                    rule = rules[match.lastindex - 1]
+                    if best is None or rule.priority > best.priority:
+                        best = rule
+                    break
+        return best
+
+
+class _GlobalRules:
+    """Rules that match on an entry's name alone, wherever it sits below their .gitignore."""
+
+    def __init__(self):
+        self.literal_any: Dict[str, IgnoreRule] = {}
+        self.literal_dir: Dict[str, IgnoreRule] = {}
+        self.suffixes: Dict[int, Dict[str, IgnoreRule]] = {}
+        self.basename_rules: List[IgnoreRule] = []
+        self.basename_regexes = _RegexRules([])
+
+    def extend(self, other: "_GlobalRules") -> "_GlobalRules":
+        merged = _GlobalRules()
+        merged.literal_any = dict(self.literal_any)
+        merged.literal_any.update(other.literal_any)
+        merged.literal_dir = dict(self.literal_dir)
+        merged.literal_dir.update(other.literal_dir)
+        merged.suffixes = {length: dict(table) for length, table in self.suffixes.items()}
+        for length, table in other.suffixes.items():
+            merged.suffixes.setdefault(length, {}).update(table)
+        merged.basename_rules = self.basename_rules + other.basename_rules
+        merged.compile()
+        return merged
+
+    def compile(self):
+        self.basename_regexes = _RegexRules(self.basename_rules)
+
+    def match(self, name: str, subject: str, is_dir: bool) -> Optional[IgnoreRule]:
+        best = self.literal_any.get(name)
+        if is_dir:
+            rule = self.literal_dir.get(name)
+            if rule is not None and (best is None or rule.priority > best.priority):
+                best = rule
+        name_length = len(name)
+        for length, table in self.suffixes.items():
+            if length <= name_length:
+                rule = table.get(name[-length:])
+                if rule is not None and (best is None or rule.priority > best.priority):
+                    best = rule
+        return self.basename_regexes.match(name, subject, best)
+
+
+class _AnchoredRules:
+    """
+    Path-anchored rules of one .gitignore, tracked relative to its directory.
+
+    Rules whose literal leading segments have all been consumed are "free" and
+    may match anything deeper, down to their maximum depth; the rest wait in
+    `pending` under the next segment they need, so a directory only sees rules
+    that can still match its entries.
+    """
+
+    def __init__(self, prefix: str, free: List[IgnoreRule], pending: Dict[str, List[IgnoreRule]], depth: int):
+        self.prefix = prefix
+        self.free = free
+        self.pending = pending
+        self.depth = depth
+
+    @classmethod
+    def from_rules(cls, rules: List[IgnoreRule]) -> "_AnchoredRules":
+        free, pending = [], {}
+        for rule in rules:
+            if rule.literal_segments:
+                pending.setdefault(rule.literal_segments[0], []).append(rule)
+            else:
+                free.append(rule)
+        return cls('', free, pending, 0)
+
+    def descend(self, name: str) -> Optional["_AnchoredRules"]:
+        depth = self.depth + 1
+        free = [rule for rule in self.free if rule.max_depth is None or rule.max_depth > depth]
+        pending: Dict[str, List[IgnoreRule]] = {}
+        for rule in self.pending.get(name, ()):
+            if len(rule.literal_segments) <= depth:
+                if rule.max_depth is None or rule.max_depth > depth:
+                    free.append(rule)
+            else:
+                pending.setdefault(rule.literal_segments[depth], []).append(rule)
+        if not free and not pending:
+            return None
+        return _AnchoredRules(f'{self.prefix}{name}/', free, pending, depth)
+
+    def active_rules(self) -> List[IgnoreRule]:
+        # An entry directly inside this directory has depth + 1 segments, so a
+        # pending rule can only match it when exactly one literal segment is left.
+        depth = self.depth + 1
+        active = [rule for rule in self.free if rule.max_depth is None or rule.max_depth == depth]
+        for rules in self.pending.values():
+            active.extend(rule for rule in rules if len(rule.literal_segments) == depth)
+        return active
+
+
+class DirectoryMatcher:
+    """Effective ignore rules for the entries of a single directory."""
+
+    def __init__(self, matcher: "IgnoreMatcher", rel_dir: str, global_rules: _GlobalRules,
+                 anchored: List[_AnchoredRules], gitignore_signature: Optional[Tuple[int, int]]):
+        self.rel_dir = rel_dir
+        self.global_rules = global_rules
+        self.anchored = anchored
+        self.gitignore_signature = gitignore_signature
+        self.anchored_regexes = []
+        for rules in anchored:
+            active = rules.active_rules()
+            if active:
+                self.anchored_regexes.append((rules.prefix, matcher.compiled(active)))
+
+    def match(self, name: str, is_dir: bool = False) -> bool:
+        subject = name + '/' if is_dir else name
+        best = self.global_rules.match(name, subject, is_dir)
+        for prefix, regex_rules in self.anchored_regexes:
+            best = regex_rules.match(name, prefix + subject, best)
+        return best is not None and best.include
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class IgnoreMatcher:
+    """
+    Gitignore-style matcher that honours .gitignore files at every level.
+
+    Patterns are compiled once: plain names and `*.ext` suffixes become dict
+    lookups, other unanchored patterns are combined into regexes over the
+    entry name, and anchored patterns are combined per .gitignore and only
+    offered to directories their literal prefix can still reach. The
+    effective matcher of each directory is cached, so listing a directory
+    costs a handful of lookups per entry regardless of the pattern count.
+    """
+
+    def __init__(self, project_root: str, root_patterns: List[str], nested: bool = True):
+        self.project_root = str(project_root)
+        self.nested = nested
+        self.patterns: List[IgnoreRule] = []
+        # (mtime_ns, size) of the root .gitignore read by from_project
+        self.root_signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._directories: Dict[str, DirectoryMatcher] = {}
+        self._compiled: Dict[Tuple[int, ...], _RegexRules] = {}
+
+        global_rules, anchored = self._parse(root_patterns, depth=0, collect=self.patterns)
+        root = DirectoryMatcher(self, '', global_rules,
+                                [anchored] if anchored.free or anchored.pending else [], None)
+        self._directories[''] = root
+
+    @classmethod
+    def from_project(cls, project_root: str, default_ignores: Optional[List[str]] = None,
+                     nested: bool = True) -> "IgnoreMatcher":
+        patterns = []
+        gitignore_path = os.path.join(str(project_root), GITIGNORE)
+        if os.path.isfile(gitignore_path):
+            with open(gitignore_path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                patterns.extend(f.read().splitlines())
+            logger.info(f"Read .gitignore and compiled {len(patterns)} ignore patterns: {patterns}")
+        else:
+            logger.warning(".gitignore file not found.")
+        patterns.extend(DEFAULT_IGNORES if default_ignores is None else default_ignores)
+        logger.info(f"Total ignore patterns: {patterns}")
+        matcher = cls(project_root, patterns, nested=nested)
+        matcher.root_signature = _file_signature(gitignore_path)
+        return matcher
+
+    @classmethod
+    def from_lines(cls, patterns: List[str], project_root: str = '', nested: bool = False) -> "IgnoreMatcher":
+        return cls(project_root, list(patterns), nested=nested)
+
+    def compiled(self, rules: List[IgnoreRule]) -> _RegexRules:
+        key = tuple(sorted(id(rule) for rule in rules))
+        regex_rules = self._compiled.get(key)
+        if regex_rules is None:
+            regex_rules = _RegexRules(rules)
+            self._compiled[key] = regex_rules
+        return regex_rules
+
+    def _parse(self, lines: List[str], depth: int, collect: Optional[List[IgnoreRule]] = None):
+        global_rules = _GlobalRules()
+        anchored_rules = []
+        for index, line in enumerate(lines):
+            regex, include = GitWildMatchPattern.pattern_to_regex(line)
+            if include is None:
+                continue
+            # Inner groups would confuse match.lastindex in the combined regexes
+            regex = _CAPTURING_GROUP.sub('(?:', _NAMED_GROUP.sub('(?:', regex))
+            body = line.rstrip()
+            if not include:
+                body = body[1:]
+            priority = (depth << _DEPTH_SHIFT) | index
+            rule = IgnoreRule(line, priority, include, regex, body)
+            if collect is not None:
+                collect.append(rule)
+
+            name_regex = _name_only_regex(regex)
+            if name_regex is None:
+                if rule.max_depth is None:
+                    # May match through an ancestor, so the entry name need not contain its literals
+                    rule.suffix_key = rule.prefix_key = None
+                anchored_rules.append(rule)
+            elif _SIMPLE_NAME.fullmatch(body.rstrip('/')):
+                table = global_rules.literal_dir if body.endswith('/') else global_rules.literal_any
+                table[body.rstrip('/')] = rule
+            elif body.startswith('*') and _SIMPLE_NAME.fullmatch(body[1:]):
+                global_rules.suffixes.setdefault(len(body) - 1, {})[body[1:]] = rule
+            else:
+                rule.regex = name_regex
+                global_rules.basename_rules.append(rule)
+        global_rules.compile()
+        return global_rules, _AnchoredRules.from_rules(anchored_rules)
+
+    def is_current(self) -> bool:
+        """
+        Whether the .gitignore files this matcher has read are unchanged and no
+        directory it has matched entries of has gained one since.
+        """
+        if self.root_signature != _file_signature(os.path.join(self.project_root, GITIGNORE)):
+            return False
+        with self._lock:
+            directories = list(self._directories.items())
+        return all(self.gitignore_signature(rel_dir) == matcher.gitignore_signature
+                   for rel_dir, matcher in directories if rel_dir)
+
+    def gitignore_signature(self, rel_dir: str) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, size) of a nested .gitignore; the root one is covered by `patterns`."""
+        if not self.nested or not rel_dir:
+            return None
+        try:
+            st = os.stat(os.path.join(self.project_root, rel_dir, GITIGNORE))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def for_directory(self, rel_dir: str) -> DirectoryMatcher:
+        matcher = self._directories.get(rel_dir)
+        if matcher is not None:
+            return matcher
+
+        parent_dir, name = os.path.split(rel_dir)
+        parent = self.for_directory(parent_dir)
+        anchored = [child for child in (rules.descend(name) for rules in parent.anchored) if child is not None]
+        global_rules = parent.global_rules
+
+        signature = self.gitignore_signature(rel_dir)
+        if signature is not None:
+            depth = rel_dir.count(os.sep) + 1
+            try:
+                with open(os.path.join(self.project_root, rel_dir, GITIGNORE), 'r',
+                          encoding='utf-8', errors='surrogateescape') as f:
+                    lines = f.read().splitlines()
+            except OSError as e:
+                logger.debug(f"Could not read {os.path.join(rel_dir, GITIGNORE)}: {e}")
+                lines = []
+            nested_globals, nested_anchored = self._parse(lines, depth)
+            global_rules = global_rules.extend(nested_globals)
+            if nested_anchored.free or nested_anchored.pending:
+                anchored.append(nested_anchored)
+            logger.debug(f"Read nested {os.path.join(rel_dir, GITIGNORE)} with {len(lines)} lines")
+
+        matcher = DirectoryMatcher(self, rel_dir, global_rules, anchored, signature)
+        with self._lock:
+            return self._directories.setdefault(rel_dir, matcher)
+
+    def match_file(self, path: str) -> bool:
+        """
+        Checks a project-relative path, directories marked with a trailing
+        slash, the way a top-down walk would: an ignored parent directory
+        ignores everything below it.
+        """
+        is_dir = path.endswith('/')
+        parts = [part for part in path.replace(os.sep, '/').split('/') if part and part != '.']
+        rel_dir = ''
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            if self.for_directory(rel_dir).match(part, is_dir or not last):
+                return True
+            rel_dir = os.path.join(rel_dir, part)
+        return False
+
+
+_matchers: Dict[str, IgnoreMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_ignore_matcher(project_root: str) -> IgnoreMatcher:
+    """
+    Returns the project's IgnoreMatcher, reusing the one built by an earlier
+    command in this process (see `autocoder serve`) while the .gitignore
+    files it read are unchanged, so its per-directory matchers stay warm.
+    """
+    key = os.path.realpath(str(project_root))
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+    if matcher is None or not matcher.is_current():
+        matcher = IgnoreMatcher.from_project(key)
+        with _matchers_lock:
+            _matchers[key] = matcher
+    return matcher
@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+from .ignore_matcher import IgnoreMatcher
+from .walker import ProjectWalker, scan_directory, DEFAULT_WALK_WORKERS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+MANIFEST_FILENAME = "manifest.json"
+
+# Manifests this process loaded or saved, by path: the file's (mtime_ns, size,
+# inode) then and its data, so a long-lived process (see `autocoder serve`)
+# does not parse the same JSON again.
+_loaded: Dict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+
+# A directory whose mtime is this close to the previous scan may have changed
+# again within the same timestamp tick, so it is rescanned rather than trusted.
+RACY_WINDOW_NS = 1_000_000_000
+
+
+def _file_signature(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class FileManifest:
+    """
+    Persisted snapshot of the project tree stored under .autocoder/.
+
+    For every directory it keeps the mtime, the signature of its own
+    .gitignore and the names that survived the ignore rules; for every listed
+    file it keeps (size, mtime_ns, inode). A directory's mtime changes
+    whenever an entry is added, removed or renamed in it, so an unchanged
+    mtime and .gitignore mean the cached listing and its ignore decisions are
+    still valid and the directory does not need to be read again.
+    """
+
+    def __init__(self, project_root: str, manifest_path: Optional[str] = None,
+                 max_workers: int = DEFAULT_WALK_WORKERS):
+        self.project_root = str(project_root)
+        self.walker = ProjectWalker(max_workers)
+        self.autocoder_dir = os.path.join(self.project_root, ".autocoder")
+        self.manifest_path = manifest_path or os.path.join(self.autocoder_dir, MANIFEST_FILENAME)
+        self.fingerprint: Optional[str] = None
+        self.scanned_at_ns = 0
+        self.dirs: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, List[int]] = {}
+        self.stats = {"dirs_scanned": 0, "dirs_reused": 0}
+
+    @property
+    def persistent(self) -> bool:
+        return os.path.isdir(os.path.dirname(self.manifest_path))
+
+    @staticmethod
+    def fingerprint_spec(ignore_spec: IgnoreMatcher) -> str:
+        digest = hashlib.sha1()
+        for pattern in ignore_spec.patterns:
+            digest.update(str(getattr(pattern, "pattern", pattern)).encode("utf-8", "surrogateescape"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def load(self) -> bool:
+        try:
+            signature = _file_signature(self.manifest_path)
+            cached = _loaded.get(self.manifest_path)
+            if cached is not None and cached[0] == signature:
+                data = cached[1]
+            else:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                _loaded[self.manifest_path] = (signature, data)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != MANIFEST_VERSION:
+            logger.info("File manifest has an outdated format and will be rebuilt.")
+            return False
+        self.fingerprint = data.get("fingerprint")
+        self.scanned_at_ns = data.get("scanned_at_ns", 0)
+        self.dirs = data.get("dirs", {})
+        self.files = data.get("files", {})
+        return True
+
+    def save(self):
+        if not self.persistent:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.fingerprint,
+            "scanned_at_ns": self.scanned_at_ns,
+            "dirs": self.dirs,
+            "files": self.files,
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, self.manifest_path)
+        _loaded[self.manifest_path] = (_file_signature(self.manifest_path), data)
+        logger.debug(f"Saved file manifest with {len(self.dirs)} directories and {len(self.files)} files")
+
+    def list_project_files(self, ignore_spec: IgnoreMatcher, full: bool = False) -> List[str]:
+        """
+        Lists project files in the same order as a top-down os.walk, reusing
+        cached directory listings whose mtime has not changed.
+
+        Args:
+        ignore_spec (IgnoreMatcher): Patterns of files and directories to skip.
+        full (bool): Ignore the cached manifest and rescan every directory.
+
+        Returns:
+        List[str]: Paths relative to the project root.
+        """
+        fingerprint = self.fingerprint_spec(ignore_spec)
+        previous_dirs: Dict[str, Dict[str, Any]] = {}
+        previous_files: Dict[str, List[int]] = {}
+        previous_scan_ns = 0
+        if not full and self.load() and self.fingerprint == fingerprint:
+            previous_dirs, previous_files, previous_scan_ns = self.dirs, self.files, self.scanned_at_ns
+        elif full:
+            logger.info("Full rescan requested; ignoring cached file manifest.")
+
+        self.fingerprint = fingerprint
+        scan_started_ns = time.time_ns()
+        self.dirs, self.files = {}, {}
+        self.stats = {"dirs_scanned": 0, "dirs_reused": 0}
+        # Directories whose nested .gitignore changed; everything below them is rescanned
+        invalidated = set()
+
+        def ancestor_invalidated(rel_dir: str) -> bool:
+            while rel_dir:
+                rel_dir = os.path.dirname(rel_dir)
+                if rel_dir in invalidated:
+                    return True
+            return False
+
+        def visit(rel_dir: str):
+            abs_dir = os.path.join(self.project_root, rel_dir)
+            try:
+                mtime_ns = os.stat(abs_dir).st_mtime_ns
+            except OSError as e:
+                logger.debug(f"Could not stat directory {rel_dir or '.'}: {e}")
+                return None
+
+            signature = ignore_spec.gitignore_signature(rel_dir)
+            signature = list(signature) if signature else None
+            cached = previous_dirs.get(rel_dir)
+            if cached is not None and cached.get("ignore_sig") != signature:
+                invalidated.add(rel_dir)
+                cached = None
+            if cached is not None and cached["mtime_ns"] == mtime_ns \
+                    and mtime_ns + RACY_WINDOW_NS <= previous_scan_ns \
+                    and not ancestor_invalidated(rel_dir):
+                file_stats = {}
+                for name in cached["files"]:
+                    rel_path = os.path.join(rel_dir, name)
+                    if rel_path in previous_files:
+                        file_stats[rel_path] = previous_files[rel_path]
+                return (cached, file_stats, True), cached["dirs"]
+
+            scanned = scan_directory(abs_dir, rel_dir, ignore_spec)
+            if scanned is None:
+                return None
+            files, dirs, file_stats = scanned
+            entry = {"mtime_ns": mtime_ns, "ignore_sig": signature, "files": files, "dirs": dirs}
+            return (entry, file_stats, False), dirs
+
+        project_files = []
+        for rel_dir, (entry, file_stats, reused) in self.walker.walk(visit):
+            self.dirs[rel_dir] = entry
+            self.files.update(file_stats)
+            self.stats["dirs_reused" if reused else "dirs_scanned"] += 1
+            project_files.extend(os.path.join(rel_dir, name) for name in entry["files"])
+
+        logger.info(
+            f"File manifest: {self.stats['dirs_scanned']} directories scanned, "
+            f"{self.stats['dirs_reused']} reused from cache"
+        )
+        # Nothing changed since the last run: keep the previous manifest (and its
+        # scan time, which is the conservative choice for the racy-mtime check).
+        if self.stats["dirs_scanned"] == 0 and len(self.dirs) == len(previous_dirs):
+            self.scanned_at_ns = previous_scan_ns
+        else:
+            self.scanned_at_ns = scan_started_ns
+            self.save()
+        return project_files
@@ -0,0 +1,282 @@
+import os
+import re
+import time
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from ..file_cache import FileCache, get_file_cache
+from .skeleton import SkeletonRenderer, CONTEXT_MODES, SKELETON_KIND
+
+logger = logging.getLogger(__name__)
+
+# Bump when estimate_tokens changes so cached estimates are recomputed
+TOKEN_ESTIMATE_KIND = "tokens-v1"
+SKELETON_TOKENS_KIND = f"{TOKEN_ESTIMATE_KIND}:{SKELETON_KIND}"
+
+DEFAULT_CONTEXT_WINDOW = 200_000
+MODEL_CONTEXT_WINDOWS = {
+    "claude-3-opus-20240229": 200_000,
+    "claude-3-sonnet-20240229": 200_000,
+    "claude-3-haiku-20240307": 200_000,
+    "claude-3-5-sonnet-20240620": 200_000,
+    "claude-2.1": 200_000,
+    "claude-2.0": 100_000,
+    "claude-instant-1.2": 100_000,
+}
+# The estimator is a heuristic, so part of the window is held back for its error.
+SAFETY_MARGIN = 0.1
+# The file listing may use at most this share of the budget before it is cut short.
+LISTING_SHARE = 0.2
+# A file is only truncated into the remaining budget if at least this much is left.
+MIN_EXCERPT_TOKENS = 256
+
+# Pieces that BPE tokenizers rarely merge across: words, short digit runs,
+# single punctuation or non-ASCII characters, and whitespace runs.
+_TOKEN_PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|\s+|[^\sA-Za-z\d]")
+_LONG_WORD = 6
+
+MANIFEST_NAMES = {
+    "pyproject.toml", "setup.py", "setup.cfg", "requirements.txt", "Pipfile", "package.json",
+    "Cargo.toml", "go.mod", "pom.xml", "build.gradle", "Gemfile", "composer.json",
+    "Makefile", "Dockerfile", "docker-compose.yml", "README", "README.md", "README.rst",
+}
+ENTRY_POINT_NAMES = {
+    "main.py", "__main__.py", "app.py", "cli.py", "manage.py", "wsgi.py", "asgi.py", "server.py",
+    "index.js", "index.ts", "main.js", "main.ts", "main.go", "main.rs", "lib.rs",
+}
+LOW_PRIORITY_NAMES = {"package-lock.json", "yarn.lock", "poetry.lock", "Pipfile.lock", "Cargo.lock", "go.sum"}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the token count of text without a tokenizer model: one token
+    per word, digit group, symbol or whitespace run, plus one for every few
+    letters of long identifiers.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECE.findall(text):
+        tokens += 1
+        if len(piece) > _LONG_WORD and piece[0].isalpha():
+            tokens += (len(piece) - 1) // _LONG_WORD
+    return tokens
+
+
+def context_token_budget(model: Optional[str], max_output_tokens: int, reserved_tokens: int = 0) -> int:
+    """
+    Returns the number of tokens of context that fit in the model's window
+    next to the response and the rest of the prompt.
+    """
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return max(0, int((window - max_output_tokens - reserved_tokens) * (1 - SAFETY_MARGIN)))
+
+
+class TokenEstimator:
+    """
+    Estimates tokens per file, keeping the result in the shared file cache
+    under the file's content digest so unchanged files are not read again
+    just to be measured. In "skeleton" mode files are measured as rendered by
+    SkeletonRenderer rather than in full.
+    """
+
+    def __init__(self, project_root: str, file_cache: Optional[FileCache] = None, mode: str = "full"):
+        if mode not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode: {mode}")
+        self.project_root = str(project_root)
+        self.file_cache = file_cache or get_file_cache(project_root)
+        self.mode = mode
+        self.kind = SKELETON_TOKENS_KIND if mode == "skeleton" else TOKEN_ESTIMATE_KIND
+        self.skeletons = SkeletonRenderer(project_root, self.file_cache)
+        self.stats = {"measured": 0, "cached": 0}
+
+    def read(self, rel_path: str) -> str:
+        """File content as it goes into the context; raises OSError or UnicodeDecodeError."""
+        if self.mode == "skeleton":
+            return self.skeletons.render(rel_path)
+        return self.file_cache.read_text(rel_path)
+
+    def estimate_file(self, rel_path: str) -> Optional[Tuple[int, int]]:
+        """
+        Returns:
+        Optional[Tuple[int, int]]: Estimated tokens and characters of the file
+        content, or None if it cannot be read as UTF-8 text.
+        """
+        digest = self.file_cache.digest(rel_path)
+        if digest is None:
+            return None
+        cached = self.file_cache.get_derived(self.kind, digest)
+        if cached is not None:
+            self.stats["cached"] += 1
+            return cached[0], cached[1]
+
+        try:
+            content = self.read(rel_path)
+        except (OSError, UnicodeDecodeError):
+            return None
+        tokens = estimate_tokens(content)
+        self.stats["measured"] += 1
+        self.file_cache.put_derived(self.kind, digest, [tokens, len(content)])
+        return tokens, len(content)
+
+
+class ContextPacker:
+    """
+    Builds the "Project Files / File Contents" context so it fills a token
+    budget as fully as possible. Files are taken in priority order (manifests,
+    entry points, then recently changed files); a file that no longer fits is
+    cut down to the remaining budget or left out, and smaller files further
+    down the list may still be packed after it.
+    """
+
+    def __init__(self, project_root: str, estimator: Optional[TokenEstimator] = None, mode: str = "full"):
+        self.project_root = str(project_root)
+        self.estimator = estimator or TokenEstimator(project_root, mode=mode)
+        self.file_cache = self.estimator.file_cache
+
+    def priority(self, rel_path: str, mtime: float, now: float) -> float:
+        name = os.path.basename(rel_path)
+        depth = rel_path.count(os.sep)
+        score = 0.0
+        if name in MANIFEST_NAMES:
+            score += 100 if depth == 0 else 60
+        elif name in ENTRY_POINT_NAMES:
+            score += 50
+        elif name in LOW_PRIORITY_NAMES:
+            score -= 50
+        # Recently changed files matter most to the task at hand; the bonus halves every week
+        age_days = max(0.0, now - mtime) / 86400
+        score += 40 * 0.5 ** (age_days / 7)
+        parts = rel_path.split(os.sep)
+        if any(part in ("test", "tests", "docs", "examples") for part in parts[:-1]):
+            score -= 10
+        return score - 2 * depth
+
+    def rank_files(self, project_files: List[str]) -> List[Tuple[str, os.stat_result]]:
+        now = time.time()
+        ranked = []
+        for index, rel_path in enumerate(project_files):
+            try:
+                st = os.stat(os.path.join(self.project_root, rel_path))
+            except OSError:
+                continue
+            ranked.append((-self.priority(rel_path, st.st_mtime, now), index, rel_path, st))
+        ranked.sort(key=lambda item: item[:2])
+        return [(rel_path, st) for _, _, rel_path, st in ranked]
+
+    def pack(self, project_files: List[str], token_budget: int,
+             skipped_files: Optional[Dict[str, str]] = None,
+             ranked_files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Packs project files into a context of at most token_budget estimated tokens.
+
+        Args:
+        project_files (List[str]): Paths relative to the project root.
+        token_budget (int): Estimated tokens the context may use.
+        skipped_files (Optional[Dict[str, str]]): Files classified as unreadable, which are listed but never read.
+        ranked_files (Optional[List[str]]): Files to pack, in this order, instead of all
+            project files in priority order; e.g. the results of a search.
+
+        Returns:
+        Dict[str, Any]: The context, its estimated tokens, and the files that
+        were included, truncated and omitted.
+        """
+        skipped_files = skipped_files or {}
+        listing, listing_tokens = self._listing(project_files, int(token_budget * LISTING_SHARE))
+        remaining = token_budget - listing_tokens
+        sections, included, truncated, omitted = [], [], [], []
+
+        if ranked_files is None:
+            candidates = [rel_path for rel_path, _ in self.rank_files(project_files)]
+        else:
+            candidates = ranked_files
+        candidates = [f for f in candidates if f not in skipped_files]
+        for position, rel_path in enumerate(candidates):
+            if remaining < MIN_EXCERPT_TOKENS + 1:
+                # Too little is left for even an excerpt: leave the rest out without reading them
+                omitted.extend(candidates[position:])
+                break
+            header = f"\n\n#File {rel_path}:\n"
+            header_tokens = estimate_tokens(header)
+            estimate = self.estimator.estimate_file(rel_path)
+            if estimate is None:
+                omitted.append(rel_path)
+                continue
+            tokens, chars = estimate
+            if header_tokens + tokens <= remaining:
+                content = self._read(rel_path)
+                if content is None:
+                    omitted.append(rel_path)
+                    continue
+                sections.append(header + content)
+                remaining -= header_tokens + tokens
+                included.append(rel_path)
+            elif remaining - header_tokens >= MIN_EXCERPT_TOKENS:
+                excerpt, excerpt_tokens = self._excerpt(rel_path, remaining - header_tokens, tokens, chars)
+                if excerpt is None:
+                    omitted.append(rel_path)
+                    continue
+                sections.append(header + excerpt)
+                remaining -= header_tokens + excerpt_tokens
+                truncated.append(rel_path)
+            else:
+                omitted.append(rel_path)
+        self.file_cache.flush()
+
+        used = token_budget - remaining
+        logger.info(
+            f"Packed {len(included)} files whole and {len(truncated)} truncated into ~{used} of "
+            f"{token_budget} tokens; {len(omitted)} left out"
+        )
+        packed = {
+            "context": listing + "".join(sections),
+            "tokens": used,
+            "token_budget": token_budget,
+            "included_files": included,
+            "truncated_files": truncated,
+            "omitted_files": omitted,
+        }
+        if self.estimator.mode == "skeleton":
+            packed["compression_ratio"] = self.estimator.skeletons.compression_ratio
+            logger.info(f"Skeleton context is {packed['compression_ratio']:.1f}x smaller than the packed files")
+        return packed
+
+    def _listing(self, project_files: List[str], max_tokens: int) -> Tuple[str, int]:
+        head, tail = "Project Files:\n", "\n\nFile Contents:\n"
+        tokens = estimate_tokens(head) + estimate_tokens(tail)
+        lines = []
+        for index, rel_path in enumerate(project_files):
+            line_tokens = estimate_tokens(rel_path) + 1
+            if tokens + line_tokens > max_tokens:
+                more = f"... and {len(project_files) - index} more files"
+                lines.append(more)
+                tokens += estimate_tokens(more) + 1
+                break
+            lines.append(rel_path)
+            tokens += line_tokens
+        return head + "\n".join(lines) + tail, tokens
+
+    def _read(self, rel_path: str) -> Optional[str]:
+        try:
+            return self.estimator.read(rel_path)
+        except (OSError, UnicodeDecodeError) as e:
+            logger.warning(f"Could not read file {rel_path}: {e}")
+            return None
+
+    def _excerpt(self, rel_path: str, max_tokens: int, tokens: int, chars: int) -> Tuple[Optional[str], int]:
+        """
+        Cuts a file down to whole lines from its start that fit max_tokens,
+        including the marker that says how much was left out.
+        """
+        content = self._read(rel_path)
+        if content is None:
+            return None, 0
+        total_lines = content.count("\n") + 1
+        chars_per_token = chars / max(tokens, 1)
+        limit = int(max_tokens * chars_per_token)
+        while limit > 0:
+            cut = content.rfind("\n", 0, limit)
+            excerpt = content[:cut + 1] if cut != -1 else content[:limit]
+            marker = f"[... truncated, {total_lines - excerpt.count(chr(10))} of {total_lines} lines omitted]"
+            excerpt_tokens = estimate_tokens(excerpt) + estimate_tokens(marker)
+            if excerpt_tokens <= max_tokens:
+                return excerpt + marker, excerpt_tokens
+            limit = int(limit * max_tokens / excerpt_tokens * 0.95)
+        return None, 0
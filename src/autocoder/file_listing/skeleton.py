@@ -0,0 +1,126 @@
+import ast
+import logging
+from typing import List, Optional
+from ..file_cache import FileCache, get_file_cache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendering changes so cached skeletons are recomputed
+SKELETON_KIND = "skeleton-v1"
+CONTEXT_MODES = ("full", "skeleton")
+
+HEAD_LINES = 30
+TAIL_LINES = 10
+# Longer assignments (big literal tables) keep only their first line.
+MAX_CONSTANT_LINES = 5
+
+
+def head_tail_excerpt(text: str, head: int = HEAD_LINES, tail: int = TAIL_LINES) -> str:
+    lines = text.splitlines()
+    if len(lines) <= head + tail:
+        return text
+    omitted = len(lines) - head - tail
+    return "\n".join(lines[:head] + [f"... [{omitted} lines omitted] ..."] + lines[-tail:]) + "\n"
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+
+def _indent_of(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _emit_body(body: List[ast.stmt], lines: List[str], out: List[str]):
+    for index, node in enumerate(body):
+        if index == 0 and _is_docstring(node):
+            out.extend(lines[node.lineno - 1:node.end_lineno])
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            out.extend(lines[node.lineno - 1:node.end_lineno])
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            span = lines[node.lineno - 1:node.end_lineno]
+            if len(span) > MAX_CONSTANT_LINES:
+                span = [span[0], f"{_indent_of(span[0])}    ..."]
+            out.extend(span)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+            first = node.body[0]
+            header_end = max(node.lineno, first.lineno - 1)
+            out.extend(lines[start - 1:header_end])
+            if first.lineno == node.lineno:
+                # "def f(): return 1" - the body is already on the header line
+                continue
+            body_indent = _indent_of(lines[first.lineno - 1])
+            if isinstance(node, ast.ClassDef):
+                emitted = len(out)
+                _emit_body(node.body, lines, out)
+                if len(out) == emitted:
+                    out.append(f"{body_indent}...")
+            else:
+                if _is_docstring(first):
+                    out.extend(lines[first.lineno - 1:first.end_lineno])
+                out.append(f"{body_indent}...")
+
+
+def render_skeleton(source: str) -> str:
+    """
+    Renders Python source as imports, class and function signatures,
+    docstrings and module or class level assignments, with function bodies
+    replaced by "...". Raises SyntaxError if the source does not parse.
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines()
+    out: List[str] = []
+    _emit_body(tree.body, lines, out)
+    return "\n".join(out) + "\n" if out else ""
+
+
+class SkeletonRenderer:
+    """
+    Renders project files for the skeleton context mode: Python files as
+    skeletons, everything else (and Python that does not parse) as head and
+    tail excerpts. Results are cached in the shared file cache by content
+    digest, so unchanged files are neither read nor parsed again.
+    """
+
+    def __init__(self, project_root: str, file_cache: Optional[FileCache] = None):
+        self.project_root = str(project_root)
+        self.file_cache = file_cache or get_file_cache(project_root)
+        self.stats = {"files": 0, "cached": 0, "fallbacks": 0, "original_chars": 0, "skeleton_chars": 0}
+
+    def render(self, rel_path: str) -> str:
+        """
+        Returns the skeleton of a project file. Raises OSError or
+        UnicodeDecodeError if it cannot be read as text.
+        """
+        digest = self.file_cache.digest(rel_path)
+        cached = self.file_cache.get_derived(SKELETON_KIND, digest) if digest else None
+        if cached is not None:
+            self.stats["cached"] += 1
+            text, original_chars = cached
+        else:
+            content = self.file_cache.read_text(rel_path)
+            text = self.render_text(rel_path, content)
+            original_chars = len(content)
+            if digest:
+                self.file_cache.put_derived(SKELETON_KIND, digest, [text, original_chars])
+        self.stats["files"] += 1
+        self.stats["original_chars"] += original_chars
+        self.stats["skeleton_chars"] += len(text)
+        return text
+
+    def render_text(self, rel_path: str, content: str) -> str:
+        if rel_path.endswith(".py"):
+            try:
+                return render_skeleton(content)
+            except (SyntaxError, ValueError) as e:
+                logger.debug(f"Could not parse {rel_path} ({e}); using an excerpt")
+        self.stats["fallbacks"] += 1
+        return head_tail_excerpt(content)
+
+    @property
+    def compression_ratio(self) -> float:
+        """How many times smaller the rendered files are than the originals."""
+        if not self.stats["skeleton_chars"]:
+            return 1.0
+        return self.stats["original_chars"] / self.stats["skeleton_chars"]
@@ -0,0 +1,109 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .ignore_matcher import IgnoreMatcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WALK_WORKERS = 16
+
+# visit(rel_dir) -> (result, names of subdirectories to descend into), or None to skip
+VisitFunc = Callable[[str], Optional[Tuple[Any, List[str]]]]
+
+
+def scan_directory(abs_dir: str, rel_dir: str, ignore_spec: IgnoreMatcher):
+    """
+    Reads one directory with os.scandir and applies the ignore spec.
+
+    Returns:
+    Optional[Tuple[List[str], List[str], Dict[str, List[int]]]]: Included file
+    names, subdirectory names to descend into, and [size, mtime_ns, inode] for
+    every included file, or None if the directory cannot be read.
+    """
+    try:
+        with os.scandir(abs_dir) as it:
+            entries = list(it)
+    except OSError as e:
+        logger.debug(f"Could not read directory {rel_dir or '.'}: {e}")
+        return None
+
+    matcher = ignore_spec.for_directory(rel_dir)
+    files, dirs, file_stats = [], [], {}
+    for dir_entry in entries:
+        rel_path = os.path.join(rel_dir, dir_entry.name)
+        try:
+            is_dir = dir_entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        if is_dir:
+            if matcher.match(dir_entry.name, is_dir=True):
+                logger.debug(f"Ignoring directory: {rel_path}")
+                continue
+            # os.walk lists symlinked directories but never descends into them
+            if not dir_entry.is_symlink():
+                dirs.append(dir_entry.name)
+            continue
+
+        if matcher.match(dir_entry.name):
+            logger.debug(f"Ignoring file: {rel_path}")
+            continue
+        files.append(dir_entry.name)
+        try:
+            st = dir_entry.stat()
+        except OSError:
+            continue
+        file_stats[rel_path] = [st.st_size, st.st_mtime_ns, st.st_ino]
+
+    return files, dirs, file_stats
+
+
+class ProjectWalker:
+    """
+    Walks a directory tree on a bounded thread pool.
+
+    Directories are visited concurrently, which hides per-directory stat and
+    readdir latency on network filesystems, but results are returned in the
+    same top-down pre-order os.walk would produce so listings stay stable.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WALK_WORKERS):
+        self.max_workers = max(1, max_workers)
+
+    def walk(self, visit: VisitFunc) -> List[Tuple[str, Any]]:
+        results: Dict[str, Tuple[Any, List[str]]] = {}
+        if self.max_workers == 1:
+            stack = [""]
+            while stack:
+                rel_dir = stack.pop()
+                visited = visit(rel_dir)
+                if visited is None:
+                    continue
+                results[rel_dir] = visited
+                stack.extend(os.path.join(rel_dir, name) for name in reversed(visited[1]))
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="autocoder-walk") as pool:
+                pending = {pool.submit(visit, ""): ""}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        rel_dir = pending.pop(future)
+                        visited = future.result()
+                        if visited is None:
+                            continue
+                        results[rel_dir] = visited
+                        for name in visited[1]:
+                            child = os.path.join(rel_dir, name)
+                            pending[pool.submit(visit, child)] = child
+
+        ordered = []
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            visited = results.get(rel_dir)
+            if visited is None:
+                continue
+            ordered.append((rel_dir, visited[0]))
+            stack.extend(os.path.join(rel_dir, name) for name in reversed(visited[1]))
+        return ordered
@@ -3,6 +3,7 @@ from typing import Dict, List
 from langchain_core.tools import Tool
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel, Field
+from .file_cache import get_file_cache
 
 class ReadFileArgs(BaseModel):
     file_path: str = Field(..., description="Path to the file to read")
@@ -13,14 +14,14 @@ class WriteFileArgs(BaseModel):
 
 def read_file(state: Dict, args: ReadFileArgs) -> Dict:
     project_root = state.get("project_root", "")
-    with open(os.path.join(project_root, args.file_path), 'r') as file:
-        content = file.read()
+    content = get_file_cache(project_root).read_text(args.file_path)
     return {"content": content}
 
 def write_file(state: Dict, args: WriteFileArgs) -> Dict:
     project_root = state.get("project_root", "")
     with open(os.path.join(project_root, args.file_path), 'w') as file:
         file.write(args.content)
+    get_file_cache(project_root).invalidate(args.file_path)
     return {"status": "success"}
 
 def list_files(state: Dict) -> Dict:
@@ -0,0 +1,238 @@
+import os
+import sys
+import ast
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+from .file_cache import FileCache, get_file_cache, decode_text
+
+logger = logging.getLogger(__name__)
+
+# Bump when parse_module changes so cached summaries are recomputed
+GRAPH_SUMMARY_KIND = "import-graph-v1"
+DEFAULT_CLOSURE_DEPTH = 1
+# Below this many files to parse, starting worker processes costs more than it saves.
+PARALLEL_PARSE_THRESHOLD = 64
+# `import json` means the standard library even if the project has a json.py
+# (before Python 3.10 only the built-in modules are known)
+STDLIB_MODULES = frozenset(getattr(sys, "stdlib_module_names", sys.builtin_module_names))
+
+
+def parse_module(source: str) -> Dict[str, Any]:
+    """
+    Extracts what a module imports and defines.
+
+    Returns:
+    Dict[str, Any]: "imports" as [module, level, [names]] triples, where level
+    is the number of leading dots of a relative import, and "defines" as
+    top-level names plus "Class.method" for methods. "error" is set instead
+    if the source does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError) as e:
+        return {"imports": [], "defines": [], "error": str(e)}
+
+    imports, defines = [], []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.extend([alias.name, 0, []] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            imports.append([node.module or "", node.level, [alias.name for alias in node.names]])
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            defines.append(node.name)
+        elif isinstance(node, ast.ClassDef):
+            defines.append(node.name)
+            defines.extend(f"{node.name}.{item.name}" for item in node.body
+                           if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)))
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            defines.extend(target.id for target in targets if isinstance(target, ast.Name))
+    return {"imports": imports, "defines": defines}
+
+
+def _parse_file(path: str) -> Dict[str, Any]:
+    # Runs in a worker process
+    try:
+        with open(path, "rb") as f:
+            source = decode_text(f.read())
+    except (OSError, UnicodeDecodeError) as e:
+        return {"imports": [], "defines": [], "error": str(e)}
+    return parse_module(source)
+
+
+def module_names(rel_path: str, package_dirs: Set[str]) -> List[str]:
+    """
+    Dotted names a file could be imported as, longest first: its path from
+    each import root that may hold it, which are the project root, src/,
+    and the directory above the outermost package (a directory with an
+    __init__.py) containing the file. Names shadowed by the standard
+    library are left out.
+    """
+    parts = rel_path[:-3].split(os.sep)
+    roots = {0}
+    start = len(parts) - 1
+    while start > 0 and os.sep.join(parts[:start]) in package_dirs:
+        start -= 1
+    if start < len(parts) - 1:
+        roots.add(start)
+    if parts[0] == "src":
+        roots.add(1)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [".".join(parts[i:]) for i in sorted(roots) if parts[i:] and parts[i] not in STDLIB_MODULES]
+
+
+def resolve_file_names(names: Iterable[str], project_files: List[str]) -> List[str]:
+    """
+    Maps file names mentioned in a task ("file_manager.py" or
+    "src/autocoder/file_manager.py") to the project files they refer to.
+    """
+    by_basename = defaultdict(list)
+    for rel_path in project_files:
+        by_basename[os.path.basename(rel_path)].append(rel_path)
+    known = set(project_files)
+    resolved = []
+    for name in names:
+        resolved.extend([name] if name in known else by_basename.get(os.path.basename(name), []))
+    return list(dict.fromkeys(resolved))
+
+
+class ImportGraph:
+    """
+    Import and symbol graph of the project's Python files.
+
+    Each file is summarised with ast (imports and top-level definitions) and
+    the summary is cached in the shared file cache under the file's content
+    digest, so update() only parses files that changed, on a process pool when
+    there are many. The graph itself is rebuilt from the summaries, which is
+    cheap.
+    """
+
+    def __init__(self, project_root: str, file_cache: Optional[FileCache] = None, max_workers: Optional[int] = None):
+        self.project_root = str(project_root)
+        self.file_cache = file_cache or get_file_cache(project_root)
+        self.max_workers = max_workers
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        self.imports: Dict[str, Set[str]] = {}
+        self.importers_of: Dict[str, Set[str]] = defaultdict(set)
+        self.definitions: Dict[str, Set[str]] = defaultdict(set)
+        self.modules: Dict[str, List[str]] = defaultdict(list)
+        self.stats = {"parsed": 0, "cached": 0}
+
+    def update(self, project_files: Iterable[str]) -> "ImportGraph":
+        python_files = [rel_path for rel_path in project_files if rel_path.endswith(".py")]
+        summaries, to_parse = {}, {}
+        for rel_path in python_files:
+            digest = self.file_cache.digest(rel_path)
+            if digest is None:
+                continue
+            cached = self.file_cache.get_derived(GRAPH_SUMMARY_KIND, digest)
+            if cached is not None:
+                summaries[rel_path] = cached
+            else:
+                to_parse[rel_path] = digest
+
+        if to_parse:
+            for rel_path, summary in zip(to_parse, self._parse_all(list(to_parse))):
+                summaries[rel_path] = summary
+                # Syntax errors are cached too: they only go away when the content changes
+                self.file_cache.put_derived(GRAPH_SUMMARY_KIND, to_parse[rel_path], summary)
+        self.file_cache.flush()
+        self.stats = {"parsed": len(to_parse), "cached": len(summaries) - len(to_parse)}
+        logger.debug(f"Import graph: {self.stats['parsed']} files parsed, {self.stats['cached']} cached")
+        self._build(summaries)
+        return self
+
+    def _parse_all(self, rel_paths: List[str]) -> List[Dict[str, Any]]:
+        paths = [os.path.join(self.project_root, rel_path) for rel_path in rel_paths]
+        if len(paths) < PARALLEL_PARSE_THRESHOLD or self.max_workers == 1:
+            return [_parse_file(path) for path in paths]
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                return list(pool.map(_parse_file, paths, chunksize=32))
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Parsing in worker processes failed ({e}); parsing serially")
+            return [_parse_file(path) for path in paths]
+
+    def _build(self, summaries: Dict[str, Dict[str, Any]]):
+        self.summaries = summaries
+        self.modules = defaultdict(list)
+        package_dirs = {os.path.dirname(rel_path) for rel_path in summaries
+                        if os.path.basename(rel_path) == "__init__.py"}
+        for rel_path in summaries:
+            for name in module_names(rel_path, package_dirs):
+                self.modules[name].append(rel_path)
+        self.definitions = defaultdict(set)
+        self.imports = {}
+        self.importers_of = defaultdict(set)
+        for rel_path, summary in summaries.items():
+            for name in summary["defines"]:
+                self.definitions[name].add(rel_path)
+                if "." in name:
+                    self.definitions[name.rsplit(".", 1)[1]].add(rel_path)
+            targets = set()
+            for module, level, names in summary["imports"]:
+                targets.update(self._resolve(rel_path, module, level, names))
+            targets.discard(rel_path)
+            self.imports[rel_path] = targets
+            for target in targets:
+                self.importers_of[target].add(rel_path)
+
+    def _resolve(self, rel_path: str, module: str, level: int, names: List[str]) -> Set[str]:
+        if level:
+            package = rel_path.split(os.sep)[:-1]
+            if level > 1:
+                package = package[:-(level - 1)]
+            base = os.sep.join(package + (module.split(".") if module else []))
+            found = set()
+            for name in names:
+                found.update(self._module_file(os.path.join(base, name)))
+            return found or self._module_file(base)
+
+        # "from pkg import name" may import a submodule or a symbol of pkg
+        found = set()
+        for name in names:
+            found.update(self.modules.get(f"{module}.{name}", ()))
+        return found or set(self.modules.get(module, ()))
+
+    def _module_file(self, base: str) -> Set[str]:
+        return {path for path in (f"{base}.py", os.path.join(base, "__init__.py")) if path in self.summaries}
+
+    def definers(self, symbol: str) -> List[str]:
+        """Files that define symbol at top level, or as a method when given "Class.method" or a method name."""
+        return sorted(self.definitions.get(symbol, ()))
+
+    def importers(self, module: str) -> List[str]:
+        """Files importing module, given as a dotted name or a project path."""
+        targets = [module] if module in self.summaries else self.modules.get(module, [])
+        return sorted({importer for target in targets for importer in self.importers_of.get(target, ())})
+
+    def imported_by(self, rel_path: str) -> List[str]:
+        """Project files that rel_path imports."""
+        return sorted(self.imports.get(rel_path, ()))
+
+    def closure(self, files: Iterable[str], depth: int = DEFAULT_CLOSURE_DEPTH) -> List[str]:
+        """
+        Files reachable from files through up to depth import edges in either
+        direction: what they import and what imports them. The seeds come
+        first, in the given order, followed by each ring of neighbours.
+        """
+        ordered = list(dict.fromkeys(files))
+        seen = set(ordered)
+        frontier = [rel_path for rel_path in ordered if rel_path in self.summaries]
+        for _ in range(depth):
+            ring = []
+            for rel_path in frontier:
+                for neighbour in sorted(self.imports.get(rel_path, set()) | self.importers_of.get(rel_path, set())):
+                    if neighbour not in seen:
+                        seen.add(neighbour)
+                        ring.append(neighbour)
+            if not ring:
+                break
+            ordered.extend(ring)
+            frontier = ring
+        return ordered
@@ -1,34 +1,68 @@
+import asyncio
 import logging
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
 from langgraph.graph import StateGraph, END
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.checkpoint.memory import MemorySaver
 from .state import State
 from .nodes.file_listing_node import file_listing_node
 from .nodes.initialize_node import initialize_node
 from .nodes.error_handling_node import error_handling_node
-from .claude_api_wrapper import ClaudeAPIWrapper
+from .claude_api_wrapper import ClaudeAPIWrapper, AsyncClaudeAPIWrapper
+from .map_reduce import MapReduceAnalyzer
+from .response_cache import ResponseCache
+from .telemetry import MetricsWriter
+from .model_router import ModelRouter
+from .checkpoints import CheckpointStore, new_run_id
+from .profiler import NodeProfiler
 from .nodes.task_execution_node import create_task_execution_node
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
 from .file_listing.file_listing_node import FileListingNode
+from .file_listing.packer import context_token_budget, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
+ANALYSIS_MAX_TOKENS = 2000
+ANALYSIS_TIER = "large"
+ANALYSIS_PROMPT = """Please analyze the following project structure and file contents:
+
+{context}
+
+Provide a comprehensive analysis of the project, including:
+1. The overall structure and organization of the project
+2. Main components and their purposes
+3. Key functionalities implemented
+4. Any patterns or architectural decisions you notice
+5. Potential areas for improvement or optimization
+
+Your analysis should be detailed and insightful, offering a clear understanding of the project's purpose and implementation."""
+
 
 class LangGraphWorkflow:
-    def __init__(self, api_key: str):
-        self.claude_api = ClaudeAPIWrapper(api_key)
+    def __init__(self, api_key: str, response_cache: Optional[ResponseCache] = None,
+                 metrics: Optional[MetricsWriter] = None, router: Optional[ModelRouter] = None,
+                 checkpointer: Optional[BaseCheckpointSaver] = None, profiler: Optional[NodeProfiler] = None):
+        self.api_key = api_key
+        self.claude_api = ClaudeAPIWrapper(api_key, response_cache, metrics=metrics, router=router)
+        # Receives streaming events from the nodes while the graph runs (see stream_execution)
+        self.on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+        # The graph saves a checkpoint after every node; a CheckpointStore's saver makes them durable
+        self.memory = checkpointer or MemorySaver()
+        # Profiles every node of the graph, reporting each call with the streaming events
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.on_event = self._emit
         self.graph = self._build_graph()
-        self.memory = MemorySaver()
         self.file_lister = FileListingNode(project_root="", claude_api=self.claude_api)
 
     def _build_graph(self) -> StateGraph:
         workflow = StateGraph(State)
 
         # Define nodes
-        workflow.add_node("initialize", initialize_node)
-        workflow.add_node("file_listing", file_listing_node)
-        workflow.add_node("task_execution", create_task_execution_node(self.claude_api.client))
-        workflow.add_node("error_handling", error_handling_node)
+        self._add_node(workflow, "initialize", initialize_node)
+        self._add_node(workflow, "file_listing", file_listing_node)
+        self._add_node(workflow, "task_execution", create_task_execution_node(self.claude_api, on_event=self._emit))
+        self._add_node(workflow, "error_handling", error_handling_node)
 
         # Define edges
         workflow.set_entry_point("initialize")
@@ -41,9 +75,18 @@ class LangGraphWorkflow:
         )
         workflow.add_edge("error_handling", "task_execution")
 
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.memory)
+
+    def _add_node(self, workflow: StateGraph, name: str, node: Any):
+        workflow.add_node(name, node if self.profiler is None else self.profiler.wrap(name, node))
 
-    def execute_analysis(self, config: Dict[str, Any] = None) -> str:
+    def execute_analysis(self, config: Dict[str, Any] = None,
+                         on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+        """
+        Analyzes the project described by config. With on_event, the analysis
+        is streamed: on_event receives each ClaudeAPIWrapper.stream_response
+        event as it arrives, so the caller can show tokens immediately.
+        """
         try:
             project_root = config.get("project_root", "")
             logger.info(f"Analyzing project in: {project_root}")
@@ -58,6 +101,17 @@ class LangGraphWorkflow:
                 "messages": [],
                 "context": "",
                 "files": {},
+                "full": config.get("full", False),
+                "max_file_size": config.get("max_file_size"),
+                "max_total_size": config.get("max_total_size"),
+                "context_mode": config.get("context_mode", "full"),
+                "include_context": not config.get("map_reduce", False),
+                # Fill the window, leaving room for the prompt around the context and the response
+                "token_budget": context_token_budget(
+                    self.claude_api.router.model_for(ANALYSIS_TIER),
+                    max_output_tokens=ANALYSIS_MAX_TOKENS,
+                    reserved_tokens=estimate_tokens(ANALYSIS_PROMPT),
+                ),
                 "error": None
             }
 
@@ -68,36 +122,34 @@ class LangGraphWorkflow:
                 logger.error(f"Error in file listing: {file_listing_result['error']}")
                 return f"An error occurred during file listing: {file_listing_result['error']}"
 
+            if config.get("map_reduce"):
+                return self._execute_map_reduce_analysis(project_root, file_listing_result, initial_state["context_mode"])
+
             context = file_listing_result.get('context', '')
 
             # Prepare the prompt for the LLM
-            prompt = f"""Please analyze the following project structure and file contents:
-
-{context}
-
-Provide a comprehensive analysis of the project, including:
-1. The overall structure and organization of the project
-2. Main components and their purposes
-3. Key functionalities implemented
-4. Any patterns or architectural decisions you notice
-5. Potential areas for improvement or optimization
-
-Your analysis should be detailed and insightful, offering a clear understanding of the project's purpose and implementation."""
+            prompt = ANALYSIS_PROMPT.format(context=context)
 
             # Call the LLM for analysis
-            response = self.claude_api.generate_response(
-                state={},  # We don't need to pass any state
-                args={
-                    "messages": [HumanMessage(content=prompt)],
-                    "max_tokens": 2000
-                }
-            )
+            args = {
+                "messages": [HumanMessage(content=prompt)],
+                "max_tokens": ANALYSIS_MAX_TOKENS,
+                "node": "analyze",
+                "tier": ANALYSIS_TIER,
+            }
+            if on_event is None:
+                response = self.claude_api.generate_response(state={}, args=args)
+            else:
+                response = self._stream_response(args, on_event)
 
             if 'error' in response:
                 logger.error(f"Error in LLM analysis: {response['error']}")
                 return f"An error occurred during LLM analysis: {response['error']}"
 
             analysis_result = response['response']
+            if self.claude_api.response_cache is not None:
+                stats = self.claude_api.response_cache.stats
+                logger.info(f"Response cache: {stats['hits']} hits, {stats['misses']} misses")
             logger.info("Analysis completed successfully")
             return f"Analysis completed. Results:\n\n{analysis_result}"
 
@@ -105,6 +157,41 @@ Your analysis should be detailed and insightful, offering a clear understanding
             logger.exception(f"An unexpected error occurred during analysis: {str(e)}")
             return f"An unexpected error occurred during analysis: {str(e)}"
 
+    def _stream_response(self, args: Dict[str, Any], on_event: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        response = {"error": "The response stream ended without a result"}
+        for event in self.claude_api.stream_response(args):
+            on_event(event)
+            if event["type"] == "done":
+                response = {"response": event["response"]}
+            elif event["type"] == "error":
+                response = {"error": event["error"]}
+        return response
+
+    def _emit(self, event: Dict[str, Any]):
+        if self.on_event is not None:
+            self.on_event(event)
+
+    def _execute_map_reduce_analysis(self, project_root: str, file_listing_result: Dict[str, Any],
+                                     context_mode: str) -> str:
+        async def run():
+            # Chunk results are cached by the analyzer, not as whole requests
+            claude_api = AsyncClaudeAPIWrapper(self.api_key, metrics=self.claude_api.metrics,
+                                               router=self.claude_api.router)
+            try:
+                analyzer = MapReduceAnalyzer(project_root, claude_api,
+                                             cache=self.claude_api.response_cache, mode=context_mode)
+                return await analyzer.analyze(file_listing_result['project_files'],
+                                              file_listing_result['skipped_files'])
+            finally:
+                await claude_api.close()
+
+        result = asyncio.run(run())
+        if 'error' in result:
+            logger.error(f"Error in map-reduce analysis: {result['error']}")
+            return f"An error occurred during map-reduce analysis: {result['error']}"
+        logger.info(f"Map-reduce analysis completed over {len(result['chunks'])} chunks")
+        return f"Analysis completed. Results:\n\n{result['report']}"
+
     def _handle_task_execution_result(self, state: State) -> bool:
         """
         Determines whether the task execution is complete based on the current state.
@@ -117,6 +204,13 @@ Your analysis should be detailed and insightful, offering a clear understanding
         """
         logger.debug(f"Handling task execution result. Current state: {state}")
 
+        # Check if we've reached a maximum number of iterations; failed attempts count too
+        max_iterations = state.get("max_iterations", 5)  # Default to 5 if not set
+        current_iteration = state.get("current_iteration") or 0
+        if current_iteration >= max_iterations:
+            logger.warning(f"Reached maximum iterations ({max_iterations}). Ending task execution.")
+            return True
+
         # Check if there's an error in the state
         if state.get("error"):
             logger.error(f"Error encountered during task execution: {state['error']}")
@@ -132,19 +226,13 @@ Your analysis should be detailed and insightful, offering a clear understanding
             logger.info("Final result or output found. Considering task as completed.")
             return True
 
-        # Check if we've reached a maximum number of iterations
-        max_iterations = state.get("max_iterations", 5)  # Default to 5 if not set
-        current_iteration = state.get("current_iteration", 0)
-        if current_iteration >= max_iterations:
-            logger.warning(f"Reached maximum iterations ({max_iterations}). Ending task execution.")
-            return True
-
         # If none of the above conditions are met, continue the task execution
         logger.info("Task execution continuing.")
         return False
 
     def execute(self, task_description: str, config: Dict[str, Any] = None) -> str:
         try:
+            config = {**CheckpointStore.graph_config(new_run_id()), **(config or {})}
             initial_state = State(
                 messages=[HumanMessage(content=task_description)],
                 project_root=config.get("project_root", ""),
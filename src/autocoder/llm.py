@@ -0,0 +1,40 @@
+# Run as: python -m autocoder.llm
+import os
+from .file_listing.export import ContextExporter
+
+
+def create_llm_txt(files_list_path, output_file_path):
+    # Read the list of file names
+    with open(files_list_path, 'r') as f:
+        files = f.read().splitlines()
+
+    # Open the output file for writing; large UTF-8 files are copied verbatim
+    with open(output_file_path, 'wb') as out_f:
+        exporter = ContextExporter(out_f)
+        for file_name in files:
+            # Check for empty or invalid file names
+            if not file_name.strip():
+                print("Encountered an empty or invalid file name")
+                continue
+
+            # Check if the file exists
+            if os.path.exists(file_name):
+                header = f"#File {file_name}:\n"
+                if not exporter.write_file(header, file_name):
+                    # Read the content of the file; the exporter writes UTF-8, as it copies verbatim bodies
+                    with open(file_name, 'r', encoding='utf-8') as file_f:
+                        content = file_f.read()
+                    exporter.write_text(f"{header}{content}")
+                # Write the separator after the file content
+                exporter.write_text("\n\n\n\n\n\n\n")
+            else:
+                print(f"File not found: {file_name}")
+
+
+if __name__ == "__main__":
+    # Paths to the input files
+    files_list_path = 'files'  # This should be the path to your "files" document
+    output_file_path = 'llm.txt'  # This is the path to the output file
+
+    # Create the llm.txt file with the specified content
+    create_llm_txt(files_list_path, output_file_path)
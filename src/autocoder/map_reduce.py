@@ -0,0 +1,256 @@
+import os
+import json
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+from .claude_api_wrapper import AsyncClaudeAPIWrapper
+from .response_cache import ResponseCache
+from .file_listing.packer import ContextPacker, TokenEstimator, context_token_budget, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bump when the prompts or the chunking change so cached results are recomputed
+MAP_REDUCE_VERSION = "map-reduce-v1"
+MAP_MAX_TOKENS = 1500
+REDUCE_MAX_TOKENS = 1500
+FINAL_MAX_TOKENS = 2000
+# Summaries of parts are cheap steps; only the report needs the large model.
+# A map summary that names none of its files is asked again one tier up.
+MAP_TIER = "fast"
+REDUCE_TIER = "balanced"
+FINAL_TIER = "large"
+# Summaries combined by one reduce step
+REDUCE_FANOUT = 8
+
+MAP_PROMPT = """You are analyzing one part ({name}) of a larger project. Here are its files:
+
+{context}
+
+Summarize this part of the project for a reviewer who will combine it with summaries of the other parts:
+1. What these files are for and how they are organized
+2. Main components, functions and classes, and how they interact
+3. Dependencies on other parts of the project
+4. Notable patterns, problems or opportunities for improvement
+
+Be concise and specific; name files and symbols."""
+
+REDUCE_PROMPT = """Below are summaries of several parts of a project:
+
+{summaries}
+
+Combine them into one summary of these parts together, keeping the specific file and symbol names, how the parts relate to each other, and every notable problem or opportunity for improvement."""
+
+FINAL_PROMPT = """Below are summaries of all parts of a project:
+
+{summaries}
+
+Provide a comprehensive analysis of the project, including:
+1. The overall structure and organization of the project
+2. Main components and their purposes
+3. Key functionalities implemented
+4. Any patterns or architectural decisions you notice
+5. Potential areas for improvement or optimization
+
+Your analysis should be detailed and insightful, offering a clear understanding of the project's purpose and implementation."""
+
+
+def plan_chunks(file_tokens: Dict[str, int], token_budget: int) -> List[Dict[str, Any]]:
+    """
+    Splits files into chunks of at most token_budget tokens along directory
+    boundaries: a directory that fits is one chunk, one that does not is split
+    into its subdirectories and groups of its own files, and neighbouring
+    pieces under the same parent are merged back while they fit. A single file
+    over the budget gets a chunk of its own (and is truncated when packed).
+
+    Args:
+    file_tokens (Dict[str, int]): Tokens each file adds to a chunk, in listing order.
+    token_budget (int): Tokens a chunk may use.
+
+    Returns:
+    List[Dict[str, Any]]: Chunks in directory order, each with a "name" (the
+    directory it covers), its "files" and their "tokens".
+    """
+    def split(prefix: List[str], files: List[str]) -> List[Dict[str, Any]]:
+        name = os.sep.join(prefix) or "."
+        total = sum(file_tokens[f] for f in files)
+        if total <= token_budget:
+            return [{"name": name, "files": files, "tokens": total}]
+
+        own, subdirs = [], {}
+        for rel_path in files:
+            parts = rel_path.split(os.sep)
+            if len(parts) == len(prefix) + 1:
+                own.append(rel_path)
+            else:
+                subdirs.setdefault(parts[len(prefix)], []).append(rel_path)
+        # Oversized files go last so they do not split the small files around them
+        pieces = [{"name": name, "files": [f], "tokens": file_tokens[f]} for f in own
+                  if file_tokens[f] <= token_budget]
+        for subdir in sorted(subdirs):
+            pieces.extend(split(prefix + [subdir], subdirs[subdir]))
+        pieces.extend({"name": name, "files": [f], "tokens": file_tokens[f]} for f in own
+                      if file_tokens[f] > token_budget)
+
+        merged: List[Dict[str, Any]] = []
+        for piece in pieces:
+            last = merged[-1] if merged else None
+            if last is not None and last["tokens"] + piece["tokens"] <= token_budget:
+                last["files"] = last["files"] + piece["files"]
+                last["tokens"] += piece["tokens"]
+                if last["name"] != piece["name"]:
+                    last["name"] = name
+            else:
+                merged.append(dict(piece))
+        return merged
+
+    return split([], sorted(file_tokens, key=lambda f: f.split(os.sep)))
+
+
+def _key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps([MAP_REDUCE_VERSION, *parts]).encode("utf-8")).hexdigest()
+
+
+def _validator(node: Dict[str, Any]) -> Optional[Callable[[str], bool]]:
+    """Checks a summary of a chunk names at least one of its files, and that other summaries are not empty."""
+    if "chunk" in node:
+        names = {os.path.basename(rel_path) for rel_path in node["chunk"]["files"]}
+        return lambda text: any(name in text for name in names)
+    return lambda text: bool(text.strip())
+
+
+class MapReduceAnalyzer:
+    """
+    Analyzes a project too large for one prompt: each directory-aligned chunk
+    is summarized (concurrently), the summaries are combined REDUCE_FANOUT at
+    a time into fewer summaries until they fit one final report.
+
+    Results of every step are kept in the response cache, keyed by the
+    content digests of the files below them, so after a small change only
+    the chunks with changed files and the reduce steps above them are sent
+    to the model again. Unchanged chunks are not even read.
+    """
+
+    def __init__(self, project_root: str, claude_api: AsyncClaudeAPIWrapper,
+                 cache: Optional[ResponseCache] = None, chunk_budget: Optional[int] = None,
+                 mode: str = "full", reduce_fanout: int = REDUCE_FANOUT):
+        self.project_root = str(project_root)
+        self.claude_api = claude_api
+        self.cache = cache
+        self.chunk_budget = chunk_budget or context_token_budget(
+            claude_api.router.model_for(MAP_TIER), max_output_tokens=MAP_MAX_TOKENS, reserved_tokens=estimate_tokens(MAP_PROMPT))
+        self.mode = mode
+        self.reduce_fanout = max(2, reduce_fanout)
+        self.packer = ContextPacker(self.project_root, estimator=TokenEstimator(self.project_root, mode=mode))
+        self.stats = Counter()
+
+    def plan(self, project_files: List[str], skipped_files: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+        skipped_files = skipped_files or {}
+        file_tokens = {}
+        for rel_path in project_files:
+            # Each file costs its line in the chunk's listing plus its section
+            tokens = estimate_tokens(rel_path) + 1 + estimate_tokens(f"\n\n#File {rel_path}:\n")
+            estimate = None if rel_path in skipped_files else self.packer.estimator.estimate_file(rel_path)
+            file_tokens[rel_path] = tokens + (estimate[0] if estimate else 0)
+        chunks = plan_chunks(file_tokens, self.chunk_budget)
+        for chunk in chunks:
+            chunk["key"] = _key("map", self.claude_api.router.model_for(MAP_TIER), self.mode, self.chunk_budget, chunk["name"], [
+                [rel_path, skipped_files.get(rel_path) or self.packer.file_cache.digest(rel_path)]
+                for rel_path in chunk["files"]
+            ])
+        return chunks
+
+    async def analyze(self, project_files: List[str], skipped_files: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        Returns:
+        Dict[str, Any]: The final "report" and the "chunks" it was built
+        from, or {'error': ...} if any step failed.
+        """
+        chunks = self.plan(project_files, skipped_files)
+        coalesced_before = self.claude_api.singleflight.stats["coalesced"]
+        logger.info(f"Map-reduce analysis of {len(project_files)} files in {len(chunks)} chunks")
+
+        # A reduce step's key is derived from its inputs' keys, so the whole tree
+        # of keys is known before anything is summarized
+        levels = [[{"key": chunk["key"], "chunk": chunk} for chunk in chunks]]
+        reduce_model = self.claude_api.router.model_for(REDUCE_TIER)
+        while len(levels[-1]) > self.reduce_fanout:
+            below = levels[-1]
+            levels.append([
+                {"key": _key("reduce", reduce_model, [node["key"] for node in group]), "children": group}
+                for group in (below[i:i + self.reduce_fanout] for i in range(0, len(below), self.reduce_fanout))
+            ])
+        final_model = self.claude_api.router.model_for(FINAL_TIER)
+        root = {"key": _key("final", final_model, [node["key"] for node in levels[-1]]), "children": levels[-1]}
+        levels.append([root])
+
+        # Walk down from the report, stopping at cached results, to find the steps to run
+        root["needed"] = True
+        for level in reversed(levels):
+            for node in level:
+                if not node.get("needed"):
+                    continue
+                node["summary"] = self._cached(node["key"])
+                if node["summary"] is not None:
+                    self.stats["cached"] += 1
+                    continue
+                for child in node.get("children", ()):
+                    child["needed"] = True
+
+        for depth, level in enumerate(levels):
+            pending = [node for node in level if node.get("needed") and node["summary"] is None]
+            if not pending:
+                continue
+            final = level[0] is root
+            if depth == 0:
+                step = "map"
+            else:
+                step = "final report" if final else f"reduce level {depth}"
+            error = await self._run_step(step, pending, skipped_files, final)
+            if error:
+                return {"error": error}
+
+        # Identical prompts (e.g. of identical chunks) in the same step are sent once
+        coalesced = self.claude_api.singleflight.stats["coalesced"] - coalesced_before
+        if coalesced:
+            self.stats["calls"] -= coalesced
+            self.stats["coalesced"] += coalesced
+        logger.info(f"Map-reduce analysis: {self.stats['calls']} model calls, {self.stats['cached']} cached steps")
+        return {"report": root["summary"], "chunks": chunks, "stats": dict(self.stats)}
+
+    def _prompt(self, node: Dict[str, Any], skipped_files: Optional[Dict[str, str]], final: bool) -> str:
+        if "chunk" in node:
+            chunk = node["chunk"]
+            packed = self.packer.pack(chunk["files"], self.chunk_budget, skipped_files, ranked_files=chunk["files"])
+            return MAP_PROMPT.format(name=chunk["name"], context=packed["context"])
+        summaries = "\n\n".join(f"## Part {index + 1}\n{child['summary']}"
+                                 for index, child in enumerate(node["children"]))
+        return (FINAL_PROMPT if final else REDUCE_PROMPT).format(summaries=summaries)
+
+    def _cached(self, key: str) -> Optional[str]:
+        return self.cache.get(key) if self.cache is not None else None
+
+    async def _run_step(self, step: str, nodes: List[Dict[str, Any]], skipped_files: Optional[Dict[str, str]],
+                        final: bool = False) -> Optional[str]:
+        """Summarizes nodes concurrently; returns an error message if any request failed."""
+        if "chunk" in nodes[0]:
+            max_tokens, kind, tier = MAP_MAX_TOKENS, "map", MAP_TIER
+        elif final:
+            max_tokens, kind, tier = FINAL_MAX_TOKENS, "final", FINAL_TIER
+        else:
+            max_tokens, kind, tier = REDUCE_MAX_TOKENS, "reduce", REDUCE_TIER
+        logger.info(f"Map-reduce {step}: {len(nodes)} model calls")
+        # A generator, so each prompt is packed only when a request slot is free for it
+        responses = await self.claude_api.generate_many(
+            {"messages": [{"role": "user", "content": self._prompt(node, skipped_files, final)}],
+             "max_tokens": max_tokens, "node": f"map_reduce.{kind}", "tier": tier, "validate": _validator(node)}
+            for node in nodes
+        )
+        self.stats["calls"] += len(nodes)
+        for node, response in zip(nodes, responses):
+            if "error" in response:
+                return f"{step} failed: {response['error']}"
+            node["summary"] = response["response"]
+            if self.cache is not None:
+                self.cache.put(node["key"], response["response"])
+        return None
@@ -0,0 +1,118 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Capability tiers, cheapest and fastest first
+TIERS = ("fast", "balanced", "large")
+DEFAULT_TIER_MODELS = {
+    "fast": "claude-3-haiku-20240307",
+    "balanced": "claude-3-5-sonnet-20240620",
+    "large": "claude-3-opus-20240229",
+}
+# Environment variables overriding the model of each tier
+TIER_MODEL_ENV = {tier: f"AUTOCODER_{tier.upper()}_MODEL" for tier in TIERS}
+# Typical output tokens per second, to estimate how long a call would have
+# taken on the large model. Rough figures; unknown models count as large.
+MODEL_TOKENS_PER_SECOND = {
+    "claude-3-haiku-20240307": 120.0,
+    "claude-3-sonnet-20240229": 60.0,
+    "claude-3-5-sonnet-20240620": 80.0,
+    "claude-3-opus-20240229": 25.0,
+}
+
+
+class ModelRouter:
+    """
+    Maps the capability tier a node asks for ("fast", "balanced" or
+    "large") to a model, and keeps track of the calls made per tier.
+
+    A node whose output can be checked passes a validator along with its
+    tier; a response that fails validation is asked again one tier up (see
+    ClaudeAPIWrapper.generate_response). report() compares the time spent
+    with what the same calls would have taken on the large model.
+    """
+
+    def __init__(self, models: Optional[Dict[str, str]] = None):
+        self.models = {**DEFAULT_TIER_MODELS, **(models or {})}
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        return cls({tier: os.environ[name] for tier, name in TIER_MODEL_ENV.items() if os.environ.get(name)})
+
+    def model_for(self, tier: str) -> str:
+        if tier not in self.models:
+            raise ValueError(f"Unknown model tier: {tier}")
+        return self.models[tier]
+
+    def next_tier(self, tier: str) -> Optional[str]:
+        """The tier to escalate to from tier, or None from the largest."""
+        index = TIERS.index(tier)
+        return TIERS[index + 1] if index + 1 < len(TIERS) else None
+
+    def record(self, tier: str, model: str, latency: float, escalated: bool = False):
+        """Records a call that reached the API; escalated means its response failed validation."""
+        with self._lock:
+            self.calls.append({"tier": tier, "model": model, "latency": latency, "escalated": escalated})
+
+    def mark_escalated(self, tier: str, model: str):
+        """Marks the latest call on tier and model as escalated."""
+        with self._lock:
+            for call in reversed(self.calls):
+                if call["tier"] == tier and call["model"] == model and not call["escalated"]:
+                    call["escalated"] = True
+                    return
+
+    def baseline_latency(self, call: Dict[str, Any]) -> float:
+        """
+        Estimated latency of call on the large model. An escalated call adds
+        nothing: with the large model from the start it would not have been made.
+        """
+        if call["escalated"]:
+            return 0.0
+        large = self.models["large"]
+        speed = MODEL_TOKENS_PER_SECOND.get(call["model"])
+        large_speed = MODEL_TOKENS_PER_SECOND.get(large)
+        if call["model"] == large or speed is None or large_speed is None:
+            return call["latency"]
+        return call["latency"] * speed / large_speed
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Returns:
+        Dict[str, Any]: Calls and escalations per tier, the seconds spent, the
+        seconds an all-large-model run would have taken (estimated from
+        MODEL_TOKENS_PER_SECOND) and the difference as saved_seconds.
+        """
+        with self._lock:
+            calls = list(self.calls)
+        tiers = {}
+        for call in calls:
+            tier = tiers.setdefault(call["tier"], {"calls": 0, "escalations": 0, "seconds": 0.0})
+            tier["calls"] += 1
+            tier["escalations"] += call["escalated"]
+            tier["seconds"] += call["latency"]
+        actual = sum(call["latency"] for call in calls)
+        baseline = sum(self.baseline_latency(call) for call in calls)
+        return {"tiers": tiers, "actual_seconds": actual, "baseline_seconds": baseline,
+                "saved_seconds": baseline - actual}
+
+    def summary(self) -> Optional[str]:
+        """One line on the time routing saved, or None if every call went to the large model."""
+        report = self.report()
+        tiers = report["tiers"]
+        if not tiers or set(tiers) == {"large"}:
+            return None
+        parts = ", ".join(f"{tier} {tiers[tier]['calls']}" for tier in TIERS if tier in tiers)
+        escalations = sum(tier["escalations"] for tier in tiers.values())
+        # Rounded for display only; the baseline shown is the actual time plus the
+        # saving, so the figures always agree (+ 0.0 turns -0.0 into 0.0)
+        actual = round(report["actual_seconds"], 1)
+        saved = round(report["saved_seconds"], 1) + 0.0
+        return (f"Model routing: {parts} calls, {escalations} escalated; "
+                f"{actual:.1f} s against an estimated {actual + saved:.1f} s "
+                f"on {self.models['large']} alone ({saved:+.1f} s saved)")
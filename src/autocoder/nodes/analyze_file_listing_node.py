@@ -7,6 +7,7 @@ from langchain_core.tools import Tool
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel, Field
 from langchain_core.messages import AIMessage
+from ..blob_store import store_text
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ class AnalyzeFileListingNode:
             state.update({
                 'project_files': project_files,
                 'excluded_files': [str(pat) for pat in ignore_spec.patterns],
-                'context': context,
+                'context': store_text(state, context),
                 'messages': state.get('messages', []) + [AIMessage(content="File listing and context building completed.")]
             })
 
@@ -52,7 +53,7 @@ class AnalyzeFileListingNode:
             '.git/', '.hg/', '.svn/', '.idea/', '*.egg-info/',
             '__pycache__/', '.DS_Store', '*.pyc', '.venv/',
             'env/', 'build/', 'dist/', 'node_modules/',
-            '*.log', '*.tmp',
+            '*.log', '*.tmp', '.autocoder/',
         ]
         patterns.extend(default_ignores)
         return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
@@ -2,17 +2,19 @@ from ..state import State
 from ..code_modifier import CodeModifier
 from ..file_manager import FileManager
 from ..error_handler import ErrorHandler
+from ..blob_store import resolve_files, store_text
 
 @ErrorHandler.wrap_node
 def apply_modifications(state: State) -> State:
     code_modifier = CodeModifier()
     file_manager = FileManager(state["project_root"])
 
+    files = resolve_files(state)
     for file in state["interpreted_task"]["affected_files"]:
-        if file in state["files"]:
-            original_code = state["files"][file]
+        if file in files:
+            original_code = files[file]
             modified_code = code_modifier.modify_code(original_code, state["modifications"])
             file_manager.write_file(file, modified_code)
-            state["files"][file] = modified_code
+            state["files"][file] = store_text(state, modified_code)
 
     return state
@@ -2,6 +2,7 @@ from ..state import State
 from ..context_builder import ContextBuilder
 from ..file_manager import FileManager
 from ..error_handler import ErrorHandler
+from ..blob_store import store_files, store_text
 
 @ErrorHandler.wrap_node
 def build_context(state: State) -> State:
@@ -11,7 +12,7 @@ def build_context(state: State) -> State:
     files = file_manager.get_file_contents()
     context = context_builder.build_context(files)
 
-    state["files"] = files
-    state["context"] = context
+    state["files"] = store_files(state, files)
+    state["context"] = store_text(state, context)
 
     return state
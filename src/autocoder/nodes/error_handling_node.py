@@ -1,6 +1,5 @@
 from typing import Dict
 from langchain_core.tools import Tool
-from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
 
 class ErrorHandlingArgs(BaseModel):
@@ -20,4 +19,7 @@ error_handling_tools = [
     )
 ]
 
-error_handling_node = ToolNode(error_handling_tools)
+
+def error_handling_node(state: Dict) -> Dict:
+    # task_execution runs next and puts the handled error in its retry prompt
+    return handle_error(dict(state), ErrorHandlingArgs(error=str(state.get("error"))))
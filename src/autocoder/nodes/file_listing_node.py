@@ -1,108 +1,198 @@
 import os
 import logging
 from pathlib import Path
-import pathspec
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator
 from ..claude_api_wrapper import ClaudeAPIWrapper
+from ..file_listing.ignore_matcher import IgnoreMatcher, get_ignore_matcher
+from ..file_listing.manifest import FileManifest
+from ..file_listing.export import ContextExporter
+from ..file_cache import get_file_cache
+from ..file_listing.skeleton import SkeletonRenderer, CONTEXT_MODES
+from ..file_listing.classifier import FileClassifier, DEFAULT_MAX_FILE_SIZE, DEFAULT_MAX_TOTAL_SIZE
 from langchain_core.tools import Tool
-from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel, Field
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Files up to this size are read in one go; larger ones are streamed in chunks
+# after a validation pass, so a decode error never leaves a half-written section.
+STREAM_THRESHOLD = 1024 * 1024
+READ_CHUNK_SIZE = 256 * 1024
+
 class FileListingArgs(BaseModel):
     project_root: str = Field(..., description="Root directory of the project")
+    full: bool = Field(False, description="Rescan the whole project instead of using the cached file manifest")
 
 class FileListingNode:
-    def __init__(self, claude_api: ClaudeAPIWrapper):
+    def __init__(self, claude_api: ClaudeAPIWrapper, max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+                 max_total_size: int = DEFAULT_MAX_TOTAL_SIZE):
         self.claude_api = claude_api
-
-    def process(self, project_root: str) -> Dict[str, Any]:
+        self.max_file_size = max_file_size
+        self.max_total_size = max_total_size
+        self.skipped_files: Dict[str, str] = {}
+        self.compression_ratio = 1.0
+
+    def process(self, project_root: str, full: bool = False, include_context: bool = True,
+                classify: bool = True) -> Dict[str, Any]:
+        """
+        Lists the project files and, with include_context, builds the context.
+
+        Args:
+        classify (bool): Classify the files (a stat each, and a sniff of the
+            first bytes on a cold cache) into skipped_files. Callers that only
+            need the paths pass False; the result then has no skipped_files.
+        """
         try:
             self.project_root = Path(project_root)
+            self.file_cache = get_file_cache(self.project_root)
             logger.info(f"Processing project root: {self.project_root}")
             ignore_spec = self.get_ignore_spec()
-            project_files = self.list_project_files(ignore_spec)
+            project_files = self.list_project_files(ignore_spec, full=full)
             logger.info(f"Found {len(project_files)} files in the project")
-            context = self.build_context(project_files)
 
-            return {
+            result = {
                 'project_files': project_files,
                 'excluded_files': [str(pat) for pat in ignore_spec.patterns],
-                'context': context
             }
+            if not classify and not include_context:
+                return result
+            self.skipped_files = self.classify_files(project_files)
+            result['skipped_files'] = self.skipped_files
+            result['skipped_summary'] = dict(FileClassifier.summarize(self.skipped_files))
+            if include_context:
+                result['context'] = self.build_context(project_files)
+            return result
         except Exception as e:
             logger.error(f"Error in FileListingNode: {str(e)}", exc_info=True)
             return {'error': str(e)}
 
-    def get_ignore_spec(self) -> pathspec.PathSpec:
-        patterns = []
-        gitignore_path = self.project_root / '.gitignore'
-        if gitignore_path.exists():
-            with gitignore_path.open('r') as f:
-                patterns.extend(f.read().splitlines())
-            logger.info(f"Read .gitignore and compiled {len(patterns)} ignore patterns: {patterns}")
-        else:
-            logger.warning(".gitignore file not found.")
-
-        default_ignores = [
-            '.git/', '.hg/', '.svn/', '.idea/', '*.egg-info/',
-            '__pycache__/', '.DS_Store', '*.pyc', '.venv/',
-            'env/', 'build/', 'dist/', 'node_modules/',
-            '*.log', '*.tmp',
-        ]
-        patterns.extend(default_ignores)
-        logger.info(f"Total ignore patterns: {patterns}")
-        return pathspec.PathSpec.from_lines('gitwildmatch', patterns)
-
-    def list_project_files(self, ignore_spec: pathspec.PathSpec) -> List[str]:
-        project_files = []
-        for root, dirs, files in os.walk(self.project_root):
-            root_path = Path(root)
-            rel_root = root_path.relative_to(self.project_root)
-            logger.debug(f"Processing directory: {rel_root}")
-
-            for dir in dirs[:]:
-                if ignore_spec.match_file(str(rel_root / dir) + '/'):
-                    logger.debug(f"Ignoring directory: {rel_root / dir}")
-                    dirs.remove(dir)
-
-            for file in files:
-                rel_path = rel_root / file
-                if ignore_spec.match_file(str(rel_path)):
-                    logger.debug(f"Ignoring file: {rel_path}")
-                else:
-                    logger.debug(f"Adding file: {rel_path}")
-                    project_files.append(str(rel_path))
+    def get_ignore_spec(self) -> IgnoreMatcher:
+        return get_ignore_matcher(self.project_root)
 
+    def list_project_files(self, ignore_spec: IgnoreMatcher, full: bool = False) -> List[str]:
+        manifest = FileManifest(self.project_root)
+        project_files = manifest.list_project_files(ignore_spec, full=full)
         logger.info(f"Total files found: {len(project_files)}")
         return project_files
 
-    def build_context(self, project_files: List[str]) -> str:
-        context = "Project Files:\n"
-        context += "\n".join(project_files)
-        context += "\n\nFile Contents:\n"
+    def classify_files(self, project_files: List[str]) -> Dict[str, str]:
+        classifier = FileClassifier(self.project_root, self.max_file_size, self.max_total_size)
+        return classifier.classify_files(project_files)
 
+    def build_context(self, project_files: List[str], mode: str = "full") -> str:
+        context = "".join(self.iter_context(project_files, mode))
+        self.file_cache.flush()
+        self._log_compression(mode)
+        logger.info(f"Final context size: {len(context)} bytes")
+        return context
+
+    def write_context(self, project_files: List[str], output_path: str, zero_copy: bool = True,
+                      mode: str = "full") -> int:
+        """
+        Streams the context straight to output_path without holding it in memory.
+        With zero_copy, bodies of large UTF-8 files are copied into the output
+        by the kernel instead of being decoded and re-encoded; the bytes written
+        are the same either way. In "skeleton" mode files are rendered as
+        signatures and excerpts instead (see file_listing.skeleton).
+
+        Returns:
+        int: Number of characters written, i.e. len(build_context(project_files)).
+        """
+        self._start_context(mode)
+        with open(output_path, 'wb') as out:
+            exporter = ContextExporter(out)
+            for chunk in self._iter_listing(project_files):
+                exporter.write_text(chunk)
+            for file in project_files:
+                logger.debug(f"Processing file: {file}")
+                if file in self.skipped_files:
+                    exporter.write_text(self._skipped_section(file))
+                    continue
+                if mode == "skeleton":
+                    exporter.write_text(self._skeleton_section(file))
+                    continue
+                if zero_copy and exporter.write_file(f'\n\n#File {file}:\n', str(self.project_root / file)):
+                    logger.debug(f"Copied file: {file}")
+                    continue
+                for chunk in self.iter_file_section(file):
+                    exporter.write_text(chunk)
+        if exporter.bytes_copied:
+            logger.info(f"Copied {exporter.bytes_copied} bytes verbatim ({dict(exporter.methods)})")
+        self.file_cache.flush()
+        self._log_compression(mode)
+        logger.info(f"Final context size: {exporter.chars_written} bytes")
+        return exporter.chars_written
+
+    def iter_context(self, project_files: List[str], mode: str = "full") -> Iterator[str]:
+        self._start_context(mode)
+        yield from self._iter_listing(project_files)
         for file in project_files:
-            file_path = self.project_root / file
             logger.debug(f"Processing file: {file}")
-            try:
-                with file_path.open('r', encoding='utf-8') as f:
-                    content = f.read()
-                context += f'\n\n#File {file}:\n{content}'
+            if file in self.skipped_files:
+                yield self._skipped_section(file)
+            elif mode == "skeleton":
+                yield self._skeleton_section(file)
+            else:
+                yield from self.iter_file_section(file)
+
+    def _iter_listing(self, project_files: List[str]) -> Iterator[str]:
+        yield "Project Files:\n"
+        for index, file in enumerate(project_files):
+            yield f"\n{file}" if index else file
+        yield "\n\nFile Contents:\n"
+
+    def _start_context(self, mode: str):
+        if mode not in CONTEXT_MODES:
+            raise ValueError(f"Unknown context mode: {mode}")
+        self.skeletons = SkeletonRenderer(self.project_root, self.file_cache)
+
+    def _skeleton_section(self, file: str) -> str:
+        try:
+            return f'\n\n#File {file}:\n{self.skeletons.render(file)}'
+        except Exception as e:
+            logger.warning(f"Could not read file {file}: {str(e)}")
+            return f'\n\n#File {file}: [Error reading file: {str(e)}]'
+
+    def _log_compression(self, mode: str):
+        if mode == "skeleton":
+            self.compression_ratio = self.skeletons.compression_ratio
+            logger.info(
+                f"Skeleton context: {self.skeletons.stats['original_chars']} chars of source rendered as "
+                f"{self.skeletons.stats['skeleton_chars']} ({self.compression_ratio:.1f}x smaller)"
+            )
+
+    def _skipped_section(self, file: str) -> str:
+        return f'\n\n#File {file}: [Skipped: {FileClassifier.describe(self.skipped_files[file])}]'
+
+    def iter_file_section(self, file: str) -> Iterator[str]:
+        file_path = self.project_root / file
+        try:
+            if file_path.stat().st_size <= STREAM_THRESHOLD:
+                content = self.file_cache.read_text(file)
+                yield f'\n\n#File {file}:\n{content}'
                 logger.debug(f"Successfully read file: {file}")
-            except Exception as e:
-                logger.warning(f"Could not read file {file}: {str(e)}", exc_info=True)
-                context += f'\n\n#File {file}: [Error reading file: {str(e)}]'
+                return
 
-        logger.info(f"Final context size: {len(context)} bytes")
-        return context
+            with file_path.open('r', encoding='utf-8') as f:
+                while f.read(READ_CHUNK_SIZE):
+                    pass
+        except Exception as e:
+            logger.warning(f"Could not read file {file}: {str(e)}")
+            yield f'\n\n#File {file}: [Error reading file: {str(e)}]'
+            return
+
+        yield f'\n\n#File {file}:\n'
+        with file_path.open('r', encoding='utf-8') as f:
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), ''):
+                yield chunk
+        logger.debug(f"Successfully streamed file: {file}")
 
 
 def file_listing(state: Dict[str, Any], args: FileListingArgs) -> Dict[str, Any]:
-    file_lister = FileListingNode(state['claude_api'])
-    result = file_lister.process(args.project_root)
+    file_lister = FileListingNode(state.get('claude_api'))
+    # The task node packs its own context from project_files; the whole repository is never joined here
+    result = file_lister.process(args.project_root, full=args.full, include_context=False)
     state.update(result)
     return state
 
@@ -116,4 +206,6 @@ file_listing_tools = [
     )
 ]
 
-file_listing_node = ToolNode(file_listing_tools)
+
+def file_listing_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    return file_listing(dict(state), FileListingArgs(project_root=state['project_root']))
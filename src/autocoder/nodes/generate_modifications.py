@@ -1,6 +1,7 @@
 from ..state import State
 from ..task_interpreter import TaskInterpreter
 from ..error_handler import ErrorHandler
+from ..blob_store import resolve_text
 
 
 @ErrorHandler.wrap_node
@@ -9,7 +10,7 @@ def generate_modifications(state: State) -> State:
     claude_api = state["claude_api"]
 
     task_prompt = task_interpreter.get_prompt_for_task(state["interpreted_task"])
-    full_prompt = f"Context:\n{state['context']}\n\nTask:\n{task_prompt}"
+    full_prompt = f"Context:\n{resolve_text(state, state['context'])}\n\nTask:\n{task_prompt}"
 
     modifications = claude_api.generate_response(full_prompt)
 
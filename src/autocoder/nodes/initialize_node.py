@@ -1,6 +1,5 @@
 from typing import Dict
 from langchain_core.tools import Tool
-from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
 
 class InitializeArgs(BaseModel):
@@ -20,4 +19,6 @@ initialize_tools = [
     )
 ]
 
-initialize_node = ToolNode(initialize_tools)
+
+def initialize_node(state: Dict) -> Dict:
+    return initialize(dict(state), InitializeArgs())
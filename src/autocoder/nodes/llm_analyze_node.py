@@ -1,18 +1,25 @@
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
 from langchain_core.tools import Tool
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel
 from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
 from functools import partial
 from langchain_core.messages import AIMessage, HumanMessage
+from ..claude_api_wrapper import usage_counts
+from ..telemetry import MetricsWriter
+from ..blob_store import resolve_text
 
 class LLMAnalyzeArgs(BaseModel):
     pass  # No additional arguments needed; state contains necessary info
 
-def llm_analyze(state: Dict[str, Any], args: LLMAnalyzeArgs, claude_client: Anthropic) -> Dict[str, Any]:
+def llm_analyze(state: Dict[str, Any], args: LLMAnalyzeArgs, claude_client: Anthropic,
+                metrics: Optional[MetricsWriter] = None) -> Dict[str, Any]:
+    model = "claude-3-opus-20240229"
+    started = time.perf_counter()
     try:
         project_files = state.get('project_files', [])
-        context = state.get('context', '')
+        context = resolve_text(state, state.get('context', ''))
 
         prompt = f"""{HUMAN_PROMPT} Analyze the following project structure and provide insights:
 
@@ -30,25 +37,29 @@ Please provide a comprehensive analysis of the project structure, including:
 {AI_PROMPT}"""
 
         response = claude_client.messages.create(
-            model="claude-3-opus-20240229",
+            model=model,
             max_tokens=2000,
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
 
+        if metrics is not None:
+            metrics.record("llm_analyze", model, time.perf_counter() - started, usage_counts(response.usage))
         analysis_result = response.content[0].text
 
         state['analysis_result'] = analysis_result
         state['messages'] = state.get('messages', []) + [AIMessage(content=analysis_result)]
         return state
     except Exception as e:
+        if metrics is not None:
+            metrics.record("llm_analyze", model, time.perf_counter() - started, error=str(e))
         state['error'] = f"Error during LLM analysis: {str(e)}"
         state['messages'] = state.get('messages', []) + [AIMessage(content=f"Error during analysis: {str(e)}")]
         return state
 
-def create_llm_analyze_node(claude_client: Anthropic):
-    llm_analyze_partial = partial(llm_analyze, claude_client=claude_client)
+def create_llm_analyze_node(claude_client: Anthropic, metrics: Optional[MetricsWriter] = None):
+    llm_analyze_partial = partial(llm_analyze, claude_client=claude_client, metrics=metrics)
 
     llm_analyze_tools = [
         Tool.from_function(
@@ -1,46 +1,133 @@
 # File: src/autocoder/nodes/task_execution_node.py
 
-from typing import Dict
-from langchain_core.tools import Tool
-from langgraph.prebuilt import ToolNode
+from typing import Any, Callable, Dict, List, Optional
 from pydantic import BaseModel, Field
-from functools import partial
+from ..claude_api_wrapper import ClaudeAPIWrapper, DEFAULT_MODEL, cached_prefix_block
+from ..file_listing.packer import ContextPacker, context_token_budget, estimate_tokens
+from ..search_index import SearchIndex
+from ..import_graph import ImportGraph, DEFAULT_CLOSURE_DEPTH, resolve_file_names
+from ..blob_store import resolve_text, store_text
+
+# Generating changes needs the most capable model
+TASK_TIER = "large"
+TASK_MAX_TOKENS = 1000
+TASK_TOP_K = 20
+# The project context goes first and is identical on every iteration of the
+# task loop, so the API can cache it as a prompt prefix; only the task and
+# the feedback on the previous attempt follow it.
+TASK_CONTEXT_PROMPT = "Here is the context of the project you are working on:\n\n{context}\n"
+TASK_PROMPT = "Based on the project context above, please perform the task: {task_description}\n"
+TASK_RETRY_PROMPT = "\nThe previous attempt failed with this error:\n{error}\nPlease take it into account.\n"
+# Shorter prefixes are not cached by the API, so they are not marked.
+MIN_CACHEABLE_TOKENS = 1024
 
 
 class TaskExecutionArgs(BaseModel):
     task_description: str = Field(..., description="Description of the task to execute")
 
 
-def execute_task(state: Dict, args: TaskExecutionArgs, claude_api) -> Dict:
+def build_task_context(state: Dict, prompt_tokens: int, task_description: str = "",
+                       model: str = DEFAULT_MODEL) -> str:
+    """
+    Packs the files most relevant to the task into whatever room the prompt
+    leaves in the model's window. Files are retrieved from the project's search
+    index and extended along the import graph; if nothing matches, the project
+    is packed in priority order. Falls
+    back to the context already in the state when the project files are not
+    known.
+    """
+    token_budget = context_token_budget(model, TASK_MAX_TOKENS, prompt_tokens)
+    if state.get('project_root') and state.get('project_files'):
+        ranked_files = None
+        if task_description:
+            index = SearchIndex(state['project_root'])
+            index.update(state['project_files'], state.get('skipped_files'))
+            hits = [path for path, _ in index.search(task_description, TASK_TOP_K)]
+            index.close()
+            # Files the task names come first, then search hits, then their imports and importers
+            # Keys the State declares are present in the graph even when unset, as None
+            mentioned = resolve_file_names(state.get('affected_files') or [], state['project_files'])
+            seeds = list(dict.fromkeys(mentioned + hits))
+            if seeds:
+                depth = state.get('closure_depth')
+                graph = ImportGraph(state['project_root']).update(state['project_files'])
+                ranked_files = graph.closure(seeds, DEFAULT_CLOSURE_DEPTH if depth is None else depth)
+        packed = ContextPacker(state['project_root']).pack(
+            state['project_files'], token_budget, state.get('skipped_files'), ranked_files)
+        return packed['context']
+    return resolve_text(state, state.get('context') or '')
+
+
+def build_task_messages(context: str, task_description: str, error: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Builds the task request with the project context as a cacheable prefix
+    block, followed by a block with what changes between iterations.
+    """
+    prefix = TASK_CONTEXT_PROMPT.format(context=context)
+    instruction = TASK_PROMPT.format(task_description=task_description)
+    if error:
+        instruction += TASK_RETRY_PROMPT.format(error=error)
+    if estimate_tokens(prefix) >= MIN_CACHEABLE_TOKENS:
+        prefix_block = cached_prefix_block(prefix)
+    else:
+        prefix_block = {"type": "text", "text": prefix}
+    return [{"role": "user", "content": [prefix_block, {"type": "text", "text": instruction}]}]
+
+
+def execute_task(state: Dict, args: TaskExecutionArgs, claude_api: ClaudeAPIWrapper,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict:
+    # Bounds the retry loop (see LangGraphWorkflow._handle_task_execution_result)
+    state["current_iteration"] = (state.get("current_iteration") or 0) + 1
     try:
-        # Build the prompt using the task description and context
-        prompt = f"{HUMAN_PROMPT} Based on the following context, please perform the task: {args.task_description}\n\nContext:\n{state['context']}\n{AI_PROMPT}"
+        # The context is built once per task and reused verbatim, so retries hit the prompt cache.
+        # The state keeps only its blob reference.
+        context = resolve_text(state, state.get("task_context"))
+        if context is None:
+            prompt_tokens = estimate_tokens(
+                TASK_CONTEXT_PROMPT.format(context="") + TASK_PROMPT.format(task_description=args.task_description))
+            context = build_task_context(state, prompt_tokens, args.task_description,
+                                         claude_api.router.model_for(TASK_TIER))
+            state["task_context"] = store_text(state, context)
+        messages = build_task_messages(context, args.task_description, state.get("error"))
 
-        # Call the LLM
-        response = claude_api.completions.create(
-            model="claude-instant-v1",
-            prompt=prompt,
-            max_tokens_to_sample=1000,
-            stop_sequences=[HUMAN_PROMPT]
-        )
+        # Call the LLM, passing tokens on as they arrive
+        response = None
+        for event in claude_api.stream_response({
+            "tier": TASK_TIER,
+            "max_tokens": TASK_MAX_TOKENS,
+            "messages": messages,
+            "node": "task_execution",
+        }):
+            if on_event is not None:
+                on_event(event)
+            if event["type"] == "error":
+                raise RuntimeError(event["error"])
+            if event["type"] == "done":
+                response = event["response"]
+                token_usage = dict(state.get("token_usage") or {})
+                for field, count in event.get("usage", {}).items():
+                    token_usage[field] = token_usage.get(field, 0) + count
+                state["token_usage"] = token_usage
 
         # Process the response
-        state["task_result"] = response.completion.strip()
+        state["task_result"] = response.strip()
         state["task_completed"] = True
+        # The previous attempt's error has been taken into account
+        state["error"] = None
         return state
     except Exception as e:
         state["error"] = f"Error during task execution: {str(e)}"
         return state
 
 
-def create_task_execution_node(claude_api):
-    execute_task_partial = partial(execute_task, claude_api=claude_api)
-    task_execution_tools = [
-        Tool.from_function(
-            func=execute_task_partial,
-            name="execute_task",
-            description="Execute the given task",
-            args_schema=TaskExecutionArgs
-        )
-    ]
-    return ToolNode(task_execution_tools)
+def create_task_execution_node(claude_api: ClaudeAPIWrapper,
+                               on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+    """
+    Returns the task graph's task_execution node. It is called with the graph
+    state rather than a tool call, so it runs again after error_handling with
+    the same cached context; the task is the first message of the run.
+    """
+    def task_execution_node(state: Dict) -> Dict:
+        task_description = state["messages"][0].content
+        return execute_task(dict(state), TaskExecutionArgs(task_description=task_description), claude_api, on_event)
+    return task_execution_node
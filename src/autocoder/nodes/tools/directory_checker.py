@@ -32,9 +32,30 @@ Commands:
   init                 Init autocoder in this directory
   task                 Execute a task in an initialized directory
   analyze              Analyze the project in an initialized directory
+  stats                Show latency, token use and estimated cost of recent model calls
+  serve                Keep a daemon running that later commands in this directory are sent to
   create:files-list    Create a list of all project files (respects .gitignore)
   create:context-file  Create a context file with the content of all project files
   help                 Display help information
+
+Options:
+  --full               Rescan the whole project instead of using the cached file manifest
+  --max-file-size N    Skip files larger than N bytes when building context
+  --max-total-size N   Include at most N bytes of file contents in the context
+  --context-mode MODE  full (default) or skeleton: signatures, docstrings and excerpts only
+  --map-reduce         Analyze large projects in chunks and combine the results
+  --no-cache           Call the model even if the same request has a cached response
+  --depth N            Import hops around the files a task names to include (default 1)
+  --resume RUN_ID      Continue an interrupted task run from its last completed step
+  --profile            Report time and memory per workflow node of a task, with a Chrome trace
+  --since WINDOW       Time window for stats, e.g. 90m, 24h or 7d (default 7d)
+
+Environment:
+  AUTOCODER_FAST_MODEL, AUTOCODER_BALANCED_MODEL, AUTOCODER_LARGE_MODEL
+                       Models for summaries, combining summaries, and analysis and code generation
+  AUTOCODER_LLM_CASSETTE=FILE, AUTOCODER_LLM_MODE=record|replay
+                       Record model calls to FILE, or replay them from it without network access
+  AUTOCODER_DAEMON=0   Run commands in-process even when a daemon is serving this directory
 """
     print(message)
 
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import logging
+import threading
+import tracemalloc
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.runnables import Runnable, RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIRNAME = "profiles"
+
+
+def state_size(value: Any) -> int:
+    """Approximate serialized size of a state or state update, in bytes."""
+    try:
+        return len(json.dumps(value, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return len(repr(value).encode("utf-8"))
+
+
+class NodeProfiler:
+    """
+    Records wall time, CPU time, tracemalloc peak and state size delta of
+    every call of the graph nodes it wraps. The peak is measured above the
+    memory already in use when the node started; the delta is the change
+    in the approximate serialized size of the state.
+
+    Each finished call is kept in records and passed to on_event as a
+    {"type": "profile", ...} event, the channel streaming tokens take (see
+    LangGraphWorkflow.on_event), so stream_execution reports it as soon as
+    the node returns. tracemalloc runs from start() to stop(); it slows
+    allocation-heavy code down, so the profiler is only created for
+    --profile.
+    """
+
+    def __init__(self, on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.on_event = on_event
+        self.records: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._started_tracemalloc = False
+
+    def start(self):
+        self._started = time.perf_counter()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def wrap(self, name: str, node: Any) -> Callable[[Dict[str, Any], RunnableConfig], Any]:
+        """Returns a node that runs node (a Runnable such as a ToolNode, or a function) and profiles each call."""
+        def profiled(state: Dict[str, Any], config: RunnableConfig) -> Any:
+            state_bytes = state_size(state)
+            memory_before = 0
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                memory_before = tracemalloc.get_traced_memory()[0]
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            error = None
+            try:
+                update = node.invoke(state, config) if isinstance(node, Runnable) else node(state)
+                return update
+            except Exception as e:
+                update, error = None, str(e)
+                raise
+            finally:
+                wall, cpu = time.perf_counter() - started, time.thread_time() - cpu_started
+                peak = tracemalloc.get_traced_memory()[1] - memory_before if tracemalloc.is_tracing() else None
+                # Nodes return the whole state or part of it; either way it is merged over the input
+                merged = {**state, **update} if isinstance(state, dict) and isinstance(update, dict) else state
+                self._record({
+                    "type": "profile", "node": name, "start": started - self._started,
+                    "wall": wall, "cpu": cpu, "peak_bytes": peak, "state_bytes": state_bytes,
+                    "state_delta_bytes": state_size(merged) - state_bytes if error is None else 0,
+                    "thread": threading.get_ident(), **({"error": error} if error is not None else {}),
+                })
+        profiled.__name__ = name
+        return profiled
+
+    def _record(self, record: Dict[str, Any]):
+        with self._lock:
+            self.records.append(record)
+        if self.on_event is not None:
+            self.on_event(record)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per node: calls, errors, total and mean wall time, CPU time, largest peak and total state delta."""
+        groups = defaultdict(list)
+        for record in self.records:
+            groups[record["node"]].append(record)
+        summary = {}
+        for node, records in groups.items():
+            wall = sum(r["wall"] for r in records)
+            peaks = [r["peak_bytes"] for r in records if r["peak_bytes"] is not None]
+            summary[node] = {
+                "calls": len(records),
+                "errors": sum(1 for r in records if "error" in r),
+                "wall": wall,
+                "mean_wall": wall / len(records),
+                "cpu": sum(r["cpu"] for r in records),
+                "peak_bytes": max(peaks) if peaks else None,
+                "state_delta_bytes": sum(r["state_delta_bytes"] for r in records),
+            }
+        return summary
+
+    def format_summary(self) -> str:
+        summary = self.summary()
+        if not summary:
+            return "No nodes ran."
+        total_wall = sum(s["wall"] for s in summary.values()) or 1.0
+        lines = [f"{'node':<16} {'calls':>5} {'wall s':>8} {'mean s':>8} {'CPU s':>8} {'% wall':>7} "
+                 f"{'peak MB':>8} {'state delta KB':>15}"]
+        for node, s in sorted(summary.items(), key=lambda item: -item[1]["wall"]):
+            peak = "-" if s["peak_bytes"] is None else f"{s['peak_bytes'] / (1024 * 1024):.1f}"
+            errors = f"  ({s['errors']} failed)" if s["errors"] else ""
+            lines.append(f"{node:<16} {s['calls']:>5} {s['wall']:>8.3f} {s['mean_wall']:>8.3f} {s['cpu']:>8.3f} "
+                         f"{s['wall'] / total_wall:>7.1%} {peak:>8} {s['state_delta_bytes'] / 1024:>+15.1f}{errors}")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """The records in the Chrome trace event format, for chrome://tracing or Perfetto."""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "autocoder"}}]
+        for record in self.records:
+            args = {key: record[key] for key in ("cpu", "peak_bytes", "state_bytes", "state_delta_bytes", "error")
+                    if key in record}
+            events.append({"name": record["node"], "cat": "node", "ph": "X", "pid": pid, "tid": record["thread"],
+                           "ts": round(record["start"] * 1e6), "dur": round(record["wall"] * 1e6), "args": args})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_report(self, project_root: str, run_id: str) -> Dict[str, str]:
+        """
+        Writes the summary table and the Chrome trace to .autocoder/profiles.
+
+        Returns:
+        Dict[str, str]: Paths of the "summary" and "trace" files.
+        """
+        profiles_dir = os.path.join(str(project_root), ".autocoder", PROFILES_DIRNAME)
+        os.makedirs(profiles_dir, exist_ok=True)
+        paths = {"summary": os.path.join(profiles_dir, f"{run_id}.txt"),
+                 "trace": os.path.join(profiles_dir, f"{run_id}.trace.json")}
+        with open(paths["summary"], "w", encoding="utf-8") as f:
+            f.write(self.format_summary() + "\n")
+        with open(paths["trace"], "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        logger.info(f"Profile written to {paths['summary']} and {paths['trace']}")
+        return paths
@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+import httpx
+from anthropic import DefaultAsyncHttpxClient, DefaultHttpxClient
+
+logger = logging.getLogger(__name__)
+
+# With AUTOCODER_LLM_CASSETTE set, every Anthropic client the wrappers create
+# records its traffic to that file, or replays it from there without any
+# network access, as AUTOCODER_LLM_MODE says ("replay" by default).
+CASSETTE_ENV = "AUTOCODER_LLM_CASSETTE"
+MODE_ENV = "AUTOCODER_LLM_MODE"
+RECORD, REPLAY = "record", "replay"
+# Describe the body as it was sent, not how it travelled
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def interaction_key(method: str, path: str, body: Any) -> str:
+    """Identifies a request by its method, path and canonical JSON body."""
+    canonical = json.dumps({"method": method, "path": path, "body": body},
+                           sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _request_parts(request: httpx.Request):
+    content = request.content
+    body = json.loads(content) if content else None
+    return request.method, request.url.path, body
+
+
+class Cassette:
+    """
+    Recorded API interactions, one JSON line each, in the order they were
+    made. A request recorded more than once is answered with its recordings
+    in turn, then with the last one again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._responses: Dict[str, deque] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._responses[interaction["key"]].append(interaction["response"])
+
+    def next_response(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            queued = self._responses.get(key)
+            if queued:
+                self._last[key] = queued.popleft()
+            return self._last.get(key)
+
+    def append(self, method: str, path: str, body: Any, response: Dict[str, Any]):
+        interaction = {"key": interaction_key(method, path, body),
+                       "request": {"method": method, "path": path, "body": body}, "response": response}
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(interaction) + "\n")
+
+
+class ReplayTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """Answers requests from a cassette, for the sync and async clients alike."""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        method, path, body = _request_parts(request)
+        response = self.cassette.next_response(interaction_key(method, path, body))
+        if response is None:
+            # A 400, so the request is not retried as a connection error would be
+            logger.error(f"No recorded response for {method} {path} in {self.cassette.path}")
+            return httpx.Response(400, json={"type": "error", "error": {
+                "type": "invalid_request_error", "message": f"No recorded response in {self.cassette.path}"}})
+        return httpx.Response(response["status"], headers=response["headers"],
+                              content=response["body"].encode("utf-8"))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return self.handle_request(request)
+
+
+class RecordingTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Sends requests over the network and appends each exchange to a
+    cassette. Responses are read in full before they are returned, so
+    streamed responses arrive all at once while recording.
+    """
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+        self._transport = httpx.HTTPTransport()
+        self._async_transport = httpx.AsyncHTTPTransport()
+
+    def _record(self, request: httpx.Request, response: httpx.Response) -> httpx.Response:
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS}
+        self.cassette.append(*_request_parts(request), {
+            "status": response.status_code, "headers": headers, "body": response.content.decode("utf-8"),
+        })
+        return httpx.Response(response.status_code, headers=headers, content=response.content)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = self._transport.handle_request(request)
+        response.read()
+        return self._record(request, response)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self._async_transport.handle_async_request(request)
+        await response.aread()
+        return self._record(request, response)
+
+    def close(self):
+        self._transport.close()
+
+    async def aclose(self):
+        await self._async_transport.aclose()
+
+
+_cassettes: Dict[tuple, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def transport_from_env() -> Optional[httpx.BaseTransport]:
+    """The recording or replaying transport the environment asks for, or None for the network."""
+    path = os.environ.get(CASSETTE_ENV)
+    if not path:
+        return None
+    mode = os.environ.get(MODE_ENV, REPLAY)
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"{MODE_ENV} must be '{RECORD}' or '{REPLAY}', not '{mode}'")
+    # Clients in one process share the cassette, so sync and async calls are recorded in order
+    with _cassettes_lock:
+        cassette = _cassettes.get((path, mode))
+        if cassette is None:
+            cassette = _cassettes[(path, mode)] = Cassette(path)
+    return RecordingTransport(cassette) if mode == RECORD else ReplayTransport(cassette)
+
+
+def http_client_from_env(asynchronous: bool = False) -> Optional[httpx.Client]:
+    """An HTTP client for Anthropic/AsyncAnthropic using transport_from_env(), or None for the default one."""
+    transport = transport_from_env()
+    if transport is None:
+        return None
+    return DefaultAsyncHttpxClient(transport=transport) if asynchronous else DefaultHttpxClient(transport=transport)
@@ -0,0 +1,314 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+from anthropic import APIConnectionError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_RETRIES = 6
+BASE_RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 60.0
+# Concurrent rate-limit errors are one congestion signal, not several:
+# concurrency is halved at most once per this many seconds.
+DECREASE_INTERVAL = 1.0
+# How often a request waiting for a free slot checks again (threads are also woken when one is released)
+SLOT_POLL_INTERVAL = 0.01
+# 429 is a rate limit, 529 means the API is overloaded; both call for slowing down.
+CONGESTION_STATUSES = (429, 529)
+
+
+class TokenBucket:
+    """
+    Budget of `capacity` units refilling at `rate` units per second. A take
+    larger than the capacity is allowed once the bucket is full, so a single
+    huge request still goes through.
+    """
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; 0 if it can be taken now."""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else (0.0 if missing <= 0 else float("inf"))
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.tokens -= amount
+
+    def sync(self, limit: float, remaining: float, reset_in: Optional[float], now: float):
+        """
+        Adopts the limit and remaining budget the API reported. The API
+        replenishes continuously and reports when the bucket will be full
+        again, which gives the refill rate; without it, the limit is per minute.
+        """
+        self.capacity = limit
+        self.tokens = remaining
+        self.updated = now
+        if reset_in:
+            self.rate = max(limit - remaining, 1) / reset_in
+        else:
+            self.rate = limit / 60.0
+
+
+def _header(headers: Any, name: str) -> Optional[str]:
+    if headers is None:
+        return None
+    return headers.get(name)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def parse_reset(value: Optional[str], wall_now: float) -> Optional[float]:
+    """Seconds until an anthropic-ratelimit-*-reset time (RFC 3339), or None."""
+    if not value:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+    return max(0.0, reset_at - wall_now)
+
+
+def retry_after_seconds(headers: Any) -> Optional[float]:
+    milliseconds = _number(_header(headers, "retry-after-ms"))
+    if milliseconds is not None:
+        return milliseconds / 1000
+    return _number(_header(headers, "retry-after"))
+
+
+def response_headers(response: Any) -> Any:
+    """Headers of an SDK raw response, a message stream or an APIStatusError."""
+    headers = getattr(response, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(response, "response", None), "headers", None)
+    return headers
+
+
+class RequestScheduler:
+    """
+    Admission control and retries for API requests.
+
+    Each request waits for a concurrency slot and for room in the
+    requests-per-minute and tokens-per-minute buckets, which follow the
+    anthropic-ratelimit-* headers of every response (or the configured
+    limits until the first response arrives). Concurrency adapts AIMD-style:
+    it grows by one slot per window of successful requests and halves on a
+    429 or 529. Failed requests are retried with decorrelated jitter, and
+    never sooner than the retry-after header says; a rate limit also holds
+    back every other request until then.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, initial_concurrency: Optional[int] = None,
+                 min_concurrency: int = 1, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = BASE_RETRY_DELAY, max_delay: float = MAX_RETRY_DELAY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        now = clock()
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0, now) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0, now) if tokens_per_minute else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(initial_concurrency or max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        self.stats = Counter()
+        self._cond = threading.Condition()
+
+    # Admission
+
+    def _try_acquire(self, estimated_tokens: int) -> float:
+        """Takes a slot and budget and returns 0, or returns how long to wait. Call with _cond held."""
+        now = self.clock()
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.concurrency):
+            return SLOT_POLL_INTERVAL
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, now))
+        if self.tokens is not None and estimated_tokens:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens, now))
+        if wait > 0:
+            return wait
+        if self.requests is not None:
+            self.requests.take(1, now)
+        if self.tokens is not None and estimated_tokens:
+            self.tokens.take(estimated_tokens, now)
+        self.in_flight += 1
+        return 0.0
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _acquire(self, estimated_tokens: int):
+        waited = 0.0
+        with self._cond:
+            while True:
+                wait = self._try_acquire(estimated_tokens)
+                if wait == 0:
+                    break
+                started = time.monotonic()
+                self._cond.wait(wait)
+                waited += time.monotonic() - started
+        self.stats["throttled_seconds"] += waited
+
+    async def _acquire_async(self, estimated_tokens: int):
+        while True:
+            with self._cond:
+                wait = self._try_acquire(estimated_tokens)
+            if wait == 0:
+                return
+            self.stats["throttled_seconds"] += wait
+            await asyncio.sleep(wait)
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0):
+        """Holds a concurrency slot, e.g. for the whole length of a streamed response."""
+        self._acquire(estimated_tokens)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def async_slot(self, estimated_tokens: int = 0):
+        await self._acquire_async(estimated_tokens)
+        try:
+            yield
+        finally:
+            self._release()
+
+    # Sending with retries
+
+    def send(self, request: Callable[[], Any]) -> Any:
+        """
+        Calls request() until it succeeds or fails for good, within a slot
+        the caller holds. request must return something with response headers
+        (a raw response or a stream) or raise an SDK error.
+        """
+        previous_delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = request()
+            except Exception as e:
+                delay = self._on_error(e, attempt, previous_delay)
+                if delay is None:
+                    raise
+                previous_delay = delay
+                time.sleep(delay)
+                continue
+            self._on_success(response_headers(response))
+            return response
+
+    async def send_async(self, request: Callable[[], Awaitable[Any]]) -> Any:
+        previous_delay = self.base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await request()
+            except Exception as e:
+                delay = self._on_error(e, attempt, previous_delay)
+                if delay is None:
+                    raise
+                previous_delay = delay
+                await asyncio.sleep(delay)
+                continue
+            self._on_success(response_headers(response))
+            return response
+
+    def call(self, request: Callable[[], Any], estimated_tokens: int = 0) -> Any:
+        with self.slot(estimated_tokens):
+            return self.send(request)
+
+    async def call_async(self, request: Callable[[], Awaitable[Any]], estimated_tokens: int = 0) -> Any:
+        async with self.async_slot(estimated_tokens):
+            return await self.send_async(request)
+
+    # Feedback
+
+    def _on_success(self, headers: Any):
+        with self._cond:
+            self.stats["requests"] += 1
+            self._sync_limits(headers)
+            # Additive increase: one more slot after a full window of successes
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / max(self.concurrency, 1.0))
+            self._cond.notify_all()
+
+    def _on_error(self, error: Exception, attempt: int, previous_delay: float) -> Optional[float]:
+        """Returns how long to wait before retrying error, or None if it should not be retried."""
+        status = getattr(error, "status_code", None)
+        if not (isinstance(error, APIConnectionError) or (status is not None and (status in CONGESTION_STATUSES
+                                                                                   or status >= 500))):
+            return None
+        if attempt >= self.max_retries:
+            self.stats["gave_up"] += 1
+            return None
+
+        headers = response_headers(error)
+        # Decorrelated jitter: random between the base delay and three times the previous one
+        delay = min(self.max_delay, random.uniform(self.base_delay, previous_delay * 3))
+        retry_after = retry_after_seconds(headers)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        with self._cond:
+            self.stats["retries"] += 1
+            self._sync_limits(headers)
+            if status in CONGESTION_STATUSES:
+                self.stats["rate_limited"] += 1
+                now = self.clock()
+                if now - self.last_decrease >= DECREASE_INTERVAL:
+                    self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+                    self.last_decrease = now
+                # Everyone else would hit the same limit; hold new requests back too
+                if retry_after is not None:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+        logger.warning(f"Request failed ({status or type(error).__name__}), retry {attempt + 1} of "
+                       f"{self.max_retries} in {delay:.2f} s; concurrency now {int(self.concurrency)}")
+        return delay
+
+    def _sync_limits(self, headers: Any):
+        if headers is None:
+            return
+        now, wall_now = self.clock(), time.time()
+        for kind in ("requests", "tokens"):
+            limit = _number(_header(headers, f"anthropic-ratelimit-{kind}-limit"))
+            remaining = _number(_header(headers, f"anthropic-ratelimit-{kind}-remaining"))
+            if limit is None or remaining is None:
+                continue
+            reset_in = parse_reset(_header(headers, f"anthropic-ratelimit-{kind}-reset"), wall_now)
+            bucket = getattr(self, kind)
+            if bucket is None:
+                bucket = TokenBucket(limit, limit / 60.0, now)
+                setattr(self, kind, bucket)
+            bucket.sync(limit, remaining, reset_in, now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"concurrency": int(self.concurrency), "in_flight": self.in_flight, **self.stats}
@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from .file_cache import CACHE_DIRNAME
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_FILENAME = "responses.db"
+RESPONSE_CACHE_VERSION = 1
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY, value TEXT, size INTEGER, created REAL, last_access REAL
+);
+CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def request_key(model: str, messages: List[Dict[str, Any]], max_tokens: int,
+                temperature: Optional[float] = None) -> str:
+    """
+    Hashes the parts of a Messages request that determine its response.
+    The JSON is canonical (sorted keys, no whitespace), so equal requests
+    built in a different order get the same key.
+    """
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Persistent store of model responses in .autocoder/cache/responses.db,
+    keyed by request_key(). Entries expire ttl seconds after they were stored
+    and the least recently used ones are evicted once the store grows past
+    max_bytes.
+    """
+
+    def __init__(self, path: str, ttl: float = DEFAULT_TTL_SECONDS, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] != str(RESPONSE_CACHE_VERSION):
+            logger.info("Response cache has an outdated format and will be cleared.")
+            self._db.execute("DELETE FROM responses")
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(RESPONSE_CACHE_VERSION),))
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @classmethod
+    def for_project(cls, project_root: str, **kwargs) -> Optional["ResponseCache"]:
+        """
+        Opens the project's response cache, or returns None if the project has
+        no .autocoder directory or the database cannot be opened.
+        """
+        autocoder_dir = os.path.join(str(project_root), ".autocoder")
+        if not os.path.isdir(autocoder_dir):
+            return None
+        try:
+            cache_dir = os.path.join(autocoder_dir, CACHE_DIRNAME)
+            os.makedirs(cache_dir, exist_ok=True)
+            return cls(os.path.join(cache_dir, RESPONSE_CACHE_FILENAME), **kwargs)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Response cache unavailable: {e}")
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, size, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[2] > self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= row[1]
+                self.stats["expired"] += 1
+                row = None
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        data = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            previous = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (key, data, len(data), now, now))
+            self._total_bytes += len(data) - (previous[0] if previous else 0)
+            self.stats["stored"] += 1
+            if self._total_bytes > self.max_bytes:
+                self._evict(now)
+
+    def _evict(self, now: float):
+        # Expired entries go first, then the least recently used down to 90% of max_bytes
+        with self._db:
+            self._db.execute("BEGIN")
+            expired = self._db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+            target = int(self.max_bytes * 0.9)
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            victims = []
+            for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_access"):
+                if total <= target:
+                    break
+                victims.append((key,))
+                total -= size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        self._total_bytes = total
+        self.stats["expired"] += expired
+        self.stats["evicted"] += len(victims)
+        logger.debug(f"Evicted {len(victims)} responses and {expired} expired ones from the response cache")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
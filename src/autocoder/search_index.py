@@ -0,0 +1,225 @@
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+from functools import lru_cache
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from .file_cache import FileCache, get_file_cache
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_FILENAME = "search_index.db"
+SEARCH_INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Path components say a lot about what a file is for, so they count as several occurrences.
+PATH_WEIGHT = 3
+DEFAULT_TOP_K = 20
+MAX_TERM_LENGTH = 64
+# Postings inserts land all over the term B-tree; a larger page cache keeps a full rebuild fast.
+SQLITE_CACHE_KB = 64 * 1024
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it", "of",
+    "on", "or", "that", "the", "this", "to", "with", "please", "should", "would", "we", "i",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY, path TEXT UNIQUE, digest TEXT, length INTEGER
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT, doc_id INTEGER, tf INTEGER, PRIMARY KEY (term, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+@lru_cache(maxsize=65536)
+def _expand_identifier(identifier: str) -> Tuple[str, ...]:
+    lowered = identifier.lower()
+    if len(lowered) > MAX_TERM_LENGTH:
+        return ()
+    terms = []
+    stripped = lowered.strip("_")
+    if len(stripped) > 1:
+        terms.append(stripped)
+    parts = [part.lower() for chunk in identifier.split("_") for part in _CAMEL_PART.findall(chunk)]
+    if len(parts) > 1:
+        terms.extend(part for part in parts if len(part) > 1)
+    return tuple(terms)
+
+
+def identifier_terms(text: str) -> List[str]:
+    """
+    Splits text into lowercase search terms. Every identifier yields itself
+    and, when it is compound, its snake_case and camelCase parts, so
+    "parseConfigFile" matches queries for "config" as well as the full name.
+    """
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        terms.extend(_expand_identifier(identifier))
+    return terms
+
+
+def term_counts(text: str) -> Counter:
+    """Counts identifier_terms(text), expanding each distinct identifier once."""
+    counts = Counter()
+    for identifier, occurrences in Counter(_IDENTIFIER.findall(text)).items():
+        for term in _expand_identifier(identifier):
+            counts[term] += occurrences
+    return counts
+
+
+def query_terms(query: str) -> List[str]:
+    return [term for term in identifier_terms(query) if term not in STOPWORDS]
+
+
+def path_terms(rel_path: str) -> List[str]:
+    return identifier_terms(rel_path.replace(os.sep, " ").replace(".", " ")) * PATH_WEIGHT
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over project files, persisted in
+    .autocoder/search_index.db.
+
+    update() brings it in line with a file listing by re-indexing only files
+    whose content digest changed (looked up through the shared file cache,
+    so unchanged files are not read) and dropping files that disappeared.
+    search() then ranks files for a query from the stored postings alone.
+    """
+
+    def __init__(self, project_root: str, index_path: Optional[str] = None,
+                 file_cache: Optional[FileCache] = None):
+        self.project_root = str(project_root)
+        self.file_cache = file_cache or get_file_cache(project_root)
+        autocoder_dir = os.path.join(self.project_root, ".autocoder")
+        if index_path is None:
+            index_path = os.path.join(autocoder_dir, SEARCH_INDEX_FILENAME) if os.path.isdir(autocoder_dir) else ":memory:"
+        self.index_path = index_path
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        # BM25 length normalisation per document, computed on the first search after an update
+        self._norms: Optional[Dict[int, float]] = None
+        self._db = sqlite3.connect(index_path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KB}")
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is not None and row[0] != str(SEARCH_INDEX_VERSION):
+            logger.info("Search index has an outdated format and will be rebuilt.")
+            self._db.executescript("DELETE FROM postings; DELETE FROM docs;")
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (str(SEARCH_INDEX_VERSION),))
+
+    def update(self, project_files: List[str], skipped_files: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        """
+        Re-indexes changed files and drops removed ones. Files in skipped_files
+        (binaries, oversized files) are indexed by path only, without reading them.
+
+        Returns:
+        Dict[str, int]: Number of files indexed, unchanged and removed.
+        """
+        with self._lock:
+            known = {path: (doc_id, digest) for doc_id, path, digest in
+                     self._db.execute("SELECT doc_id, path, digest FROM docs")}
+            counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+            with self._db:
+                for rel_path in project_files:
+                    if rel_path in (skipped_files or {}):
+                        digest = self._stat_digest(rel_path)
+                    else:
+                        digest = self.file_cache.digest(rel_path)
+                    previous = known.pop(rel_path, None)
+                    if previous is not None and previous[1] == digest:
+                        counts["unchanged"] += 1
+                        continue
+                    if previous is not None:
+                        self._remove(previous[0])
+                    if digest is not None:
+                        self._add(rel_path, digest, read=rel_path not in (skipped_files or {}))
+                        counts["indexed"] += 1
+                for doc_id, _ in known.values():
+                    self._remove(doc_id)
+                    counts["removed"] += 1
+            self.file_cache.flush()
+            if counts["indexed"] or counts["removed"]:
+                self._norms = None
+        if counts["indexed"] or counts["removed"]:
+            logger.info(f"Search index: {counts['indexed']} files indexed, {counts['removed']} removed, "
+                        f"{counts['unchanged']} unchanged")
+        return counts
+
+    def _stat_digest(self, rel_path: str) -> Optional[str]:
+        try:
+            st = os.stat(os.path.join(self.project_root, rel_path))
+        except OSError:
+            return None
+        return f"stat:{st.st_ino}:{st.st_mtime_ns}:{st.st_size}"
+
+    def _add(self, rel_path: str, digest: str, read: bool = True):
+        text = ""
+        if read:
+            try:
+                text = self.file_cache.read_text(rel_path)
+            except (OSError, UnicodeDecodeError):
+                # Still index the path so the file can be found by name
+                pass
+        terms = term_counts(text)
+        terms.update(path_terms(rel_path))
+        cursor = self._db.execute(
+            "INSERT INTO docs (path, digest, length) VALUES (?, ?, ?)", (rel_path, digest, sum(terms.values())))
+        self._db.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?)", [(term, cursor.lastrowid, tf) for term, tf in terms.items()])
+
+    def _remove(self, doc_id: int):
+        self._db.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[str, float]]:
+        """
+        Ranks indexed files against a query with BM25.
+
+        Returns:
+        List[Tuple[str, float]]: Up to top_k (path, score) pairs, best first.
+        """
+        terms = Counter(query_terms(query))
+        if not terms:
+            return []
+        with self._lock:
+            if self._norms is None:
+                lengths = dict(self._db.execute("SELECT doc_id, length FROM docs"))
+                avg_length = sum(lengths.values()) / max(len(lengths), 1)
+                self._norms = {doc_id: BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                               for doc_id, length in lengths.items()}
+            norms = self._norms
+            doc_count = len(norms)
+            if doc_count == 0:
+                return []
+            scores: Dict[int, float] = {}
+            for term, query_tf in terms.items():
+                postings = self._db.execute("SELECT doc_id, tf FROM postings WHERE term = ?", (term,)).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                weight = query_tf * idf * (BM25_K1 + 1)
+                for doc_id, tf in postings:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norms[doc_id])
+            best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+            paths = dict(self._db.execute(
+                f"SELECT doc_id, path FROM docs WHERE doc_id IN ({','.join('?' * len(best))})",
+                [doc_id for doc_id, _ in best]).fetchall()) if best else {}
+        self.stats["queries"] += 1
+        return [(paths[doc_id], score) for doc_id, score in best]
+
+    def close(self):
+        self._db.close()
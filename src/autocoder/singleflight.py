@@ -0,0 +1,89 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller makes the
+    call, callers arriving while it is in flight wait for it and share its
+    result or exception. Once the call finishes the key is forgotten, so a
+    later caller makes a new call.
+
+    stats counts "calls" made and "coalesced" callers that shared one.
+    """
+
+    def __init__(self):
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Returns:
+        Tuple[Any, bool]: fn()'s result, and whether it came from another
+        caller's call.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            shared = call is not None
+            if shared:
+                self.stats["coalesced"] += 1
+            else:
+                call = self._calls[key] = _Call()
+                self.stats["calls"] += 1
+        if shared:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Async counterpart of do(). The call runs as its own task, so one
+        caller being cancelled or timing out does not affect the others; the
+        call is cancelled when no caller is waiting for it any more.
+        """
+        with self._lock:
+            flight = self._tasks.get(key)
+            shared = flight is not None
+            if shared:
+                self.stats["coalesced"] += 1
+            else:
+                flight = self._tasks[key] = {"task": asyncio.ensure_future(fn()), "waiters": 0}
+                flight["task"].add_done_callback(lambda _: self._forget(key, flight))
+                self.stats["calls"] += 1
+            flight["waiters"] += 1
+        try:
+            return await asyncio.shield(flight["task"]), shared
+        finally:
+            with self._lock:
+                flight["waiters"] -= 1
+                abandoned = flight["waiters"] == 0 and not flight["task"].done()
+            if abandoned:
+                flight["task"].cancel()
+
+    def _forget(self, key: str, flight: Dict[str, Any]):
+        with self._lock:
+            if self._tasks.get(key) is flight:
+                del self._tasks[key]
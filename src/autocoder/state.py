@@ -1,9 +1,10 @@
-from typing import Annotated, TypedDict, List, Dict
+from typing import Annotated, Any, TypedDict, List, Dict
 from langgraph.graph.message import add_messages
 from langchain_core.messages import BaseMessage
 
 class State(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]  # Ensure this line exists
+    # Large texts are blob references (see blob_store): file path -> reference, and the context's reference
     files: Dict[str, str]
     context: str
     interpreted_task: Dict[str, any]
@@ -11,3 +12,18 @@ class State(TypedDict):
     test_results: str
     project_root: str
     autocoder_dir_exists: bool
+    closure_depth: int
+    # Set by file listing; the task node retrieves its context from them
+    project_files: List[str]
+    skipped_files: Dict[str, str]
+    # Files the task names; the task context follows their imports and importers
+    affected_files: List[str]
+    # The task loop: the packed context's reference, reused verbatim on every
+    # attempt, the tokens used so far, the outcome of the last attempt and
+    # the number of attempts
+    task_context: str
+    token_usage: Dict[str, int]
+    task_result: str
+    task_completed: bool
+    current_iteration: int
+    error: Any
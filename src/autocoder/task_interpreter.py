@@ -4,6 +4,8 @@ import re
 from langchain_core.tools import Tool
 from langgraph.prebuilt import ToolNode
 from pydantic import BaseModel, Field
+from .search_index import SearchIndex
+from .import_graph import ImportGraph, DEFAULT_CLOSURE_DEPTH, resolve_file_names
 
 class TaskType(Enum):
     ADD_FEATURE = "add_feature"
@@ -33,14 +35,31 @@ def task_interpreter(state: Dict, args: TaskInterpreterArgs) -> Dict:
             task_type = t_type
             break
 
-    file_pattern = r'\b[\w-]+\.(py|js|html|css|md)\b'
-    affected_files = list(set(re.findall(file_pattern, args.task_description)))
+    # Whole file names, in the order the task mentions them
+    file_pattern = r'\b[\w-]+\.(?:py|js|html|css|md)\b'
+    affected_files = list(dict.fromkeys(re.findall(file_pattern, args.task_description)))
 
     subtasks = [subtask.strip() for subtask in args.task_description.split(". ") if subtask.strip()]
 
+    relevant_files, dependency_files = [], []
+    if state.get("project_root") and state.get("project_files"):
+        index = SearchIndex(state["project_root"])
+        index.update(state["project_files"], state.get("skipped_files"))
+        relevant_files = [path for path, _ in index.search(args.task_description)]
+        index.close()
+
+        # Pull in what the named files import and what imports them
+        mentioned = resolve_file_names(affected_files, state["project_files"])
+        if mentioned:
+            graph = ImportGraph(state["project_root"]).update(state["project_files"])
+            depth = state.get("closure_depth")
+            dependency_files = graph.closure(mentioned, DEFAULT_CLOSURE_DEPTH if depth is None else depth)
+
     return {
         "task_type": task_type.value,
         "affected_files": affected_files,
+        "relevant_files": relevant_files,
+        "dependency_files": dependency_files,
         "subtasks": subtasks
     }
 
@@ -0,0 +1,208 @@
+import os
+import json
+import math
+import time
+import queue
+import atexit
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+METRICS_FILENAME = "metrics.jsonl"
+DEFAULT_STATS_WINDOW = "7d"
+WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+# USD per million tokens (input, output). Cache writes cost 1.25 times the
+# input price and cache reads 0.1 times, as billed for prompt caching.
+MODEL_PRICES = {
+    "claude-3-opus-20240229": (15.0, 75.0),
+    "claude-3-5-sonnet-20240620": (3.0, 15.0),
+    "claude-3-sonnet-20240229": (3.0, 15.0),
+    "claude-3-haiku-20240307": (0.25, 1.25),
+}
+CACHE_WRITE_PRICE_FACTOR = 1.25
+CACHE_READ_PRICE_FACTOR = 0.1
+
+
+class MetricsWriter:
+    """
+    Appends one JSON line per model call to .autocoder/metrics.jsonl.
+
+    record() only puts the record on a queue; a background thread writes
+    queued records in batches, so a slow disk never delays a request. Records
+    still queued are written by close(), which also runs at exit.
+    """
+
+    def __init__(self, path: str, command: Optional[str] = None):
+        self.path = path
+        self.command = command
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_loop, name="metrics-writer", daemon=True)
+        self._thread.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    @classmethod
+    def for_project(cls, project_root: str, command: Optional[str] = None) -> Optional["MetricsWriter"]:
+        """Opens the project's metrics ledger, or returns None if the project has no .autocoder directory."""
+        autocoder_dir = os.path.join(str(project_root), ".autocoder")
+        if not os.path.isdir(autocoder_dir):
+            return None
+        return cls(os.path.join(autocoder_dir, METRICS_FILENAME), command)
+
+    def record(self, node: str, model: str, latency: float, usage: Optional[Dict[str, int]] = None,
+               cached: bool = False, error: Optional[str] = None, **fields: Any):
+        """
+        Queues a record of one call.
+
+        Args:
+        node (str): The part of the workflow that made the call.
+        model (str): The model the request was for.
+        latency (float): Seconds from sending the request to having the whole response.
+        usage (Optional[Dict[str, int]]): Token counts, see claude_api_wrapper.usage_counts.
+        cached (bool): Whether the response came from the response cache instead of the API.
+        error (Optional[str]): Why the call failed, if it did.
+        """
+        record = {"ts": time.time(), "command": self.command, "node": node, "model": model,
+                  "latency": round(latency, 4), "cached": cached, **(usage or {}), **fields}
+        if error is not None:
+            record["error"] = error
+        self._queue.put(record)
+
+    def _write_loop(self):
+        while True:
+            records = [self._queue.get()]
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in records
+            lines = "".join(json.dumps(record) + "\n" for record in records if record is not None)
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(lines)
+                except OSError as e:
+                    logger.warning(f"Could not write metrics to {self.path}: {str(e)}")
+            if done:
+                return
+
+    def close(self):
+        """Writes every queued record and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+
+def parse_window(window: str) -> float:
+    """Seconds in a window like "90m", "24h" or "7d"; a bare number is in seconds."""
+    window = window.strip().lower()
+    if window and window[-1] in WINDOW_UNITS:
+        return float(window[:-1]) * WINDOW_UNITS[window[-1]]
+    return float(window)
+
+
+def read_metrics(path: str, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Records in the ledger at path made at or after since (a time.time() value); unreadable lines are skipped."""
+    if not os.path.isfile(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since is None or record.get("ts", 0) >= since:
+                yield record
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of values, or None if there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def estimate_cost(record: Dict[str, Any]) -> Optional[float]:
+    """Estimated USD cost of a call, or None for a model without known prices. Cached responses cost nothing."""
+    if record.get("cached"):
+        return 0.0
+    prices = MODEL_PRICES.get(record.get("model"))
+    if prices is None:
+        return None
+    input_price, output_price = prices
+    return (record.get("input_tokens", 0) * input_price
+            + record.get("cache_creation_input_tokens", 0) * input_price * CACHE_WRITE_PRICE_FACTOR
+            + record.get("cache_read_input_tokens", 0) * input_price * CACHE_READ_PRICE_FACTOR
+            + record.get("output_tokens", 0) * output_price) / 1_000_000
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregates records per command, plus a "total" entry.
+
+    Returns:
+    Dict[str, Dict[str, Any]]: For each command, the number of calls, cache
+    hits, coalesced calls and errors, p50/p95 latency of the calls that
+    reached the API, token totals and the estimated cost (calls to models
+    without known prices are counted in unpriced_calls instead).
+    """
+    groups = defaultdict(list)
+    for record in records:
+        groups[record.get("command") or "-"].append(record)
+        groups["total"].append(record)
+
+    summary = {}
+    for command, group in groups.items():
+        latencies = [r["latency"] for r in group if not r.get("cached") and "error" not in r]
+        costs = [estimate_cost(r) for r in group]
+        summary[command] = {
+            "calls": len(group),
+            "cached": sum(1 for r in group if r.get("cached")),
+            "coalesced": sum(1 for r in group if r.get("coalesced")),
+            "errors": sum(1 for r in group if "error" in r),
+            "p50_latency": percentile(latencies, 50),
+            "p95_latency": percentile(latencies, 95),
+            "input_tokens": sum(r.get("input_tokens", 0) + r.get("cache_creation_input_tokens", 0)
+                                + r.get("cache_read_input_tokens", 0) for r in group),
+            "cache_read_input_tokens": sum(r.get("cache_read_input_tokens", 0) for r in group),
+            "output_tokens": sum(r.get("output_tokens", 0) for r in group),
+            "cost": sum(cost for cost in costs if cost is not None),
+            "unpriced_calls": sum(1 for cost in costs if cost is None),
+        }
+    return summary
+
+
+def format_stats(summary: Dict[str, Dict[str, Any]], window: str) -> str:
+    if not summary:
+        return f"No model calls recorded in the last {window}."
+
+    def seconds(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value:.2f}"
+
+    lines = [f"Model calls in the last {window}:",
+             f"{'command':<12} {'calls':>6} {'cached':>6} {'errors':>6} {'p50 s':>7} {'p95 s':>7} "
+             f"{'input tok':>10} {'output tok':>10} {'cost $':>9}"]
+    commands = sorted(command for command in summary if command != "total") + ["total"]
+    for command in commands:
+        s = summary[command]
+        lines.append(f"{command:<12} {s['calls']:>6} {s['cached']:>6} {s['errors']:>6} "
+                     f"{seconds(s['p50_latency']):>7} {seconds(s['p95_latency']):>7} "
+                     f"{s['input_tokens']:>10} {s['output_tokens']:>10} {s['cost']:>9.4f}")
+    total = summary["total"]
+    if total["input_tokens"]:
+        lines.append(f"\n{total['cache_read_input_tokens'] / total['input_tokens']:.0%} of input tokens "
+                     f"were read from the prompt cache.")
+    if total["coalesced"]:
+        lines.append(f"{total['coalesced']} calls shared the response of an identical request already in flight.")
+    if total["unpriced_calls"]:
+        lines.append(f"{total['unpriced_calls']} calls used models without known prices and are not in the cost.")
+    return "\n".join(lines)
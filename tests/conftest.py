@@ -0,0 +1,13 @@
+import threading
+import pytest
+from fake_messages import FakeMessagesServer
+
+
+@pytest.fixture
+def fake_messages_server():
+    server = FakeMessagesServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
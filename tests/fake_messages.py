@@ -0,0 +1,216 @@
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class FakeMessagesServer(ThreadingHTTPServer):
+    """
+    Local stand-in for the Anthropic Messages endpoint, for tests and
+    benchmarks that must not call the API. Replies echo the last user
+    message, cut to max_tokens words (one word is one token); a message of
+    the form "sleep:<seconds>" is answered after that delay and
+    "status:<code>" fails with that HTTP status.
+
+    Every response starts after latency seconds and its words are produced
+    token_delay seconds apart (1 / tokens_per_second); streaming requests
+    get them as they are produced.
+
+    Prompt caching is emulated: the text up to a block with cache_control is
+    reported as cache_creation_input_tokens the first time it is seen and as
+    cache_read_input_tokens afterwards, one token per word.
+
+    Rate limits are emulated too: with rate_limit = (requests, seconds), a
+    request beyond that many in the sliding window gets a 429 with
+    retry-after, and every response carries anthropic-ratelimit-requests-*
+    headers. Statuses put in fail_next are returned first, one per request.
+    """
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 tokens_per_second: Optional[float] = None):
+        super().__init__((host, port), FakeMessagesHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency = latency
+        self.token_delay = 1.0 / tokens_per_second if tokens_per_second else 0.0
+        self.cached_prefixes = set()
+        self.rate_limit = None
+        self.accepted = deque()
+        self.fail_next = []
+        self.rejected = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeMessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body["headers"] = dict(self.headers)
+        server = self.server
+        with server.lock:
+            server.requests.append(body)
+            rejection = self.rejection()
+            if rejection is None:
+                usage = self.usage(body)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            prompt = self.text(body["messages"][-1]["content"])
+            if rejection is not None:
+                status, headers = rejection
+                payload = {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}}
+                self.send_json(status, payload, headers)
+                return
+            status = 200
+            time.sleep(server.latency)
+            if prompt.startswith("sleep:"):
+                time.sleep(float(prompt.split(":", 1)[1]))
+            elif prompt.startswith("status:"):
+                status = int(prompt.split(":", 1)[1])
+            words = f"echo: {prompt}".split(" ")
+            stop_reason = "max_tokens" if len(words) > body["max_tokens"] else "end_turn"
+            words = words[:body["max_tokens"]]
+            if status == 200 and body.get("stream"):
+                self.send_stream(body, words, stop_reason, usage)
+                return
+            if status == 200:
+                time.sleep(server.token_delay * len(words))
+                payload = {
+                    "id": f"msg_{len(server.requests)}", "type": "message", "role": "assistant",
+                    "model": body["model"], "stop_reason": stop_reason, "stop_sequence": None,
+                    "content": [{"type": "text", "text": " ".join(words)}],
+                    "usage": {**usage, "output_tokens": len(words)},
+                }
+            else:
+                payload = {"type": "error", "error": {"type": "invalid_request_error", "message": prompt}}
+            self.send_json(status, payload, self.rate_headers)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up on the request (timeout or cancellation)
+            pass
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def rejection(self):
+        """Status and headers to fail this request with, or None. Called with the server lock held."""
+        server = self.server
+        self.rate_headers = {}
+        if server.fail_next:
+            server.rejected += 1
+            return server.fail_next.pop(0), {"retry-after": "0.2"}
+        if server.rate_limit is None:
+            return None
+        limit, window = server.rate_limit
+        now = time.monotonic()
+        while server.accepted and server.accepted[0] <= now - window:
+            server.accepted.popleft()
+        full = len(server.accepted) >= limit
+        if not full:
+            server.accepted.append(now)
+        # The reset header says when the whole budget is back, retry-after when the next request fits
+        retry_after = server.accepted[0] + window - now
+        reset_at = datetime.now(timezone.utc) + timedelta(seconds=server.accepted[-1] + window - now)
+        self.rate_headers = {
+            "anthropic-ratelimit-requests-limit": str(limit),
+            "anthropic-ratelimit-requests-remaining": str(limit - len(server.accepted)),
+            "anthropic-ratelimit-requests-reset": reset_at.isoformat(),
+        }
+        if full:
+            server.rejected += 1
+            return 429, {**self.rate_headers, "retry-after": f"{retry_after:.3f}"}
+        return None
+
+    def send_json(self, status, payload, headers=()):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in dict(headers).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def text(content):
+        if isinstance(content, str):
+            return content
+        return "".join(block["text"] for block in content)
+
+    def usage(self, body):
+        words, seen, prefix = 0, [], None
+        for message in body["messages"]:
+            content = message["content"]
+            for block in [{"text": content}] if isinstance(content, str) else content:
+                words += len(block["text"].split())
+                seen.append([message["role"], block["text"]])
+                if "cache_control" in block:
+                    prefix = (json.dumps(seen), words)
+        if prefix is None:
+            return {"input_tokens": words}
+        key, prefix_words = prefix
+        field = "cache_read_input_tokens" if key in self.server.cached_prefixes else "cache_creation_input_tokens"
+        self.server.cached_prefixes.add(key)
+        return {"input_tokens": words - prefix_words, field: prefix_words}
+
+    def send_stream(self, body, words, stop_reason, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for name, value in self.rate_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+        message = {
+            "id": "msg_stream", "type": "message", "role": "assistant", "model": body["model"], "content": [],
+            "stop_reason": None, "stop_sequence": None, "usage": {**usage, "output_tokens": 1},
+        }
+        events = [("message_start", {"type": "message_start", "message": message}),
+                  ("content_block_start", {"type": "content_block_start", "index": 0,
+                                           "content_block": {"type": "text", "text": ""}})]
+        events += [("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                            "delta": {"type": "text_delta", "text": word if i == 0 else f" {word}"}})
+                   for i, word in enumerate(words)]
+        events += [("content_block_stop", {"type": "content_block_stop", "index": 0}),
+                   ("message_delta", {"type": "message_delta", "usage": {"output_tokens": len(words)},
+                                      "delta": {"stop_reason": stop_reason, "stop_sequence": None}}),
+                   ("message_stop", {"type": "message_stop"})]
+        for name, data in events:
+            if name == "content_block_delta":
+                time.sleep(self.server.token_delay)
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Anthropic Messages endpoint for offline runs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response starts")
+    parser.add_argument("--tokens-per-second", type=float, help="Output speed (default: instant)")
+    args = parser.parse_args()
+    server = FakeMessagesServer(port=args.port, latency=args.latency, tokens_per_second=args.tokens_per_second)
+    print(f"Fake Messages endpoint at {server.base_url}; set ANTHROPIC_BASE_URL to use it")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
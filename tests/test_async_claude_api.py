@@ -0,0 +1,81 @@
+import asyncio
+import time
+import pytest
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper
+
+
+def make_wrapper(server, **kwargs):
+    return AsyncClaudeAPIWrapper("test-key", base_url=server.base_url, **kwargs)
+
+
+def request(prompt, **args):
+    return {"messages": [{"role": "user", "content": prompt}], "max_tokens": 10, **args}
+
+
+def test_generate_many_bounds_concurrency_and_keeps_order(fake_messages_server):
+    async def run():
+        wrapper = make_wrapper(fake_messages_server, max_concurrency=2)
+        prompts = ["sleep:0.3", "sleep:0.1", "sleep:0.2", "sleep:0.0", "sleep:0.1", "sleep:0.2"]
+        started = time.perf_counter()
+        results = await wrapper.generate_many([request(prompt) for prompt in prompts])
+        elapsed = time.perf_counter() - started
+        await wrapper.close()
+        return prompts, results, elapsed
+
+    prompts, results, elapsed = asyncio.run(run())
+    assert [result["response"] for result in results] == [f"echo: {prompt}" for prompt in prompts]
+    assert fake_messages_server.max_in_flight == 2
+    # 0.9 s of work split over two slots, against 0.9 s one after another
+    assert elapsed < 0.8
+
+
+def test_timeouts_and_errors_only_fail_their_own_request(fake_messages_server):
+    async def run():
+        wrapper = make_wrapper(fake_messages_server)
+        results = await wrapper.generate_many([
+            request("sleep:2", timeout=0.2), request("status:400"), request("hello"),
+        ])
+        await wrapper.close()
+        return results
+
+    timed_out, failed, ok = asyncio.run(run())
+    assert timed_out == {"error": "Request timed out after 0.2 seconds"}
+    assert "error" in failed
+    assert ok["response"] == "echo: hello"
+
+
+def test_cancelling_generate_many_stops_pending_requests(fake_messages_server):
+    async def run():
+        wrapper = make_wrapper(fake_messages_server, max_concurrency=1)
+        batch = asyncio.ensure_future(wrapper.generate_many([request("sleep:0.5")] * 3))
+        await asyncio.sleep(0.2)
+        batch.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await batch
+        await asyncio.sleep(0.5)
+        await wrapper.close()
+
+    asyncio.run(run())
+    assert len(fake_messages_server.requests) == 1
+
+
+def test_generate_many_builds_requests_only_as_slots_free_up(fake_messages_server):
+    built = []
+
+    def requests():
+        for index in range(5):
+            # Requests the server has received when this one is built
+            built.append(len(fake_messages_server.requests))
+            yield request(f"sleep:0.1{index}")
+
+    async def run():
+        wrapper = make_wrapper(fake_messages_server, max_concurrency=2)
+        results = await wrapper.generate_many(requests())
+        await wrapper.close()
+        return results
+
+    results = asyncio.run(run())
+    assert [result["response"] for result in results] == [f"echo: sleep:0.1{index}" for index in range(5)]
+    # Built up front, every request would be built before any was sent
+    assert built[0] == 0
+    assert all(count >= index - 2 for index, count in enumerate(built))
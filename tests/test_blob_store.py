@@ -0,0 +1,92 @@
+import time
+import pytest
+from autocoder.blob_store import BlobStore, LazyFiles, get_blob_store, is_blob_ref, resolve_text, store_text
+from autocoder.error_handler import ErrorHandler
+
+CONTEXT = "#File app.py:\n" + "def handler(request):\n    pass\n" * 10000
+
+
+def test_references_resolve_across_processes(tmp_path):
+    store = BlobStore(str(tmp_path / "state.db"))
+    ref = store.put(CONTEXT)
+    assert is_blob_ref(ref) and len(ref) < 40
+    assert store.put(CONTEXT) == ref
+    assert BlobStore(str(tmp_path / "state.db")).get(ref) == CONTEXT
+
+
+def test_state_values_are_stored_per_project(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    state = {"project_root": str(tmp_path)}
+    state["context"] = store_text(state, CONTEXT)
+    assert get_blob_store(str(tmp_path)).persistent
+    assert (tmp_path / ".autocoder" / "cache" / "state.db").exists()
+    assert resolve_text(state, state["context"]) == CONTEXT
+    # Text from checkpoints written before references is used as it is
+    assert resolve_text(state, "inline context") == "inline context"
+
+
+def test_files_are_resolved_only_when_read():
+    store = BlobStore()
+    refs = {"a.py": store.put("print('a')"), "b.py": store.put("print('b')")}
+    del store._memory[refs["b.py"][len("blob:"):]]
+    files = LazyFiles(store, refs)
+    assert list(files) == ["a.py", "b.py"] and "b.py" in files
+    assert files["a.py"] == "print('a')"
+
+
+def test_prune_drops_blobs_not_stored_recently(tmp_path):
+    store = BlobStore(str(tmp_path / "state.db"))
+    old, recent = store.put("old"), store.put("recent")
+    store._db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time() - 3600, old[len("blob:"):]))
+    assert store.prune(max_age=60) == 1
+    assert store.get(recent) == "recent"
+
+
+def test_error_reports_do_not_copy_the_state():
+    @ErrorHandler.wrap_node
+    def failing_node(state):
+        raise ValueError("no context")
+
+    state = failing_node({"context": CONTEXT, "files": {"app.py": CONTEXT}, "project_root": "/project"})
+    reported = state["error"]["context"]["state"]
+    assert reported["project_root"] == "/project"
+    assert reported["context"] == f"<str of length {len(CONTEXT)}>"
+    assert reported["files"] == "<dict of length 1>"
+    assert len(repr(state["error"])) < len(CONTEXT) / 10
+
+
+def test_prune_keeps_blobs_a_resumable_run_refers_to(tmp_path):
+    from typing import TypedDict
+    from langgraph.graph import StateGraph, END
+    from autocoder.checkpoints import CheckpointStore
+
+    class Context(TypedDict):
+        context: str
+
+    blobs = BlobStore(str(tmp_path / "state.db"))
+    checkpoints = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    workflow = StateGraph(Context)
+    workflow.add_node("build_context", lambda state: {"context": blobs.put(CONTEXT)})
+    workflow.set_entry_point("build_context")
+    workflow.add_edge("build_context", END)
+    workflow.compile(checkpointer=checkpoints.saver).invoke({"context": ""}, CheckpointStore.graph_config("run"))
+    referenced, unreferenced = blobs.put(CONTEXT), blobs.put("no checkpoint refers to this")
+
+    # Both were stored long ago; only the one the run's checkpoint holds survives
+    blobs._db.execute("UPDATE blobs SET last_access = ?", (time.time() - 3600,))
+    assert blobs.prune(max_age=60, keep=checkpoints.blob_refs()) == 1
+    checkpoints.close()
+    assert blobs.get(referenced) == CONTEXT
+    with pytest.raises(KeyError):
+        blobs.get(unreferenced)
+
+
+def test_graph_file_listing_stores_no_blobs(tmp_path):
+    from autocoder.nodes.file_listing_node import FileListingArgs, file_listing
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "app.py").write_text(CONTEXT)
+    state = file_listing({"claude_api": None, "project_root": str(tmp_path)},
+                         FileListingArgs(project_root=str(tmp_path)))
+    assert state["project_files"] == ["app.py"]
+    store = get_blob_store(str(tmp_path))
+    assert store.persistent and store._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
@@ -0,0 +1,179 @@
+import time
+from typing import List, TypedDict
+from langgraph.graph import StateGraph, END
+from autocoder.checkpoints import COMPLETED, CheckpointStore, new_run_id
+
+
+class Steps(TypedDict):
+    done: List[str]
+    # Lets the graph take the input stream_execution gives the task graph
+    project_root: str
+
+
+def build_graph(store, calls, fail_at=None, hold=None):
+    # hold maps node names to events they wait for after starting
+    def node(name):
+        def run(state):
+            calls.append(name)
+            if hold and name in hold:
+                hold[name].wait(5)
+            if name == fail_at:
+                raise RuntimeError(f"{name} crashed")
+            return {"done": (state.get("done") or []) + [name]}
+        return run
+
+    workflow = StateGraph(Steps)
+    for name in ("list_files", "analyze", "generate"):
+        workflow.add_node(name, node(name))
+    workflow.set_entry_point("list_files")
+    workflow.add_edge("list_files", "analyze")
+    workflow.add_edge("analyze", "generate")
+    workflow.add_edge("generate", END)
+    return workflow.compile(checkpointer=store.saver)
+
+
+def checkpoint_count(store, run_id):
+    return store._db.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (run_id,)).fetchone()[0]
+
+
+def test_resume_continues_after_the_last_completed_node(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    run_id = new_run_id()
+    store.start_run(run_id, "add logging")
+    config = CheckpointStore.graph_config(run_id)
+    calls = []
+    try:
+        list(build_graph(store, calls, fail_at="generate").stream({"done": []}, config))
+    except RuntimeError:
+        pass
+    store.close()
+    assert calls == ["list_files", "analyze", "generate"]
+
+    # A new process opens the store again and continues with no input
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    assert store.get_run(run_id)["task"] == "add logging"
+    calls = []
+    graph = build_graph(store, calls)
+    list(graph.stream(None, config))
+    assert calls == ["generate"]
+    assert graph.get_state(config).values["done"] == ["list_files", "analyze", "generate"]
+    assert not graph.get_state(config).next
+
+
+def test_prune_compacts_runs_to_their_latest_checkpoint(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    run_id = new_run_id()
+    store.start_run(run_id, "task")
+    config = CheckpointStore.graph_config(run_id)
+    try:
+        list(build_graph(store, [], fail_at="generate").stream({"done": []}, config))
+    except RuntimeError:
+        pass
+    assert checkpoint_count(store, run_id) > 1
+
+    assert store.prune()["runs"] == 0
+    assert checkpoint_count(store, run_id) == 1
+
+    # The compacted run still resumes from where it stopped
+    calls = []
+    list(build_graph(store, calls).stream(None, config))
+    assert calls == ["generate"]
+
+
+def test_prune_drops_expired_and_surplus_runs(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"), retention=3600, max_runs=2)
+    graph = build_graph(store, [])
+    run_ids = [f"run{i}" for i in range(4)]
+    for run_id in run_ids:
+        store.start_run(run_id, "task")
+        list(graph.stream({"done": []}, CheckpointStore.graph_config(run_id)))
+        store.finish_run(run_id, COMPLETED)
+    store._db.execute("UPDATE runs SET updated = ? WHERE run_id = 'run3'", (time.time() - 7200,))
+    store._db.commit()
+
+    assert store.prune()["runs"] == 2
+    assert [run["run_id"] for run in store.list_runs()] == ["run2", "run1"]
+    for run_id in run_ids:
+        assert checkpoint_count(store, run_id) == (1 if run_id in ("run1", "run2") else 0)
+
+
+def test_prune_vacuums_only_when_much_of_the_file_is_free(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"), retention=3600)
+    graph = build_graph(store, [])
+
+    def run(run_id, size):
+        store.start_run(run_id, "task")
+        list(graph.stream({"done": ["x" * size]}, CheckpointStore.graph_config(run_id)))
+        store.finish_run(run_id, COMPLETED)
+
+    def expire(run_id):
+        store._db.execute("UPDATE runs SET updated = ? WHERE run_id = ?", (time.time() - 7200, run_id))
+        store._db.commit()
+
+    def free_pages():
+        return store._db.execute("PRAGMA freelist_count").fetchone()[0]
+
+    # Compacting a run to its latest checkpoint frees most of the file
+    run("large", 200_000)
+    store.prune()
+    assert free_pages() == 0
+
+    # A small run's pages are a small share of the file; they are left for reuse
+    run("small", 5_000)
+    expire("small")
+    assert store.prune()["runs"] == 1
+    assert free_pages() > 0
+
+    expire("large")
+    assert store.prune()["runs"] == 1
+    assert free_pages() == 0
+    store.close()
+
+
+def test_store_needs_an_initialized_project(tmp_path):
+    assert CheckpointStore.for_project(str(tmp_path)) is None
+    (tmp_path / ".autocoder").mkdir()
+    store = CheckpointStore.for_project(str(tmp_path))
+    assert store.path == str(tmp_path / ".autocoder" / "checkpoints.db")
+    store.close()
+
+
+def test_closing_the_stream_stops_the_graph_after_the_running_node(tmp_path):
+    import threading
+    from types import SimpleNamespace
+    from autocoder.autocoder import stream_execution
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    run_id = new_run_id()
+    config = CheckpointStore.graph_config(run_id)
+    release = threading.Event()
+    calls = []
+    graph = build_graph(store, calls, hold={"analyze": release})
+
+    outputs = stream_execution(SimpleNamespace(graph=graph, on_event=None), "task", config)
+    assert "list_files" in next(outputs)
+    while "analyze" not in calls:
+        time.sleep(0.01)
+    # Interrupted while analyze runs: closing waits for it, and generate never starts
+    threading.Timer(0.2, release.set).start()
+    outputs.close()
+    assert calls == ["list_files", "analyze"]
+    count = checkpoint_count(store, run_id)
+    time.sleep(0.1)
+    assert checkpoint_count(store, run_id) == count
+    assert graph.get_state(config).next == ("generate",)
+    list(graph.stream(None, config))
+    assert calls == ["list_files", "analyze", "generate"]
+    store.close()
+
+
+def test_resuming_an_unknown_run_closes_the_store(tmp_path, monkeypatch):
+    from autocoder.autocoder import execute_task
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / ".autocoder" / "project_state.txt").write_text("initialized")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+    closed = []
+    close = CheckpointStore.close
+    monkeypatch.setattr(CheckpointStore, "close", lambda self: closed.append(self) or close(self))
+    execute_task("task", resume_run_id="20240101-000000-abcdef")
+    assert len(closed) == 1
@@ -0,0 +1,70 @@
+import os
+import time
+from autocoder.file_listing.packer import ContextPacker, TokenEstimator, estimate_tokens, context_token_budget
+
+
+def make_project(root):
+    (root / ".autocoder").mkdir()
+    (root / "src").mkdir()
+    (root / "tests").mkdir()
+    old = time.time() - 90 * 86400
+    files = {
+        "src/util.py": "def helper(value):\n    return value * 2\n" * 40,
+        "src/main.py": "from util import helper\n\nprint(helper(21))\n",
+        "tests/test_util.py": "def test_helper():\n    assert helper(1) == 2\n" * 40,
+        "pyproject.toml": "[project]\nname = 'demo'\nversion = '0.1.0'\n",
+        "big.txt": "lorem ipsum dolor sit amet\n" * 2000,
+    }
+    for rel_path, content in files.items():
+        (root / rel_path).write_text(content)
+        os.utime(root / rel_path, (old, old))
+    return sorted(files)
+
+
+def test_estimate_tokens_counts_words_symbols_and_long_identifiers():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a = 1") == 5
+    assert estimate_tokens("averyveryverylongidentifier") > estimate_tokens("short")
+    assert context_token_budget("claude-3-opus-20240229", 2000, 1000) == int((200_000 - 3000) * 0.9)
+
+
+def test_pack_fills_budget_in_priority_order(tmp_path):
+    project_files = make_project(tmp_path)
+    (tmp_path / "src" / "util.py").write_text("def helper(value):\n    return value * 3\n" * 40)
+
+    unlimited = ContextPacker(tmp_path).pack(project_files, 100_000)
+    assert unlimited["truncated_files"] == unlimited["omitted_files"] == []
+    # Manifest, entry point and the recently edited file lead; tests come after sources
+    assert unlimited["included_files"][:3] == ["pyproject.toml", "src/main.py", "src/util.py"]
+    assert unlimited["included_files"].index("tests/test_util.py") > unlimited["included_files"].index("src/util.py")
+
+    budget = unlimited["tokens"] // 3
+    packed = ContextPacker(tmp_path).pack(project_files, budget)
+    assert estimate_tokens(packed["context"]) <= budget
+    assert packed["tokens"] <= budget
+    assert packed["truncated_files"] and "[... truncated," in packed["context"]
+    assert set(packed["included_files"] + packed["truncated_files"] + packed["omitted_files"]) == set(project_files)
+    assert packed["context"].startswith("Project Files:\n")
+
+
+def test_estimates_are_cached_until_the_file_changes(tmp_path):
+    project_files = make_project(tmp_path)
+    ContextPacker(tmp_path).pack(project_files, 100_000)
+
+    warm = TokenEstimator(tmp_path)
+    ContextPacker(tmp_path, estimator=warm).pack(project_files, 100_000)
+    assert warm.stats == {"measured": 0, "cached": len(project_files)}
+
+    (tmp_path / "src" / "main.py").write_text("print('changed')\n")
+    changed = TokenEstimator(tmp_path)
+    ContextPacker(tmp_path, estimator=changed).pack(project_files, 100_000)
+    assert changed.stats["measured"] == 1
+
+
+def test_files_past_the_budget_are_left_out_unread(tmp_path):
+    project_files = make_project(tmp_path)
+    estimator = TokenEstimator(tmp_path)
+    packed = ContextPacker(tmp_path, estimator=estimator).pack(project_files, 200)
+    assert packed["included_files"] == packed["truncated_files"] == []
+    assert sorted(packed["omitted_files"]) == project_files
+    assert estimator.stats["measured"] == 0
@@ -0,0 +1,120 @@
+import pytest
+from autocoder.nodes import file_listing_node
+from autocoder.nodes.file_listing_node import FileListingNode
+from autocoder.file_listing.classifier import FileClassifier
+
+
+def legacy_context(project_root, project_files, skipped_files):
+    context = "Project Files:\n"
+    context += "\n".join(project_files)
+    context += "\n\nFile Contents:\n"
+    for file in project_files:
+        if file in skipped_files:
+            context += f'\n\n#File {file}: [Skipped: {FileClassifier.describe(skipped_files[file])}]'
+            continue
+        try:
+            with (project_root / file).open('r', encoding='utf-8') as f:
+                content = f.read()
+            context += f'\n\n#File {file}:\n{content}'
+        except Exception as e:
+            context += f'\n\n#File {file}: [Error reading file: {str(e)}]'
+    return context
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "README.md").write_text("# Title\r\nwindows line endings\r\n")
+    (tmp_path / "pkg" / "mod.py").write_text("def f():\n    return 'zażółć'\n", encoding="utf-8")
+    (tmp_path / "pkg" / "big.txt").write_text("line of text\n" * 5000)
+    (tmp_path / "pkg" / "image.bin").write_bytes(b"\x89PNG\r\n\x1a\n\xff\xfe" * 100)
+    (tmp_path / "empty.txt").write_text("")
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def small_stream_threshold(monkeypatch):
+    # Exercise the chunked streaming path with files of a few KB
+    monkeypatch.setattr(file_listing_node, "STREAM_THRESHOLD", 1024)
+    monkeypatch.setattr(file_listing_node, "READ_CHUNK_SIZE", 1000)
+
+
+def test_streamed_context_matches_legacy_format(project):
+    node = FileListingNode(claude_api=None)
+    result = node.process(str(project), include_context=False)
+    assert 'context' not in result
+    project_files = result['project_files']
+
+    assert result['skipped_files'] == {"pkg/image.bin": "not_utf8"}
+    expected = legacy_context(project, project_files, result['skipped_files'])
+    assert node.build_context(project_files) == expected
+
+    output_path = project / "context.txt"
+    size = node.write_context(project_files, str(output_path))
+    assert output_path.read_text(encoding='utf-8') == expected
+    assert size == len(expected)
+
+
+def test_large_undecodable_file_is_reported_without_partial_content(project):
+    (project / "mixed.txt").write_bytes(b"valid text\n" * 200 + b"\xff\xfe tail")
+    node = FileListingNode(claude_api=None)
+    node.process(str(project), include_context=False)
+    section = "".join(node.iter_file_section("mixed.txt"))
+    assert section.startswith("\n\n#File mixed.txt: [Error reading file:")
+    assert "valid text" not in section
+
+
+def test_zero_copy_export_is_byte_identical(project, monkeypatch):
+    from autocoder.file_listing import export
+    monkeypatch.setattr(export, "ZERO_COPY_MIN_SIZE", 0)
+    (project / "pkg" / "vendored.js").write_text("var x = 'ünïcode';\n" * 20000, encoding="utf-8")
+    node = FileListingNode(claude_api=None)
+    project_files = node.process(str(project), include_context=False)['project_files']
+
+    text_path = project / "text.txt"
+    copy_path = project / "copy.txt"
+    text_size = node.write_context(project_files, str(text_path), zero_copy=False)
+    copy_size = node.write_context(project_files, str(copy_path), zero_copy=True)
+    assert copy_path.read_bytes() == text_path.read_bytes()
+    assert copy_size == text_size == len(node.build_context(project_files))
+
+
+def test_verbatim_check_rejects_carriage_returns_and_invalid_utf8(tmp_path):
+    import os
+    from autocoder.file_listing.export import verbatim_char_count
+    cases = {"ok.txt": ("zażółć\n".encode("utf-8"), 7), "crlf.txt": (b"a\r\nb", None), "bad.txt": (b"ok\xff", None)}
+    for name, (data, expected) in cases.items():
+        (tmp_path / name).write_bytes(data)
+        fd = os.open(tmp_path / name, os.O_RDONLY)
+        try:
+            assert verbatim_char_count(fd, len(data)) == expected, name
+        finally:
+            os.close(fd)
+
+
+def test_files_list_never_builds_the_context(project, monkeypatch):
+    from autocoder.autocoder import create_files_list
+    (project / ".autocoder").mkdir()
+    (project / ".autocoder" / "project_state.txt").write_text("initialized")
+    monkeypatch.chdir(project)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+
+    def build_context(self, *args, **kwargs):
+        raise AssertionError("build_context called for the files list")
+
+    monkeypatch.setattr(FileListingNode, "build_context", build_context)
+    create_files_list()
+    listed = (project / ".autocoder" / "files.txt").read_text().splitlines()
+    assert "pkg/mod.py" in listed and "README.md" in listed
+
+
+def test_graph_file_listing_never_builds_the_context(project, monkeypatch):
+    from autocoder.nodes.file_listing_node import FileListingArgs, file_listing
+
+    def build_context(self, *args, **kwargs):
+        raise AssertionError("build_context called by the graph's file listing")
+
+    monkeypatch.setattr(FileListingNode, "build_context", build_context)
+    state = file_listing({"claude_api": None, "project_root": str(project)},
+                         FileListingArgs(project_root=str(project)))
+    assert "pkg/mod.py" in state["project_files"] and "context" not in state
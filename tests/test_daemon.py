@@ -0,0 +1,83 @@
+import io
+import os
+import threading
+import pytest
+from autocoder import client
+from autocoder.daemon import DaemonServer
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    commands = []
+
+    def run_command(argv):
+        commands.append((argv, os.environ.get("AUTOCODER_LLM_MODE")))
+        if argv == ["fail"]:
+            raise RuntimeError("command failed")
+        print(f"ran {' '.join(argv)}")
+        if argv == ["exit"]:
+            raise SystemExit(3)
+
+    server = DaemonServer(str(tmp_path), run_command)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, commands
+    server.shutdown()
+    server.server_close()
+
+
+def forward(argv, project_root):
+    """Forwards a command and returns its exit code, stdout and stderr."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    code = client.forward(argv, project_root, stdout, stderr)
+    return code, stdout.getvalue(), stderr.getvalue()
+
+
+def test_commands_run_in_the_daemon_with_the_client_environment(daemon, tmp_path, monkeypatch):
+    server, commands = daemon
+    assert oct(os.stat(client.socket_path(str(tmp_path))).st_mode & 0o777) == "0o600"
+    assert forward(["stats", "--since", "1d"], str(tmp_path)) == (0, "ran stats --since 1d\n", "")
+
+    monkeypatch.setenv("AUTOCODER_LLM_MODE", "record")
+    messages = []
+    server.run({"argv": ["task"], "cwd": server.project_root, "env": {"AUTOCODER_LLM_MODE": "replay"}},
+               messages.append)
+    assert messages == [{"type": "stdout", "text": "ran task"}, {"type": "stdout", "text": "\n"},
+                        {"type": "exit", "code": 0}]
+    # The command saw the client's environment, and the daemon's own is back afterwards
+    assert commands[-1] == (["task"], "replay")
+    assert os.environ["AUTOCODER_LLM_MODE"] == "record"
+
+    assert forward(["exit"], str(tmp_path))[0] == 3
+    code, _, err = forward(["fail"], str(tmp_path))
+    assert code == 1 and "command failed" in err
+    assert server.commands == 4
+
+
+def test_cli_falls_back_to_running_in_process(daemon, tmp_path):
+    server, commands = daemon
+    # Another project, a daemon asked to serve again, and no daemon at all
+    other = tmp_path / "other"
+    other.mkdir()
+    assert client.forward(["stats"], str(other)) is None
+    assert client.forward(["serve"], str(tmp_path)) is None
+    server.shutdown()
+    server.server_close()
+    assert client.forward(["stats"], str(tmp_path)) is None
+    assert commands == []
+
+
+def test_real_commands_are_served(tmp_path, monkeypatch):
+    from autocoder.autocoder import main
+    monkeypatch.chdir(tmp_path)
+    main(["init"])
+    server = DaemonServer(str(tmp_path), main)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        code, out, _ = forward(["stats"], str(tmp_path))
+        assert code == 0 and "No model calls recorded in the last 7d." in out
+        code, _, err = forward(["unknown"], str(tmp_path))
+        assert code == 2 and "invalid choice: 'unknown'" in err
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,65 @@
+import os
+import time
+import pytest
+from autocoder.file_cache import FileCache, decode_text
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    past = time.time() - 60
+    for name, content in {"a.py": b"print('a')\n", "b.txt": b"line one\r\nline two\r", "c.bin": b"\xff\xfe"}.items():
+        (tmp_path / name).write_bytes(content)
+        os.utime(tmp_path / name, (past, past))
+    return tmp_path
+
+
+def test_decode_text_matches_text_mode_open(project):
+    for name in ("a.py", "b.txt"):
+        with open(project / name, "r", encoding="utf-8") as f:
+            assert decode_text((project / name).read_bytes()) == f.read()
+    with pytest.raises(UnicodeDecodeError):
+        FileCache(project).read_text("c.bin")
+
+
+def test_unchanged_files_are_served_without_reading_the_project(project):
+    cold = FileCache(project)
+    assert cold.read_text("b.txt") == "line one\nline two\n"
+    digest = cold.digest("a.py")
+    cold.put_derived("tokens-v1", digest, [3, 11])
+    cold.close()
+
+    warm = FileCache(project)
+    assert warm.digest("a.py") == digest
+    assert warm.get_derived("tokens-v1", digest) == [3, 11]
+    assert warm.read_text("b.txt") == "line one\nline two\n"
+    assert warm.stats["bytes_read"] == 0
+    assert warm.stats["hits"] == 1
+
+    (project / "a.py").write_text("print('changed')\n")
+    assert warm.digest("a.py") != digest
+    assert warm.stats["misses"] == 1
+
+
+def test_least_recently_used_blobs_are_evicted(project):
+    cache = FileCache(project, max_bytes=45)
+    for name in ("big1", "big2", "big3"):
+        (project / name).write_bytes(name.encode() * 5)
+    cache.read_bytes("big1")
+    cache.read_bytes("big2")
+    time.sleep(0.01)
+    cache.read_bytes("big1")  # big2 is now the least recently used
+    cache.read_bytes("big3")
+
+    stored = {row[0] for row in cache._db.execute("SELECT digest FROM blobs")}
+    assert cache.digest("big2") not in stored
+    assert {cache.digest("big1"), cache.digest("big3")} <= stored
+    assert cache.stats["evicted"] == 1
+
+
+def test_cache_without_autocoder_dir_reads_through(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    cache = FileCache(tmp_path)
+    assert not cache.persistent
+    assert cache.read_text("a.py") == "x = 1\n"
+    assert not (tmp_path / ".autocoder").exists()
@@ -0,0 +1,65 @@
+import os
+from autocoder.file_listing import classifier
+from autocoder.file_listing.classifier import FileClassifier, sniff_bytes, TEXT, BINARY, NOT_UTF8
+
+
+def test_sniff_detects_nul_bytes_and_invalid_utf8():
+    assert sniff_bytes(b"plain text\n", complete=True) == TEXT
+    assert sniff_bytes(b"PK\x03\x04\x00\x00", complete=True) == BINARY
+    assert sniff_bytes(b"caf\xe9", complete=True) == NOT_UTF8
+    # A multi-byte character cut off at the end of the sample is not an error
+    assert sniff_bytes("zażółć".encode("utf-8")[:-1], complete=False) == TEXT
+    assert sniff_bytes("zażółć".encode("utf-8")[:-1], complete=True) == NOT_UTF8
+
+
+def test_classify_files_applies_size_caps_and_caches_verdicts(tmp_path, monkeypatch):
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "a.py").write_text("x = 1\n" * 10)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR")
+    (tmp_path / "huge.log").write_text("log line\n" * 200)
+    (tmp_path / "b.py").write_text("y = 2\n" * 10)
+    (tmp_path / "c.py").write_text("z = 3\n")
+    files = ["a.py", "logo.png", "huge.log", "b.py", "c.py", "deleted.py"]
+
+    file_classifier = FileClassifier(tmp_path, max_file_size=1000, max_total_size=100)
+    skipped = file_classifier.classify_files(files)
+    assert skipped == {
+        "logo.png": "binary",
+        "huge.log": "too_large",
+        "b.py": "over_budget",
+        "deleted.py": "unreadable",
+    }
+    assert FileClassifier.summarize(skipped)["binary"] == 1
+    assert os.path.exists(tmp_path / ".autocoder" / classifier.CLASSIFIER_FILENAME)
+
+    # A second run trusts the cached verdicts instead of opening the files again
+    def fail_sniff(head, complete):
+        raise AssertionError("unchanged file was sniffed again")
+    monkeypatch.setattr(classifier, "sniff_bytes", fail_sniff)
+    warm = FileClassifier(tmp_path, max_file_size=1000, max_total_size=100)
+    assert warm.classify_files(files) == skipped
+    assert warm.stats == {"sniffed": 0, "cached": 4}
+
+    # Changing a file invalidates its verdict
+    monkeypatch.undo()
+    (tmp_path / "logo.png").write_text("now text")
+    changed = FileClassifier(tmp_path, max_file_size=1000, max_total_size=100)
+    assert "logo.png" not in changed.classify_files(files)
+    assert changed.stats["sniffed"] == 1
+
+
+def test_files_list_does_not_classify(tmp_path, monkeypatch):
+    from autocoder.autocoder import create_files_list
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / ".autocoder" / "project_state.txt").write_text("initialized")
+    (tmp_path / "a.py").write_text("x = 1\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test-key")
+
+    def classify_files(self, project_files):
+        raise AssertionError("files classified for the files list")
+
+    monkeypatch.setattr(FileClassifier, "classify_files", classify_files)
+    create_files_list()
+    assert sorted((tmp_path / ".autocoder" / "files.txt").read_text().splitlines()) == ["a.py", "logo.png"]
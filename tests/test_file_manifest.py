@@ -0,0 +1,142 @@
+import os
+import time
+from pathlib import Path
+import pathspec
+import pytest
+from autocoder.file_listing.ignore_matcher import IgnoreMatcher
+from autocoder.file_listing.manifest import FileManifest
+
+PATTERNS = ['build/', '*.pyc', '.autocoder/']
+
+
+def walk_reference(project_root, patterns):
+    ignore_spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    project_files = []
+    for root, dirs, files in os.walk(project_root):
+        rel_root = Path(root).relative_to(project_root)
+        dirs[:] = [d for d in dirs if not ignore_spec.match_file(str(rel_root / d) + '/')]
+        for file in files:
+            rel_path = rel_root / file
+            if not ignore_spec.match_file(str(rel_path)):
+                project_files.append(str(rel_path))
+    return project_files
+
+
+def age_tree(root, seconds=60):
+    past = time.time() - seconds
+    for dirpath, _, _ in os.walk(root):
+        os.utime(dirpath, (past, past))
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "src" / "pkg").mkdir(parents=True)
+    (tmp_path / "build").mkdir()
+    (tmp_path / "README.md").write_text("readme")
+    (tmp_path / "src" / "main.py").write_text("print('hi')")
+    (tmp_path / "src" / "pkg" / "mod.py").write_text("x = 1")
+    (tmp_path / "src" / "pkg" / "mod.pyc").write_bytes(b"\0")
+    (tmp_path / "build" / "out.txt").write_text("artifact")
+    age_tree(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def ignore_spec():
+    return IgnoreMatcher.from_lines(PATTERNS)
+
+
+def test_manifest_matches_os_walk(project, ignore_spec):
+    manifest = FileManifest(project)
+    assert manifest.list_project_files(ignore_spec) == walk_reference(project, PATTERNS)
+    assert os.path.isfile(project / ".autocoder" / "manifest.json")
+
+
+def test_warm_run_reuses_unchanged_directories(project, ignore_spec):
+    cold = FileManifest(project)
+    cold_files = cold.list_project_files(ignore_spec)
+
+    warm = FileManifest(project)
+    assert warm.list_project_files(ignore_spec) == cold_files
+    assert warm.stats == {"dirs_scanned": 0, "dirs_reused": 3}
+
+    (project / "src" / "pkg" / "new.py").write_text("y = 2")
+    changed = FileManifest(project)
+    files = changed.list_project_files(ignore_spec)
+    assert os.path.join("src", "pkg", "new.py") in files
+    assert files == walk_reference(project, PATTERNS)
+    assert changed.stats["dirs_scanned"] == 1
+
+
+def test_full_rescan_and_pattern_change_ignore_cache(project, ignore_spec):
+    FileManifest(project).list_project_files(ignore_spec)
+
+    full = FileManifest(project)
+    full.list_project_files(ignore_spec, full=True)
+    assert full.stats["dirs_reused"] == 0
+
+    other_patterns = ['*.md', '.autocoder/']
+    changed = FileManifest(project)
+    files = changed.list_project_files(IgnoreMatcher.from_lines(other_patterns))
+    assert changed.stats["dirs_reused"] == 0
+    assert files == walk_reference(project, other_patterns)
+
+
+@pytest.mark.parametrize("max_workers", [1, 4, 16])
+def test_parallel_walk_is_byte_identical(tmp_path, ignore_spec, max_workers):
+    for i in range(30):
+        directory = tmp_path / f"d{i % 7}" / f"sub{i % 3}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"f{i}.py").write_text("pass")
+        (directory / f"f{i}.pyc").write_bytes(b"\0")
+    (tmp_path / "build" / "nested").mkdir(parents=True)
+    (tmp_path / "build" / "nested" / "x.py").write_text("pass")
+    os.symlink(tmp_path / "d1", tmp_path / "link_to_d1")
+    os.symlink(tmp_path / "missing", tmp_path / "dangling")
+
+    files = FileManifest(tmp_path, max_workers=max_workers).list_project_files(ignore_spec)
+    assert files == walk_reference(tmp_path, PATTERNS)
+    assert "dangling" in files
+
+
+def test_nested_gitignore_change_rescans_subtree(project):
+    ignore_spec = IgnoreMatcher.from_project(project, default_ignores=PATTERNS)
+    files = FileManifest(project).list_project_files(ignore_spec)
+    assert os.path.join("src", "pkg", "mod.py") in files
+
+    (project / "src" / ".gitignore").write_text("mod.py\n")
+    # Editing an existing .gitignore in place does not touch the directory mtime
+    (project / "src" / ".gitignore").write_text("mod.py\n#\n")
+    age_tree(project)
+    manifest = FileManifest(project)
+    files = manifest.list_project_files(IgnoreMatcher.from_project(project, default_ignores=PATTERNS))
+    assert os.path.join("src", "pkg", "mod.py") not in files
+    assert os.path.join("src", ".gitignore") in files
+
+    (project / "src" / ".gitignore").write_text("main.py\n")
+    manifest = FileManifest(project)
+    files = manifest.list_project_files(IgnoreMatcher.from_project(project, default_ignores=PATTERNS))
+    assert os.path.join("src", "pkg", "mod.py") in files
+    assert os.path.join("src", "main.py") not in files
+    assert manifest.stats["dirs_scanned"] == 2
+
+
+def test_manifest_is_parsed_once_per_process(tmp_path, monkeypatch):
+    import json
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "app.py").write_text("print('app')\n")
+    ignore_spec = IgnoreMatcher.from_lines(PATTERNS)
+    FileManifest(str(tmp_path)).list_project_files(ignore_spec)
+
+    def no_parsing(*args, **kwargs):
+        raise AssertionError("the manifest saved by this process was parsed again")
+
+    monkeypatch.setattr(json, "load", no_parsing)
+    manifest = FileManifest(str(tmp_path))
+    assert manifest.load() and "app.py" in manifest.files
+    monkeypatch.undo()
+
+    # Written by another process: parsed again
+    os.utime(manifest.manifest_path, ns=(0, 0))
+    assert FileManifest(str(tmp_path)).load()
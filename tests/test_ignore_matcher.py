@@ -0,0 +1,126 @@
+import os
+import random
+import pathspec
+import pytest
+from autocoder.file_listing.ignore_matcher import IgnoreMatcher, DEFAULT_IGNORES
+
+
+PATTERNS = DEFAULT_IGNORES + [
+    '# comment', '', '*.tar.gz', '/root.txt', 'docs/*.md', 'src/gen/', 'a/**/b',
+    '**/tmp', 'foo*/', '[ab].c', '!keep.log', 'x/y/z.py', '*~', 'cache/**',
+    '!src/gen/keep/', 'name with space', 'deep/*/leaf.txt', '\\#hash', '**/',
+]
+
+NAMES = ['root.txt', 'readme.md', 'a.c', 'b.c', 'c.c', 'keep.log', 'other.log', 'pkg.tar.gz',
+         'tmp', 'z.py', 'leaf.txt', 'file~', '#hash', 'name with space', 'mod.py', 'x.pyc']
+DIRS = ['', 'docs', 'src', os.path.join('src', 'gen'), os.path.join('src', 'gen', 'keep'), 'a',
+        os.path.join('a', 'q', 'b'), os.path.join('x', 'y'), 'foobar', 'cache', os.path.join('deep', 'k')]
+
+
+def reference_ignored(spec, rel_path, is_dir):
+    # git semantics on top of pathspec: a walk never looks below an ignored
+    # directory, so its parents are checked first. pathspec on its own lets
+    # a later negation re-include a path inside an ignored directory, which
+    # git does not (see test_negation_cannot_reinclude_inside_an_ignored_directory).
+    parts = rel_path.split(os.sep)
+    for depth in range(1, len(parts)):
+        if spec.match_file('/'.join(parts[:depth]) + '/'):
+            return True
+    return spec.match_file(rel_path + ('/' if is_dir else ''))
+
+
+@pytest.mark.parametrize("patterns", [
+    PATTERNS,
+    [p for p in PATTERNS if not p.startswith('**/')] + ['!*.md', 'docs/'],
+])
+def test_matches_git_semantics_for_root_patterns(patterns):
+    spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    matcher = IgnoreMatcher.from_lines(patterns)
+    for rel_dir in DIRS:
+        for name in NAMES:
+            for is_dir in (False, True):
+                rel_path = os.path.join(rel_dir, name)
+                expected = reference_ignored(spec, rel_path, is_dir)
+                assert matcher.match_file(rel_path + ('/' if is_dir else '')) == expected, rel_path
+
+
+def test_matches_git_semantics_for_many_generated_patterns():
+    rng = random.Random(7)
+    patterns = []
+    for i in range(2000):
+        kind = i % 6
+        if kind == 0:
+            patterns.append(f'*.ext{i}')
+        elif kind == 1:
+            patterns.append(f'name{i}/')
+        elif kind == 2:
+            patterns.append(f'dir{i % 50}/sub/*.log{i}')
+        elif kind == 3:
+            patterns.append(f'**/tmp{i}')
+        elif kind == 4:
+            patterns.append(f'!keep{i}.ext{i - 4}')
+        else:
+            patterns.append(f'/top{i}*')
+    spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    matcher = IgnoreMatcher.from_lines(patterns)
+    for _ in range(1000):
+        i = rng.randrange(2000)
+        rel_dir = rng.choice(['', f'dir{i % 50}', os.path.join(f'dir{i % 50}', 'sub'), 'other'])
+        name = rng.choice([f'f.ext{i}', f'name{i}', f'x.log{i}', f'tmp{i}', f'keep{i}.ext{i - 4}', f'top{i}x'])
+        is_dir = rng.random() < 0.3
+        rel_path = os.path.join(rel_dir, name)
+        assert matcher.match_file(rel_path + ('/' if is_dir else '')) == \
+            reference_ignored(spec, rel_path, is_dir), rel_path
+
+
+def test_negation_cannot_reinclude_inside_an_ignored_directory():
+    patterns = ['build/', '!build/keep.txt', 'logs/*', '!logs/keep.log']
+    spec = pathspec.PathSpec.from_lines('gitwildmatch', patterns)
+    matcher = IgnoreMatcher.from_lines(patterns)
+    # pathspec alone re-includes the file; git never descends into build/
+    assert not spec.match_file('build/keep.txt')
+    assert matcher.match_file('build/keep.txt')
+    # Ignoring the directory's contents rather than the directory leaves room for the negation
+    assert matcher.match_file('logs/other.log')
+    assert not matcher.match_file('logs/keep.log')
+
+
+def test_nested_gitignore_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n/only_root.txt\n")
+    (tmp_path / "pkg" / "sub").mkdir(parents=True)
+    (tmp_path / "pkg" / ".gitignore").write_text("!important.log\n/generated/\nlocal.txt\n")
+    (tmp_path / "pkg" / "sub" / ".gitignore").write_text("*.txt\n")
+    matcher = IgnoreMatcher.from_project(tmp_path, default_ignores=[])
+
+    assert matcher.match_file("debug.log")
+    assert matcher.match_file("important.log")
+    assert matcher.match_file("pkg/debug.log")
+    assert not matcher.match_file("pkg/important.log")
+    assert not matcher.match_file("pkg/sub/important.log")
+    assert matcher.match_file("only_root.txt")
+    assert not matcher.match_file("pkg/only_root.txt")
+    assert matcher.match_file("pkg/generated/")
+    assert not matcher.match_file("pkg/sub/generated/")
+    assert not matcher.match_file("generated/")
+    assert matcher.match_file("pkg/local.txt")
+    assert matcher.match_file("pkg/sub/deeper/local.txt")
+    assert matcher.match_file("pkg/sub/notes.txt")
+    assert not matcher.match_file("pkg/notes.txt")
+    assert matcher.for_directory("pkg") is matcher.for_directory("pkg")
+
+
+def test_cached_matcher_is_rebuilt_when_a_gitignore_changes(tmp_path):
+    from autocoder.file_listing.ignore_matcher import get_ignore_matcher
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    (tmp_path / "sub").mkdir()
+    matcher = get_ignore_matcher(str(tmp_path))
+    assert matcher.match_file("sub/run.log") and not matcher.match_file("sub/data.csv")
+    assert get_ignore_matcher(str(tmp_path)) is matcher
+
+    # A nested .gitignore appearing in a directory the matcher has seen
+    (tmp_path / "sub" / ".gitignore").write_text("*.csv\n")
+    rebuilt = get_ignore_matcher(str(tmp_path))
+    assert rebuilt is not matcher and rebuilt.match_file("sub/data.csv")
+
+    (tmp_path / ".gitignore").write_text("*.log\n*.tmp\n")
+    assert get_ignore_matcher(str(tmp_path)).match_file("notes.tmp")
@@ -0,0 +1,119 @@
+import pytest
+from autocoder import import_graph
+from autocoder.import_graph import ImportGraph, resolve_file_names
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    files = {
+        "src/app/__init__.py": "",
+        "src/app/models.py": "class User:\n    def save(self):\n        pass\n\nMAX_USERS = 10\n",
+        "src/app/db.py": "import sqlite3\n\ndef connect():\n    return sqlite3.connect(':memory:')\n",
+        "src/app/service.py": "from .models import User\nfrom . import db\n\ndef register():\n    return User()\n",
+        "src/app/api/__init__.py": "",
+        "src/app/api/routes.py": "from ..service import register\nfrom app.models import MAX_USERS\n",
+        "scripts/run.py": "import app.api.routes\n",
+        "broken.py": "def oops(:\n",
+    }
+    for rel_path, content in files.items():
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text(content)
+    return tmp_path, sorted(files)
+
+
+def test_queries_over_relative_and_absolute_imports(project):
+    root, files = project
+    graph = ImportGraph(root).update(files + ["README.md"])
+
+    assert graph.definers("User") == ["src/app/models.py"]
+    assert graph.definers("save") == graph.definers("User.save") == ["src/app/models.py"]
+    assert graph.importers("app.models") == ["src/app/api/routes.py", "src/app/service.py"]
+    assert graph.importers("src/app/db.py") == ["src/app/service.py"]
+    assert graph.imported_by("src/app/api/routes.py") == ["src/app/models.py", "src/app/service.py"]
+    assert "error" in graph.summaries["broken.py"]
+
+    assert graph.closure(["src/app/db.py"], depth=0) == ["src/app/db.py"]
+    assert graph.closure(["src/app/db.py"], depth=1) == ["src/app/db.py", "src/app/service.py"]
+    assert graph.closure(["src/app/db.py"], depth=2) == [
+        "src/app/db.py", "src/app/service.py", "src/app/api/routes.py", "src/app/models.py"]
+
+
+def test_summaries_are_cached_by_content_and_parsed_in_parallel(project, monkeypatch):
+    root, files = project
+    monkeypatch.setattr(import_graph, "PARALLEL_PARSE_THRESHOLD", 2)
+    graph = ImportGraph(root, max_workers=2).update(files)
+    assert graph.stats == {"parsed": len(files), "cached": 0}
+    expected = {rel_path: sorted(targets) for rel_path, targets in graph.imports.items()}
+
+    (root / "src/app/db.py").write_text("import os\n")
+    warm = ImportGraph(root).update(files)
+    assert warm.stats == {"parsed": 1, "cached": len(files) - 1}
+    assert {rel_path: sorted(targets) for rel_path, targets in warm.imports.items()} == expected
+
+
+def test_resolve_file_names_matches_basenames_and_paths():
+    files = ["src/app/db.py", "tests/db.py", "src/app/models.py"]
+    assert resolve_file_names(["db.py", "src/app/models.py", "missing.py"], files) == [
+        "src/app/db.py", "tests/db.py", "src/app/models.py"]
+
+
+def test_task_context_follows_the_named_files_inside_the_graph(project):
+    import re
+    from langgraph.graph import StateGraph, END
+    from autocoder.state import State
+    from autocoder.nodes.task_execution_node import build_task_context
+    root, files = project
+
+    def interpret(state):
+        return {"project_files": files, "affected_files": ["models.py"]}
+
+    def pack_context(state):
+        return {"context": build_task_context(state, 100, "Add connection pooling")}
+
+    workflow = StateGraph(State)
+    workflow.add_node("interpret", interpret)
+    workflow.add_node("pack_context", pack_context)
+    workflow.set_entry_point("interpret")
+    workflow.add_edge("interpret", "pack_context")
+    workflow.add_edge("pack_context", END)
+    graph = workflow.compile()
+
+    # closure_depth is left unset, so the default depth of 1 applies
+    sections = re.findall(r"#File (\S+):", graph.invoke({"project_root": str(root), "context": ""})["context"])
+    assert sections == ["src/app/models.py", "src/app/api/routes.py", "src/app/service.py"]
+    sections = re.findall(r"#File (\S+):", graph.invoke(
+        {"project_root": str(root), "context": "", "closure_depth": 0})["context"])
+    assert sections == ["src/app/models.py"]
+
+
+def test_imports_resolve_only_from_import_roots(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    files = {
+        "main.py": "import json\nimport logging\nimport util\nimport helpers\n",
+        "helpers.py": "",
+        "tools/vendor/json.py": "",
+        "tools/util.py": "",
+        "src/logging.py": "",
+        "lib/pkg/__init__.py": "",
+        "lib/pkg/util.py": "from pkg import helpers\n",
+    }
+    for rel_path, content in files.items():
+        (tmp_path / rel_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_path).write_text(content)
+    graph = ImportGraph(tmp_path).update(sorted(files))
+
+    # Standard library names and files outside an import root are not linked
+    assert graph.imported_by("main.py") == ["helpers.py"]
+    assert graph.importers("pkg.util") == [] and graph.modules["pkg.util"] == ["lib/pkg/util.py"]
+    assert "util" not in graph.modules and "json" not in graph.modules
+
+
+def test_task_interpreter_reports_named_files_and_their_closure(project):
+    from autocoder.task_interpreter import TaskInterpreterArgs, task_interpreter
+    root, files = project
+    args = TaskInterpreterArgs(task_description="Fix the pool in db.py. Update README.md and db.py docs")
+    result = task_interpreter({"project_root": str(root), "project_files": files}, args)
+    # Whole names, not just their extensions as the old capturing group returned
+    assert result["affected_files"] == ["db.py", "README.md"]
+    assert result["dependency_files"] == ["src/app/db.py", "src/app/service.py"]
@@ -0,0 +1,58 @@
+import asyncio
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper
+from autocoder.map_reduce import MapReduceAnalyzer, plan_chunks
+from autocoder.response_cache import ResponseCache
+
+
+def test_chunks_follow_directories_and_fit_the_budget():
+    file_tokens = {
+        "README.md": 10, "setup.py": 10,
+        "src/app/a.py": 40, "src/app/b.py": 40,
+        "src/lib/c.py": 30, "src/lib/d.py": 20,
+        "docs/guide.md": 20, "huge.txt": 500,
+    }
+    chunks = plan_chunks(file_tokens, 100)
+    assert [(chunk["name"], chunk["files"]) for chunk in chunks] == [
+        (".", ["README.md", "setup.py", "docs/guide.md"]),
+        ("src/app", ["src/app/a.py", "src/app/b.py"]),
+        ("src/lib", ["src/lib/c.py", "src/lib/d.py"]),
+        (".", ["huge.txt"]),
+    ]
+    assert all(chunk["tokens"] <= 100 for chunk in chunks if chunk["files"] != ["huge.txt"])
+    assert plan_chunks(file_tokens, 10_000)[0]["files"] == sorted(file_tokens, key=lambda f: f.split("/"))
+
+
+def analyze(root, server, files):
+    async def run():
+        claude_api = AsyncClaudeAPIWrapper("test-key", base_url=server.base_url)
+        analyzer = MapReduceAnalyzer(root, claude_api, ResponseCache.for_project(root),
+                                     chunk_budget=400, reduce_fanout=2)
+        result = await analyzer.analyze(files)
+        await claude_api.close()
+        return result
+    return asyncio.run(run())
+
+
+def test_rerun_only_recomputes_changed_chunk_and_its_reduce_path(tmp_path, fake_messages_server):
+    (tmp_path / ".autocoder").mkdir()
+    files = []
+    for package in ("alpha", "beta", "gamma", "delta"):
+        (tmp_path / package).mkdir()
+        for module in ("one", "two"):
+            (tmp_path / package / f"{module}.py").write_text(f"def {package}_{module}():\n    return 1\n" * 8)
+            files.append(f"{package}/{module}.py")
+
+    first = analyze(tmp_path, fake_messages_server, files)
+    assert [chunk["name"] for chunk in first["chunks"]] == ["alpha", "beta", "delta", "gamma"]
+    # 4 chunks, 2 reduce steps, 1 final report
+    assert first["stats"] == {"calls": 7}
+    assert "alpha_one" in first["report"] and "gamma_two" in first["report"]
+    assert len(fake_messages_server.requests) == 7
+
+    assert analyze(tmp_path, fake_messages_server, files)["stats"] == {"cached": 1}
+
+    (tmp_path / "gamma" / "two.py").write_text("def gamma_changed():\n    return 2\n" * 8)
+    third = analyze(tmp_path, fake_messages_server, files)
+    # The gamma chunk, the reduce step over delta and gamma, and the report
+    assert third["stats"] == {"calls": 3, "cached": 2}
+    assert "gamma_changed" in third["report"]
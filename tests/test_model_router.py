@@ -0,0 +1,80 @@
+import asyncio
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper, ClaudeAPIWrapper
+from autocoder.map_reduce import MapReduceAnalyzer
+from autocoder.model_router import DEFAULT_TIER_MODELS, ModelRouter
+
+FAST, BALANCED, LARGE = (DEFAULT_TIER_MODELS[tier] for tier in ("fast", "balanced", "large"))
+
+
+def request(prompt, **args):
+    return {"messages": [{"role": "user", "content": prompt}], "max_tokens": 10, **args}
+
+
+def test_tiers_map_to_configured_models(monkeypatch):
+    monkeypatch.setenv("AUTOCODER_FAST_MODEL", "claude-3-sonnet-20240229")
+    router = ModelRouter.from_env()
+    assert router.model_for("fast") == "claude-3-sonnet-20240229"
+    assert router.model_for("large") == LARGE
+    assert router.next_tier("fast") == "balanced" and router.next_tier("large") is None
+
+
+def test_rejected_response_escalates_one_tier_up(fake_messages_server):
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+
+    def validate(text):
+        # Accept only the second answer
+        return len(fake_messages_server.requests) > 1
+
+    result = claude_api.generate_response({}, request("classify this", tier="fast", validate=validate))
+    assert result["response"] == "echo: classify this"
+    assert [body["model"] for body in fake_messages_server.requests] == [FAST, BALANCED]
+    tiers = claude_api.router.report()["tiers"]
+    assert tiers["fast"] == {"calls": 1, "escalations": 1, "seconds": tiers["fast"]["seconds"]}
+    assert tiers["balanced"]["calls"] == 1 and tiers["balanced"]["escalations"] == 0
+
+    # An explicit model is never rerouted
+    claude_api.generate_response({}, request("other", model=FAST, tier="fast", validate=lambda text: False))
+    assert fake_messages_server.requests[-1]["model"] == FAST and len(fake_messages_server.requests) == 3
+
+
+def test_report_estimates_latency_saved_against_the_large_model():
+    router = ModelRouter()
+    router.record("fast", FAST, 1.0)
+    router.record("fast", FAST, 0.5)
+    router.mark_escalated("fast", FAST)
+    router.record("large", LARGE, 4.0)
+    report = router.report()
+    assert report["actual_seconds"] == 5.5
+    # The escalated call would not have been made; the fast one would have run at large-model speed
+    assert report["baseline_seconds"] == 1.0 * 120 / 25 + 4.0
+    assert round(report["saved_seconds"], 6) == round(4.8 + 4.0 - 5.5, 6)
+    assert "1 escalated" in router.summary() and "+3.3 s saved" in router.summary()
+
+    # 5.46 s against 5.54 s: rounded on their own, both totals would read 5.5 s next to "+0.1 s saved"
+    close = ModelRouter()
+    close.record("fast", FAST, 0.02)
+    close.record("large", LARGE, 5.44)
+    assert "5.5 s against an estimated 5.6 s" in close.summary() and "(+0.1 s saved)" in close.summary()
+
+    only_large = ModelRouter()
+    only_large.record("large", LARGE, 2.0)
+    assert only_large.summary() is None
+
+
+def test_map_reduce_summarizes_parts_on_the_fast_model(tmp_path, fake_messages_server):
+    files = []
+    for package in ("alpha", "beta", "gamma"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "mod.py").write_text(f"def {package}():\n    return 1\n" * 8)
+        files.append(f"{package}/mod.py")
+
+    async def run():
+        claude_api = AsyncClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+        result = await MapReduceAnalyzer(tmp_path, claude_api, chunk_budget=200, reduce_fanout=2).analyze(files)
+        await claude_api.close()
+        return result
+
+    assert "report" in asyncio.run(run())
+    models = [body["model"] for body in fake_messages_server.requests]
+    # Three chunks, two reduce steps, one report
+    assert models == [FAST] * 3 + [BALANCED] * 2 + [LARGE]
@@ -0,0 +1,74 @@
+import json
+from types import SimpleNamespace
+from typing import List, TypedDict
+import pytest
+from langgraph.graph import StateGraph, END
+from autocoder.autocoder import stream_execution
+from autocoder.langgraph_workflow import LangGraphWorkflow
+from autocoder.profiler import NodeProfiler
+
+
+class Steps(TypedDict):
+    files: List[str]
+
+
+def test_each_node_call_is_profiled():
+    events = []
+    profiler = NodeProfiler(on_event=events.append)
+
+    def list_files(state):
+        return {"files": [f"module{i}.py" for i in range(1000)]}
+
+    def summarize(state):
+        return {"files": state["files"][:10]}
+
+    workflow = StateGraph(Steps)
+    workflow.add_node("list_files", profiler.wrap("list_files", list_files))
+    workflow.add_node("summarize", profiler.wrap("summarize", summarize))
+    workflow.set_entry_point("list_files")
+    workflow.add_edge("list_files", "summarize")
+    workflow.add_edge("summarize", END)
+    profiler.start()
+    try:
+        workflow.compile().invoke({"files": []})
+    finally:
+        profiler.stop()
+
+    assert [event["node"] for event in events] == ["list_files", "summarize"]
+    listed, summarized = events
+    assert listed["type"] == "profile" and listed["wall"] >= listed["cpu"] >= 0
+    assert listed["peak_bytes"] > 1000 * len("module0.py")
+    assert listed["state_delta_bytes"] > 0 > summarized["state_delta_bytes"]
+    assert profiler.summary()["list_files"]["calls"] == 1
+
+    trace = profiler.chrome_trace()
+    spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+    assert [span["name"] for span in spans] == ["list_files", "summarize"]
+    assert spans[0]["ts"] + spans[0]["dur"] <= spans[1]["ts"] + 1
+
+
+def test_workflow_nodes_report_failures(tmp_path):
+    profiler = NodeProfiler()
+    workflow = LangGraphWorkflow("test-key", profiler=profiler)
+    # Without a project root the file listing fails
+    with pytest.raises(ValueError):
+        list(workflow.graph.stream({"messages": [{"role": "user", "content": "task"}]},
+                                   {"configurable": {"thread_id": "profiled"}}))
+    initialized, record = profiler.records
+    assert initialized["node"] == "initialize" and "error" not in initialized
+    assert record["node"] == "file_listing" and "error" in record
+
+    paths = profiler.write_report(str(tmp_path), "profiled")
+    assert "file_listing" in open(paths["summary"]).read()
+    assert json.load(open(paths["trace"]))["traceEvents"][-1]["args"]["error"] == record["error"]
+
+
+def test_stream_execution_reports_profile_events():
+    def graph_stream(initial_state, config, **kwargs):
+        workflow.on_event({"type": "profile", "node": "file_listing", "wall": 1.5, "cpu": 0.25,
+                           "peak_bytes": 3 * 1024 * 1024, "state_delta_bytes": 2048})
+        yield "updates", {"file_listing": {}}
+
+    workflow = SimpleNamespace(graph=SimpleNamespace(stream=graph_stream), on_event=None)
+    outputs = list(stream_execution(workflow, "task", {}))
+    assert outputs[0] == "[Profile] file_listing: 1.500 s wall, 0.250 s CPU, 3.0 MB peak, state +2.0 KB\n"
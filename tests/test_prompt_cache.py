@@ -0,0 +1,82 @@
+from autocoder.blob_store import is_blob_ref
+from autocoder.claude_api_wrapper import ClaudeAPIWrapper, PROMPT_CACHING_BETA
+from autocoder.nodes.task_execution_node import TaskExecutionArgs, build_task_messages, execute_task
+
+CONTEXT = "Project Files:\napp.py\n\nFile Contents:\n\n#File app.py:\n" + "def handler(request):\n    pass\n" * 400
+
+
+def test_context_is_a_cacheable_prefix_and_feedback_follows_it():
+    [message] = build_task_messages(CONTEXT, "Add logging", error="NameError: logger")
+    prefix, instruction = message["content"]
+    assert prefix["cache_control"] == {"type": "ephemeral"} and CONTEXT in prefix["text"]
+    assert "Add logging" in instruction["text"] and "NameError: logger" in instruction["text"]
+    assert "cache_control" not in instruction
+
+    [small] = build_task_messages("tiny project", "Add logging")
+    assert "cache_control" not in small["content"][0]
+
+
+def test_task_retries_read_the_context_from_the_prompt_cache(fake_messages_server):
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+    state = {"context": CONTEXT}
+    args = TaskExecutionArgs(task_description="Add logging")
+
+    execute_task(state, args, claude_api)
+    # The state refers to the packed context instead of holding another copy of it
+    assert is_blob_ref(state["task_context"])
+    first = dict(state["token_usage"])
+    assert first["cache_creation_input_tokens"] > 1000
+    assert first.get("cache_read_input_tokens", 0) == 0
+
+    # The retry sees the error, but the context must not change even if the state does
+    state.update(error="Tests failed", context="something else")
+    execute_task(state, args, claude_api)
+    usage = state["token_usage"]
+    assert usage["cache_read_input_tokens"] == first["cache_creation_input_tokens"]
+    assert usage["cache_creation_input_tokens"] == first["cache_creation_input_tokens"]
+    assert usage["input_tokens"] > first["input_tokens"]
+    assert claude_api.usage["requests"] == 2
+    assert claude_api.usage["cache_read_input_tokens"] == usage["cache_read_input_tokens"]
+
+    first_request, retry = fake_messages_server.requests
+    assert first_request["messages"][0]["content"][0] == retry["messages"][0]["content"][0]
+    assert "Tests failed" in retry["messages"][0]["content"][1]["text"]
+    assert retry["headers"]["anthropic-beta"] == PROMPT_CACHING_BETA
+
+
+def test_the_task_loop_keeps_its_context_and_usage_between_graph_nodes(tmp_path, fake_messages_server, monkeypatch):
+    from langgraph.graph import StateGraph, END
+    from autocoder.state import State
+    from autocoder.nodes import task_execution_node
+    (tmp_path / ".autocoder").mkdir()
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+    args = TaskExecutionArgs(task_description="Add logging")
+    builds = []
+    build_task_context = task_execution_node.build_task_context
+    monkeypatch.setattr(task_execution_node, "build_task_context",
+                        lambda *a, **kw: builds.append(a) or build_task_context(*a, **kw))
+
+    def task_execution(state):
+        updated = execute_task(dict(state), args, claude_api)
+        return {key: value for key, value in updated.items() if key != "messages"}
+
+    def error_handling(state):
+        return {"error": "Tests failed", "task_completed": False}
+
+    workflow = StateGraph(State)
+    workflow.add_node("task_execution", task_execution)
+    workflow.add_node("error_handling", error_handling)
+    workflow.set_entry_point("task_execution")
+    workflow.add_conditional_edges("task_execution", lambda state: len(fake_messages_server.requests) >= 2,
+                                   {True: END, False: "error_handling"})
+    workflow.add_edge("error_handling", "task_execution")
+    state = workflow.compile().invoke({"project_root": str(tmp_path), "context": CONTEXT})
+
+    # Built once, on the first attempt; the retry reads it from the state and the prompt cache
+    assert len(builds) == 1 and is_blob_ref(state["task_context"])
+    first_request, retry = fake_messages_server.requests
+    assert first_request["messages"][0]["content"][0] == retry["messages"][0]["content"][0]
+    assert "Tests failed" in retry["messages"][0]["content"][1]["text"]
+    usage = state["token_usage"]
+    assert usage["cache_read_input_tokens"] == usage["cache_creation_input_tokens"] > 1000
+    assert state["task_completed"] and state["error"] is None
@@ -0,0 +1,48 @@
+import asyncio
+import json
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper, ClaudeAPIWrapper
+from autocoder.replay import CASSETTE_ENV, MODE_ENV
+
+# Nothing listens here: replayed requests must never reach the network
+UNREACHABLE = "http://127.0.0.1:9"
+
+
+def request(prompt):
+    return {"messages": [{"role": "user", "content": prompt}], "max_tokens": 10}
+
+
+def run_calls(base_url):
+    claude_api = ClaudeAPIWrapper("test-key", base_url=base_url)
+    generated = claude_api.generate_response({}, request("one two"))
+    streamed = [event for event in claude_api.stream_response(request("three four")) if event["type"] != "done"]
+
+    async def run_async():
+        async_api = AsyncClaudeAPIWrapper("test-key", base_url=base_url)
+        results = await async_api.generate_many([request("five"), request("six")])
+        await async_api.close()
+        return results
+
+    return generated, streamed, asyncio.run(run_async())
+
+
+def test_recorded_calls_replay_without_the_network(tmp_path, monkeypatch, fake_messages_server):
+    cassette = tmp_path / "calls.jsonl"
+    monkeypatch.setenv(CASSETTE_ENV, str(cassette))
+    monkeypatch.setenv(MODE_ENV, "record")
+    recorded = run_calls(fake_messages_server.base_url)
+    assert recorded[0]["response"] == "echo: one two"
+    interactions = [json.loads(line) for line in cassette.read_text().splitlines()]
+    assert len(interactions) == len(fake_messages_server.requests) == 4
+    assert interactions[0]["request"]["body"]["messages"][0]["content"] == "one two"
+
+    monkeypatch.setenv(MODE_ENV, "replay")
+    assert run_calls(UNREACHABLE) == recorded
+    assert len(fake_messages_server.requests) == 4
+
+
+def test_unrecorded_request_fails_without_retries(tmp_path, monkeypatch):
+    monkeypatch.setenv(CASSETTE_ENV, str(tmp_path / "empty.jsonl"))
+    claude_api = ClaudeAPIWrapper("test-key", base_url=UNREACHABLE)
+    result = claude_api.generate_response({}, request("never recorded"))
+    assert "No recorded response" in result["error"]
+    assert claude_api.scheduler.stats["retries"] == 0
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper, ClaudeAPIWrapper
+from autocoder.request_scheduler import RequestScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def request(prompt):
+    return {"messages": [{"role": "user", "content": prompt}], "max_tokens": 10}
+
+
+def test_token_bucket_refills_at_the_rate_the_api_reports():
+    bucket = TokenBucket(capacity=60, rate=1.0, now=0.0)
+    bucket.take(60, now=0.0)
+    assert bucket.wait_time(1, now=0.0) == 1.0
+    assert bucket.wait_time(1, now=1.0) == 0.0
+
+    # 40 of 50 used, full again in 2 s: 20 per second
+    bucket.sync(limit=50, remaining=10, reset_in=2.0, now=1.0)
+    assert bucket.rate == 20.0
+    assert bucket.wait_time(20, now=1.0) == 0.5
+
+
+def test_concurrency_halves_on_congestion_and_grows_back():
+    clock = FakeClock()
+    scheduler = RequestScheduler(max_concurrency=8, clock=clock)
+    error = type("RateLimited", (Exception,), {"status_code": 429, "response": None})()
+
+    assert scheduler._on_error(error, 0, 0.5) >= 0.5
+    assert scheduler._on_error(error, 0, 0.5) is not None
+    # Two errors in the same interval count as one congestion signal
+    assert int(scheduler.concurrency) == 4
+    clock.now += 1.0
+    scheduler._on_error(error, 0, 0.5)
+    assert int(scheduler.concurrency) == 2
+
+    for _ in range(6):
+        scheduler._on_success({})
+    assert int(scheduler.concurrency) == 4
+    assert scheduler.stats["rate_limited"] == 3
+
+
+def test_sync_requests_wait_out_retry_after(fake_messages_server):
+    fake_messages_server.fail_next = [429, 529]
+    scheduler = RequestScheduler(base_delay=0.01)
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url, scheduler=scheduler)
+
+    started = time.perf_counter()
+    result = claude_api.generate_response({}, request("hello"))
+    assert result["response"] == "echo: hello"
+    assert time.perf_counter() - started >= 0.4
+    assert len(fake_messages_server.requests) == 3
+    assert scheduler.stats["retries"] == 2 and scheduler.stats["requests"] == 1
+
+
+def test_client_errors_are_not_retried(fake_messages_server):
+    scheduler = RequestScheduler(base_delay=0.01)
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url, scheduler=scheduler)
+
+    assert "error" in claude_api.generate_response({}, request("status:400"))
+    assert len(fake_messages_server.requests) == 1
+    assert scheduler.stats["retries"] == 0
+
+
+def test_batch_against_a_rate_limit_completes_and_backs_off(fake_messages_server):
+    # 10 requests per 0.5 s: a batch of 30 needs about a second
+    fake_messages_server.rate_limit = (10, 0.5)
+
+    async def run():
+        wrapper = AsyncClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url, max_concurrency=8,
+                                        scheduler=RequestScheduler(max_concurrency=8, base_delay=0.05))
+        started = time.perf_counter()
+        results = await wrapper.generate_many([request(f"prompt {i}") for i in range(30)])
+        elapsed = time.perf_counter() - started
+        await wrapper.close()
+        return wrapper.scheduler, results, elapsed
+
+    scheduler, results, elapsed = asyncio.run(run())
+    assert [result["response"] for result in results] == [f"echo: prompt {i}" for i in range(30)]
+    assert elapsed < 5
+    # Once the headers arrive the scheduler keeps pace with the limit instead of hammering it
+    assert scheduler.stats["rate_limited"] == fake_messages_server.rejected
+    assert fake_messages_server.rejected < 15
+    assert scheduler.requests is not None and scheduler.requests.capacity == 10
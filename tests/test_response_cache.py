@@ -0,0 +1,79 @@
+import time
+from types import SimpleNamespace
+from langchain_core.messages import HumanMessage
+from autocoder import response_cache
+from autocoder.claude_api_wrapper import ClaudeAPIWrapper
+from autocoder.response_cache import ResponseCache, request_key
+
+
+class FakeMessages:
+    def __init__(self):
+        self.requests = []
+        self.with_raw_response = self
+
+    def create(self, **request):
+        self.requests.append(request)
+        text = f"answer {len(self.requests)}"
+        usage = SimpleNamespace(input_tokens=5, output_tokens=2)
+        message = SimpleNamespace(content=[SimpleNamespace(text=text)], usage=usage)
+        return SimpleNamespace(headers={}, parse=lambda: message)
+
+
+def make_wrapper(tmp_path, **kwargs):
+    (tmp_path / ".autocoder").mkdir(exist_ok=True)
+    wrapper = ClaudeAPIWrapper("test-key", ResponseCache.for_project(tmp_path, **kwargs))
+    wrapper.client = SimpleNamespace(messages=FakeMessages())
+    return wrapper
+
+
+def ask(wrapper, prompt, **args):
+    return wrapper.generate_response({}, {"messages": [HumanMessage(content=prompt)], "max_tokens": 100, **args})
+
+
+def test_key_is_canonical_over_request_fields():
+    messages = [{"role": "user", "content": "hi"}]
+    assert request_key("m", messages, 10) == request_key("m", [{"content": "hi", "role": "user"}], 10)
+    assert request_key("m", messages, 10) != request_key("m", messages, 11)
+    assert request_key("m", messages, 10, 0.0) != request_key("m", messages, 10)
+
+
+def test_repeated_request_is_served_from_cache_across_instances(tmp_path):
+    wrapper = make_wrapper(tmp_path)
+    assert ask(wrapper, "analyze")["response"] == "answer 1"
+
+    rerun = make_wrapper(tmp_path)
+    started = time.perf_counter()
+    assert ask(rerun, "analyze") == {"response": "answer 1"}
+    assert time.perf_counter() - started < 0.01
+    assert rerun.client.messages.requests == []
+    # A different temperature is a different request
+    assert ask(rerun, "analyze", temperature=0.0)["response"] == "answer 1"
+    assert rerun.client.messages.requests[-1]["temperature"] == 0.0
+    assert dict(rerun.response_cache.stats) == {"hits": 1, "misses": 1, "stored": 1}
+
+
+def test_errors_are_not_cached_and_no_cache_without_autocoder_dir(tmp_path):
+    assert ResponseCache.for_project(tmp_path) is None
+    wrapper = make_wrapper(tmp_path)
+    wrapper.client.messages.create = lambda **request: 1 / 0
+    assert "error" in ask(wrapper, "analyze")
+    assert wrapper.response_cache.stats["stored"] == 0
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: clock[0])
+    cache = ResponseCache(str(tmp_path / "responses.db"), ttl=60, max_bytes=110)
+    cache.put("a", "x" * 30)
+    cache.put("b", "x" * 30)
+    clock[0] += 10
+    assert cache.get("a") == "x" * 30
+    cache.put("c", "x" * 30)
+    cache.put("d", "x" * 30)
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == "x" * 30
+    assert cache.stats["evicted"] == 1
+
+    clock[0] += 61
+    assert cache.get("d") is None
+    assert cache.stats["expired"] == 1
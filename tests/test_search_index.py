@@ -0,0 +1,72 @@
+import pytest
+from autocoder.search_index import SearchIndex, identifier_terms, query_terms
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "loader.py").write_text(
+        "def parseConfigFile(path):\n    return load_yaml_settings(path)\n")
+    (tmp_path / "http_client.py").write_text(
+        "class HTTPClient:\n    def send_request(self, url):\n        return retry(self.session.get, url)\n")
+    (tmp_path / "README.md").write_text("A tool that sends requests and reads settings.\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\x00\x00")
+    return tmp_path
+
+
+def test_identifier_terms_split_snake_and_camel_case():
+    assert identifier_terms("parseConfigFile") == ["parseconfigfile", "parse", "config", "file"]
+    assert identifier_terms("load_yaml_settings") == ["load_yaml_settings", "load", "yaml", "settings"]
+    assert identifier_terms("HTTPClient") == ["httpclient", "http", "client"]
+    assert query_terms("Fix the retry in the HTTP client") == ["fix", "retry", "http", "client"]
+
+
+def test_search_ranks_files_by_identifier_parts_and_path(project):
+    files = ["config/loader.py", "http_client.py", "README.md", "logo.png"]
+    index = SearchIndex(project)
+    assert index.update(files, skipped_files={"logo.png": "binary"}) == {"indexed": 4, "unchanged": 0, "removed": 0}
+
+    assert index.search("config parsing breaks on yaml")[0][0] == "config/loader.py"
+    assert index.search("add retries to send_request")[0][0] == "http_client.py"
+    assert index.search("replace the logo")[0][0] == "logo.png"
+    assert index.search("the of and") == []
+
+
+def test_index_is_persisted_and_updated_incrementally(project):
+    files = ["config/loader.py", "http_client.py", "README.md"]
+    SearchIndex(project).update(files)
+
+    index = SearchIndex(project)
+    assert index.update(files) == {"indexed": 0, "unchanged": 3, "removed": 0}
+
+    (project / "http_client.py").write_text("def websocket_handler():\n    pass\n")
+    (project / "README.md").unlink()
+    assert index.update(files[:2]) == {"indexed": 1, "unchanged": 1, "removed": 1}
+    assert [path for path, _ in index.search("websocket")] == ["http_client.py"]
+    assert index.search("send_request") == []
+
+
+def test_task_context_is_retrieved_inside_the_graph(project):
+    import re
+    from langgraph.graph import StateGraph, END
+    from autocoder.state import State
+    from autocoder.nodes.task_execution_node import build_task_context
+
+    def file_listing(state):
+        return {"project_files": ["README.md", "http_client.py", "config/loader.py", "logo.png"],
+                "skipped_files": {"logo.png": "binary"}}
+
+    def pack_context(state):
+        return {"context": build_task_context(state, 100, "config parsing breaks on yaml")}
+
+    workflow = StateGraph(State)
+    workflow.add_node("file_listing", file_listing)
+    workflow.add_node("pack_context", pack_context)
+    workflow.set_entry_point("file_listing")
+    workflow.add_edge("file_listing", "pack_context")
+    workflow.add_edge("pack_context", END)
+    state = workflow.compile().invoke({"project_root": str(project), "context": "", "closure_depth": 1})
+
+    # The best search hit leads the packed context
+    assert re.findall(r"#File (\S+):", state["context"])[0] == "config/loader.py"
@@ -0,0 +1,58 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from autocoder.claude_api_wrapper import AsyncClaudeAPIWrapper, ClaudeAPIWrapper
+
+
+def request(prompt, **args):
+    return {"messages": [{"role": "user", "content": prompt}], "max_tokens": 10, **args}
+
+
+def test_concurrent_identical_requests_share_one_call(fake_messages_server):
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: claude_api.generate_response({}, request("sleep:0.3")), range(4)))
+
+    assert [result["response"] for result in results] == ["echo: sleep:0.3"] * 4
+    assert len(fake_messages_server.requests) == 1
+    assert claude_api.singleflight.stats == {"calls": 1, "coalesced": 3}
+    # Only the caller that made the call reports its tokens
+    assert sum("usage" in result for result in results) == 1
+    assert claude_api.usage["requests"] == 1
+
+    # Without anything in flight, the same request is sent again
+    claude_api.generate_response({}, request("sleep:0.3"))
+    assert len(fake_messages_server.requests) == 2
+
+
+def test_errors_are_shared_too(fake_messages_server):
+    claude_api = ClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(lambda _: claude_api.generate_response({}, request("status:400")), range(3)))
+    assert all("error" in result for result in results)
+    assert len(fake_messages_server.requests) + claude_api.singleflight.stats["coalesced"] == 3
+
+
+def test_async_batch_sends_each_distinct_request_once(fake_messages_server):
+    async def run():
+        claude_api = AsyncClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url, max_concurrency=8)
+        results = await claude_api.generate_many([request("sleep:0.2")] * 5 + [request("other")])
+        await claude_api.close()
+        return claude_api, results
+
+    claude_api, results = asyncio.run(run())
+    assert [result["response"] for result in results] == ["echo: sleep:0.2"] * 5 + ["echo: other"]
+    assert len(fake_messages_server.requests) == 2
+    assert claude_api.singleflight.stats == {"calls": 2, "coalesced": 4}
+
+
+def test_a_waiter_timing_out_does_not_cancel_the_shared_call(fake_messages_server):
+    async def run():
+        claude_api = AsyncClaudeAPIWrapper("test-key", base_url=fake_messages_server.base_url)
+        results = await claude_api.generate_many([request("sleep:0.4", timeout=0.1), request("sleep:0.4")])
+        await claude_api.close()
+        return results
+
+    timed_out, ok = asyncio.run(run())
+    assert timed_out == {"error": "Request timed out after 0.1 seconds"}
+    assert ok["response"] == "echo: sleep:0.4"
+    assert len(fake_messages_server.requests) == 1
@@ -0,0 +1,97 @@
+from autocoder.nodes.file_listing_node import FileListingNode
+from autocoder.file_listing.packer import ContextPacker
+from autocoder.file_listing.skeleton import SkeletonRenderer, render_skeleton, head_tail_excerpt
+
+SOURCE = '''"""Module docstring."""
+import os
+from typing import List
+
+LIMIT = 10
+
+
+@decorator
+def compute(values: List[int],
+            scale: int = 2) -> int:
+    """Sums and scales."""
+    total = 0
+    for value in values:
+        total += value * scale
+    return total
+
+
+class Store:
+    """A store."""
+    kind = "memory"
+
+    def get(self, key):
+        if key in self.data:
+            return self.data[key]
+        return None
+
+    async def fetch(self): return await self.get("x")
+'''
+
+
+def test_render_skeleton_keeps_signatures_and_elides_bodies():
+    skeleton = render_skeleton(SOURCE)
+    assert skeleton == '''"""Module docstring."""
+import os
+from typing import List
+LIMIT = 10
+@decorator
+def compute(values: List[int],
+            scale: int = 2) -> int:
+    """Sums and scales."""
+    ...
+class Store:
+    """A store."""
+    kind = "memory"
+    def get(self, key):
+        ...
+    async def fetch(self): return await self.get("x")
+'''
+
+
+def test_renderer_falls_back_to_excerpts_and_caches_by_content(tmp_path):
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / "mod.py").write_text(SOURCE)
+    (tmp_path / "broken.py").write_text("def oops(:\n" + "x = 1\n" * 100)
+    (tmp_path / "notes.txt").write_text("".join(f"line {i}\n" for i in range(100)))
+
+    renderer = SkeletonRenderer(tmp_path)
+    broken = renderer.render("broken.py")
+    assert broken == head_tail_excerpt((tmp_path / "broken.py").read_text())
+    assert "[61 lines omitted]" in broken
+    assert "line 50" not in renderer.render("notes.txt")
+    renderer.render("mod.py")
+    assert renderer.stats["fallbacks"] == 2
+    assert renderer.compression_ratio > 1
+
+    warm = SkeletonRenderer(tmp_path)
+    assert warm.render("mod.py") == render_skeleton(SOURCE)
+    assert warm.stats["cached"] == 1
+
+    (tmp_path / "mod.py").write_text("def changed():\n    pass\n")
+    assert SkeletonRenderer(tmp_path).render("mod.py") == "def changed():\n    ...\n"
+
+
+def test_skeleton_mode_shrinks_written_and_packed_context(tmp_path):
+    (tmp_path / "mod.py").write_text(SOURCE * 5)
+    (tmp_path / "image.bin").write_bytes(b"\x00\xff" * 100)
+    node = FileListingNode(claude_api=None)
+    project_files = node.process(str(tmp_path), include_context=False)['project_files']
+
+    full = node.build_context(project_files)
+    skeleton = node.build_context(project_files, mode="skeleton")
+    assert node.compression_ratio > 1.5
+    assert "total += value * scale" in full and "total += value * scale" not in skeleton
+    assert "#File image.bin: [Skipped:" in skeleton
+
+    output_path = tmp_path / "context.txt"
+    assert node.write_context(project_files, str(output_path), mode="skeleton") == len(skeleton)
+    assert output_path.read_text() == skeleton
+
+    packed = ContextPacker(tmp_path, mode="skeleton").pack(["mod.py"], 100_000)
+    assert "def compute(values: List[int]," in packed["context"]
+    assert packed["tokens"] < ContextPacker(tmp_path).pack(["mod.py"], 100_000)["tokens"]
+    assert packed["compression_ratio"] > 1
@@ -0,0 +1,64 @@
+import time
+import threading
+from types import SimpleNamespace
+from autocoder.autocoder import stream_execution
+from autocoder.claude_api_wrapper import ClaudeAPIWrapper
+from autocoder.langgraph_workflow import LangGraphWorkflow
+from autocoder.response_cache import ResponseCache
+
+
+def test_stream_response_yields_tokens_then_timing(tmp_path, fake_messages_server):
+    fake_messages_server.token_delay = 0.05
+    (tmp_path / ".autocoder").mkdir()
+    wrapper = ClaudeAPIWrapper("test-key", ResponseCache.for_project(tmp_path), base_url=fake_messages_server.base_url)
+    args = {"messages": [{"role": "user", "content": "one two three four"}], "max_tokens": 10}
+
+    arrivals = []
+    for event in wrapper.stream_response(args):
+        arrivals.append((time.perf_counter(), event))
+    tokens = [event["text"] for _, event in arrivals if event["type"] == "token"]
+    done = arrivals[-1][1]
+    assert tokens == ["echo:", " one", " two", " three", " four"]
+    assert done["type"] == "done" and done["response"] == "echo: one two three four"
+    assert done["output_tokens"] == 5 and not done["cached"]
+    assert done["ttft"] < done["duration"] - 0.15
+    assert 0 < done["tokens_per_second"] < 5 / 0.15
+    # Tokens are yielded as they arrive, not all at the end
+    assert arrivals[-2][0] - arrivals[0][0] > 0.15
+
+    cached = list(wrapper.stream_response(args))
+    assert [event["type"] for event in cached] == ["token", "done"]
+    assert cached[1]["cached"] and cached[1]["response"] == done["response"]
+
+
+def test_execute_analysis_streams_to_on_event(tmp_path, fake_messages_server, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", fake_messages_server.base_url)
+    (tmp_path / "main.py").write_text("print('hi')\n")
+    events = []
+    result = LangGraphWorkflow("test-key").execute_analysis({"project_root": str(tmp_path)}, on_event=events.append)
+
+    streamed = "".join(event["text"] for event in events if event["type"] == "token")
+    assert streamed.startswith("echo: Please analyze the following project")
+    assert result == f"Analysis completed. Results:\n\n{streamed}"
+    assert events[-1]["type"] == "done"
+    assert fake_messages_server.requests[0]["stream"] is True
+
+
+def test_stream_execution_yields_tokens_while_the_node_runs():
+    node_finished = threading.Event()
+
+    def graph_stream(initial_state, config, **kwargs):
+        for text in ("Hello", " world"):
+            workflow.on_event({"type": "token", "text": text})
+        workflow.on_event({"type": "done", "cached": False, "ttft": 0.25, "output_tokens": 2,
+                           "tokens_per_second": 8.0, "response": "Hello world"})
+        node_finished.wait(5)
+        yield "updates", {"task_execution": {"task_completed": True}}
+
+    workflow = SimpleNamespace(graph=SimpleNamespace(stream=graph_stream), on_event=None)
+    outputs = stream_execution(workflow, "say hello", {"project_root": "."})
+    assert next(outputs) == "Hello"
+    assert next(outputs) == " world"
+    assert next(outputs) == "\n[First token after 0.25 s, 2 tokens at 8.0 tokens/s]\n"
+    node_finished.set()
+    assert list(outputs) == ["Event: {'task_execution': {'task_completed': True}}\n"]
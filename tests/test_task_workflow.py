@@ -0,0 +1,79 @@
+from autocoder.autocoder import stream_execution
+from autocoder.blob_store import BLOB_REF_PREFIX
+from autocoder.checkpoints import COMPLETED, CheckpointStore, new_run_id
+from autocoder.langgraph_workflow import LangGraphWorkflow
+from autocoder.profiler import NodeProfiler
+
+
+def make_project(root):
+    (root / ".autocoder").mkdir()
+    (root / "app.py").write_text("".join(f"def handler_{i}(request):\n    return {i}\n\n" for i in range(300)))
+    (root / "README.md").write_text("A small service.\n")
+
+
+def test_task_graph_retries_with_the_cached_context(tmp_path, fake_messages_server, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", fake_messages_server.base_url)
+    make_project(tmp_path)
+    # The first attempt is rejected; error_handling sends the graph back to task_execution
+    fake_messages_server.fail_next = [400]
+    workflow = LangGraphWorkflow("test-key")
+    config = {"project_root": str(tmp_path), **CheckpointStore.graph_config("e2e")}
+
+    output = "".join(stream_execution(workflow, "add logging to app.py", config))
+
+    state = workflow.graph.get_state(config)
+    assert not state.next
+    assert state.values["task_completed"] and state.values.get("error") is None
+    assert state.values["current_iteration"] == 2
+    assert state.values["task_result"].startswith("echo: Here is the context of the project")
+    assert state.values["task_result"] in output
+
+    first, retry = fake_messages_server.requests
+    # Both attempts send the same context block, marked for the prompt cache
+    assert first["messages"][0]["content"][0] == retry["messages"][0]["content"][0]
+    assert "def handler_299" in retry["messages"][0]["content"][0]["text"]
+    assert retry["messages"][0]["content"][0]["cache_control"] == {"type": "ephemeral"}
+    instruction = retry["messages"][0]["content"][1]["text"]
+    assert "perform the task: add logging to app.py" in instruction
+    assert "previous attempt failed" in instruction
+    assert state.values["token_usage"]["output_tokens"] > 0
+
+
+def test_an_interrupted_task_run_resumes_profiled_and_is_pruned(tmp_path, fake_messages_server, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", fake_messages_server.base_url)
+    make_project(tmp_path)
+    task = "add logging to app.py"
+    run_id = new_run_id()
+    config = {"project_root": str(tmp_path), **CheckpointStore.graph_config(run_id)}
+    store = CheckpointStore.for_project(str(tmp_path))
+    store.start_run(run_id, task)
+    profiler = NodeProfiler()
+    workflow = LangGraphWorkflow("test-key", checkpointer=store.saver, profiler=profiler)
+    # Stopped once the files are listed, before the model is called
+    list(workflow.graph.stream({"messages": [{"role": "user", "content": task}], "project_root": str(tmp_path)},
+                               config, interrupt_before=["task_execution"]))
+    store.close()
+    assert [record["node"] for record in profiler.records] == ["initialize", "file_listing"]
+    assert not fake_messages_server.requests
+
+    # A new process continues the run from the store
+    store = CheckpointStore.for_project(str(tmp_path))
+    profiler = NodeProfiler()
+    workflow = LangGraphWorkflow("test-key", checkpointer=store.saver, profiler=profiler)
+    assert workflow.graph.get_state(config).next == ("task_execution",)
+    output = "".join(stream_execution(workflow, task, config, resume=True))
+
+    assert [record["node"] for record in profiler.records] == ["task_execution"]
+    assert "[Profile] task_execution:" in output
+    [request] = fake_messages_server.requests
+    assert "perform the task: add logging to app.py" in request["messages"][0]["content"][1]["text"]
+    values = workflow.graph.get_state(config).values
+    assert values["task_completed"] and values["project_files"] == ["README.md", "app.py"]
+
+    store.finish_run(run_id, COMPLETED)
+    assert store.prune()["checkpoints"] > 0
+    state = workflow.graph.get_state(config)
+    assert not state.next and state.values["task_result"] == values["task_result"]
+    # The packed context the checkpoint refers to is kept when the blob store is pruned
+    assert values["task_context"][len(BLOB_REF_PREFIX):] in store.blob_refs()
+    store.close()
@@ -0,0 +1,71 @@
+import time
+from autocoder.autocoder import show_stats
+from autocoder.claude_api_wrapper import ClaudeAPIWrapper
+from autocoder.response_cache import ResponseCache
+from autocoder.telemetry import MetricsWriter, estimate_cost, parse_window, percentile, read_metrics, summarize
+
+
+def test_every_call_is_recorded_with_its_node_and_tokens(tmp_path, fake_messages_server):
+    (tmp_path / ".autocoder").mkdir()
+    metrics = MetricsWriter.for_project(tmp_path, command="analyze")
+    claude_api = ClaudeAPIWrapper("test-key", ResponseCache.for_project(tmp_path),
+                                  base_url=fake_messages_server.base_url, metrics=metrics)
+    args = {"messages": [{"role": "user", "content": "one two three"}], "max_tokens": 10, "node": "analyze"}
+
+    claude_api.generate_response({}, args)
+    claude_api.generate_response({}, args)
+    list(claude_api.stream_response({**args, "messages": [{"role": "user", "content": "status:400"}]}))
+    metrics.close()
+
+    called, cached, failed = read_metrics(metrics.path)
+    assert called["command"] == "analyze" and called["node"] == "analyze"
+    assert called["input_tokens"] == 3 and called["output_tokens"] == 4
+    assert called["latency"] > 0 and not called["cached"]
+    assert cached["cached"] and "input_tokens" not in cached
+    assert "error" in failed and failed["model"] == claude_api.model
+    assert "node" not in fake_messages_server.requests[0]
+
+
+def test_record_does_not_wait_for_the_disk(tmp_path):
+    metrics = MetricsWriter(str(tmp_path / "metrics.jsonl"), command="task")
+    started = time.perf_counter()
+    for i in range(2000):
+        metrics.record("task_execution", "claude-3-haiku-20240307", 0.5, {"input_tokens": i})
+    assert time.perf_counter() - started < 0.5
+    metrics.close()
+    assert [record["input_tokens"] for record in read_metrics(metrics.path)] == list(range(2000))
+
+
+def test_stats_aggregate_latency_tokens_and_cost(tmp_path, monkeypatch, capsys):
+    opus = "claude-3-opus-20240229"
+    assert parse_window("90m") == 5400 and parse_window("7d") == 7 * 86400
+    assert percentile([3, 1, 2, 4], 50) == 2 and percentile([3, 1, 2, 4], 95) == 4
+    assert estimate_cost({"model": opus, "input_tokens": 1_000_000, "output_tokens": 1_000_000}) == 90.0
+    assert estimate_cost({"model": opus, "cache_read_input_tokens": 1_000_000}) == 1.5
+    assert estimate_cost({"model": "unknown-model", "input_tokens": 10}) is None
+
+    (tmp_path / ".autocoder").mkdir()
+    (tmp_path / ".autocoder" / "project_state.txt").write_text("initialized")
+    metrics = MetricsWriter.for_project(tmp_path, command="task")
+    for latency in (1.0, 2.0, 3.0, 10.0):
+        metrics.record("task_execution", opus, latency, {"input_tokens": 1000, "output_tokens": 100})
+    metrics.record("task_execution", opus, 0.001, cached=True)
+    metrics.record("task_execution", opus, 0.2, error="overloaded")
+    metrics.close()
+    with open(metrics.path, "a") as f:
+        f.write('{"ts": 0, "command": "analyze", "model": "%s", "latency": 9, "input_tokens": 5}\n' % opus)
+
+    summary = summarize(list(read_metrics(metrics.path, since=time.time() - 60)))
+    assert set(summary) == {"task", "total"}
+    task = summary["task"]
+    assert (task["calls"], task["cached"], task["errors"]) == (6, 1, 1)
+    assert task["p50_latency"] == 2.0 and task["p95_latency"] == 10.0
+    assert task["input_tokens"] == 4000 and task["output_tokens"] == 400
+    assert round(task["cost"], 4) == round(4 * (1000 * 15 + 100 * 75) / 1_000_000, 4)
+
+    monkeypatch.chdir(tmp_path)
+    show_stats("1h")
+    output = capsys.readouterr().out
+    assert "Model calls in the last 1h" in output and "analyze" not in output
+    [total] = [line.split() for line in output.splitlines() if line.startswith("total")]
+    assert total[:4] == ["total", "6", "1", "1"]